@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Benchmarks del servidor MCP avanzado (ejemplo_avanzado.py)
+Mide las herramientas de archivos sobre un árbol de código real y las
+compara con su implementación anterior
+"""
+
+import argparse
+import sysconfig
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import ejemplo_avanzado as avanzado
+
+def buscar_texto_anterior(patron: str, directorio: str, extension: str) -> tuple:
+    """
+    La búsqueda original (readlines de cada archivo completo y todas las
+    coincidencias en memoria), con rglob para cubrir el mismo árbol
+    """
+    resultados = []
+    bytes_leidos = 0
+    for archivo in Path(directorio).rglob(f"*{extension}"):
+        if archivo.is_file():
+            try:
+                with open(archivo, 'r', encoding='utf-8') as file:
+                    lineas = file.readlines()
+                bytes_leidos += archivo.stat().st_size
+                for num_linea, linea in enumerate(lineas, 1):
+                    if patron.lower() in linea.lower():
+                        resultados.append((archivo.name, num_linea, linea.strip()))
+            except:
+                continue
+    return resultados, bytes_leidos
+
+def medir(funcion, *args, repeticiones: int = 3) -> tuple:
+    """(mejor tiempo, resultado de la última ejecución)"""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion(*args)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+def benchmark_buscar_texto(directorio: str, extension: str = ".py"):
+    print("\n🔍 buscar_texto sobre un árbol de código")
+    print("=" * 50)
+    
+    # Un patrón que no aparece obliga a leer el árbol entero
+    patron = "patron_que_no_aparece_nunca"
+    t_anterior, (_, bytes_anterior) = medir(buscar_texto_anterior, patron, directorio, extension)
+    t_nuevo, busqueda = medir(avanzado.buscar_en_arbol, patron, directorio, extension, 20)
+    megas = busqueda["bytes_leidos"] / 1048576
+    print(f"   🗂️ {busqueda['archivos_revisados']} archivos {extension}, {megas:.0f}MB")
+    print(f"   🐢 Anterior (readlines): {t_anterior:.2f}s ({bytes_anterior / 1048576 / t_anterior:.0f}MB/s)")
+    print(f"   🚀 Bloques + {avanzado.HILOS_BUSQUEDA} hilos: {t_nuevo:.2f}s ({megas / t_nuevo:.0f}MB/s, "
+          f"x{t_anterior / t_nuevo:.1f})")
+    
+    # Un patrón frecuente: la búsqueda nueva se detiene en los primeros 20 resultados
+    t_anterior, (resultados, _) = medir(buscar_texto_anterior, "import", directorio, extension)
+    t_nuevo, _ = medir(avanzado.buscar_en_arbol, "import", directorio, extension, 20)
+    print(f"   ⏹️ 'import' (20 resultados): anterior {t_anterior * 1000:.0f}ms reuniendo {len(resultados)} | "
+          f"nueva {t_nuevo * 1000:.1f}ms")
+
+def crear_log(ruta: Path, megas: int) -> Path:
+    """Un archivo de log de unos `megas` MB con líneas de longitud variable"""
+    with open(ruta, "w", encoding="utf-8") as file:
+        linea = 0
+        while file.tell() < megas * 1048576:
+            bloque = "".join(
+                f"2024-01-01 12:00:{i % 60:02d} INFO petición {i} atendida en {i % 997}ms {'·' * (i % 40)}\n"
+                for i in range(linea, linea + 10000)
+            )
+            file.write(bloque)
+            linea += 10000
+    return ruta
+
+def leer_archivo_anterior(ruta: str, max_lineas: int) -> str:
+    """La lectura original: readlines() del archivo completo para mostrar max_lineas"""
+    with open(ruta, 'r', encoding='utf-8') as file:
+        lineas = file.readlines()
+    return ''.join(lineas[:max_lineas])
+
+def medir_memoria(funcion, *args) -> tuple:
+    """(segundos, pico de memoria en MB) de una sola ejecución"""
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    funcion(*args)
+    segundos = time.perf_counter() - inicio
+    pico = tracemalloc.get_traced_memory()[1] / 1048576
+    tracemalloc.stop()
+    return segundos, pico
+
+def benchmark_leer_archivo(directorio: Path, megas: int):
+    print("\n📜 leer_archivo sobre un log grande")
+    print("=" * 50)
+    
+    ruta = str(crear_log(directorio / "servidor.log", megas))
+    leer = avanzado.leer_archivo.fn
+    t_anterior, pico_anterior = medir_memoria(leer_archivo_anterior, ruta, 50)
+    print(f"   🐢 Anterior (readlines, 50 líneas de {megas}MB): {t_anterior:.2f}s, pico {pico_anterior:.0f}MB")
+    
+    for descripcion, args in (("inicio", (ruta, 50)), ("final", (ruta, 50, "final"))):
+        segundos, pico = medir_memoria(leer, *args)
+        print(f"   ⚡ {descripcion}: {segundos * 1000:.1f}ms, pico {pico:.2f}MB")
+    
+    indice = avanzado.indice_lineas(Path(ruta))
+    mitad = indice.total_lineas // 2
+    avanzado._indices_lineas.clear()
+    t_primera, pico = medir_memoria(leer, ruta, 50, "rango", mitad)
+    t_cacheada, _ = medir(leer, ruta, 50, "rango", mitad + 12345)
+    print(f"   🗂️ rango (línea {mitad} de {indice.total_lineas}): {t_primera * 1000:.0f}ms construyendo el índice "
+          f"(pico {pico:.2f}MB) | {t_cacheada * 1000:.2f}ms con el índice ya hecho")
+    
+    cursor = leer(ruta, 50, "seguir").rsplit("cursor=", 1)[1]
+    with open(ruta, "a", encoding="utf-8") as file:
+        file.write("2024-01-01 12:01:00 WARN línea nueva\n" * 10)
+    t_seguir, _ = medir(leer, ruta, 50, "seguir", 0, cursor)
+    print(f"   👀 seguir (10 líneas nuevas): {t_seguir * 1000:.2f}ms")
+
+def listar_archivos_anterior(directorio: str) -> str:
+    """El listado original: iterdir() y luego is_dir()/stat() de cada entrada, todo ordenado"""
+    directorios = []
+    archivos = []
+    for item in Path(directorio).iterdir():
+        if item.is_dir():
+            directorios.append(f"📁 {item.name}/")
+        else:
+            archivos.append(f"📄 {item.name} ({item.stat().st_size} bytes)")
+    return "\n".join(sorted(directorios) + sorted(archivos))
+
+def benchmark_listar_archivos(directorio: Path, entradas: int, arbol: str):
+    print("\n📂 listar_archivos sobre un directorio enorme")
+    print("=" * 50)
+    
+    carpeta = directorio / "enorme"
+    carpeta.mkdir()
+    for i in range(entradas):
+        (carpeta / f"archivo_{i:06d}.log").touch()
+    listar = avanzado.listar_archivos.fn
+    
+    t_anterior, _ = medir(listar_archivos_anterior, str(carpeta))
+    t_nombre, primera = medir(listar, str(carpeta))
+    cursor = primera.rsplit('cursor="', 1)[1].rstrip('"')
+    t_siguiente, _ = medir(listar, str(carpeta), "nombre", False, 200, cursor)
+    t_fecha, _ = medir(listar, str(carpeta), "fecha", True)
+    print(f"   🐢 Anterior (iterdir + stat, {entradas} entradas): {t_anterior * 1000:.0f}ms")
+    print(f"   ⚡ Primera página por nombre: {t_nombre * 1000:.0f}ms (x{t_anterior / t_nombre:.1f}) | "
+          f"siguiente página: {t_siguiente * 1000:.0f}ms")
+    print(f"   🕒 Primera página por fecha (stat de todas): {t_fecha * 1000:.0f}ms")
+    
+    # Tamaño recursivo: la primera vez recorre el árbol, después solo comprueba el mtime de cada carpeta
+    avanzado._carpetas_medidas.clear()
+    inicio = time.perf_counter()
+    total, archivos = avanzado.tamanos_recursivos([arbol])[arbol]
+    t_frio = time.perf_counter() - inicio
+    t_caliente, _ = medir(avanzado.tamanos_recursivos, [arbol])
+    print(f"   📏 du de {arbol} ({total / 1048576:.0f}MB, {archivos} archivos, "
+          f"{avanzado.HILOS_TAMANO} hilos): {t_frio * 1000:.0f}ms | con caché {t_caliente * 1000:.0f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del servidor MCP avanzado")
+    parser.add_argument("--directorio", default=sysconfig.get_paths()["stdlib"],
+                        help="Árbol de código sobre el que medir (por defecto: la biblioteca estándar)")
+    parser.add_argument("--extension", default=".py", help="Extensión de los archivos a buscar")
+    parser.add_argument("--megas-log", type=int, default=256, help="Tamaño en MB del log sintético")
+    parser.add_argument("--entradas", type=int, default=100000, help="Entradas del directorio enorme")
+    args = parser.parse_args()
+    
+    print("🏁 Benchmarks del Servidor MCP Avanzado")
+    print("=" * 70)
+    print(f"📂 Árbol: {args.directorio}")
+    
+    benchmark_buscar_texto(args.directorio, args.extension)
+    with tempfile.TemporaryDirectory() as tmp:
+        benchmark_leer_archivo(Path(tmp), args.megas_log)
+        benchmark_listar_archivos(Path(tmp), args.entradas, args.directorio)
+    
+    print("\n" + "=" * 70)
+    print("✅ Benchmarks completados")
+
+if __name__ == "__main__":
+    main()
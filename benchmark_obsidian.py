@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Benchmarks del servidor MCP de Obsidian
+Genera un vault sintético y mide el rendimiento de las herramientas
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+from fastmcp import Client
+from fastmcp.client.transports import PythonStdioTransport
+
+import obsidian_mcp_server as obs
+from obsidian_vault import segmentos
+from obsidian_vault.exclusiones import ReglasIgnorar
+from obsidian_vault.explorador import ExploradorVault, MARGEN_MTIME_CARPETA_NS
+from obsidian_vault.grafo import GrafoEnlaces, np
+from obsidian_vault.indice import IndiceVault
+from obsidian_vault.metadatos import FilaNota
+from obsidian_vault.paralelo import configurar_procesos, obtener_pool
+from obsidian_vault.vaults import Vault
+
+PALABRAS = (
+    "meditación filosofía estoicismo tiempo perspectiva aprendizaje proyecto idea "
+    "reflexión lectura libro nota diario hábito objetivo sistema memoria atención "
+    "python datos modelo servidor herramienta vault enlace etiqueta resumen pregunta"
+).split()
+
+def crear_vault_sintetico(ruta: Path, num_notas: int, carpetas: int = 20, palabras_por_nota: int = 400, semilla: int = 42) -> Path:
+    """Crea un vault con notas Markdown aleatorias (etiquetas, enlaces y fechas)"""
+    rng = random.Random(semilla)
+    ruta.mkdir(parents=True, exist_ok=True)
+    for i in range(num_notas):
+        carpeta = ruta / f"Carpeta {i % carpetas:02d}"
+        carpeta.mkdir(exist_ok=True)
+        lineas = [f"# Nota {i}", ""]
+        for _ in range(palabras_por_nota // 10):
+            palabras = rng.choices(PALABRAS, k=10)
+            if rng.random() < 0.1:
+                palabras.append(f"#{rng.choice(PALABRAS)}")
+            if rng.random() < 0.1:
+                palabras.append(f"[[Nota {rng.randrange(num_notas)}]]")
+            lineas.append(" ".join(palabras))
+        (carpeta / f"Nota {i}.md").write_text("\n".join(lineas), encoding="utf-8")
+    return ruta
+
+def medir(funcion, *args, repeticiones: int = 3) -> float:
+    """Mejor tiempo (segundos) de varias ejecuciones"""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(*args)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+def benchmark_procesos(vault: Vault, procesos=(1, 4, 16)):
+    """Escalado de buscar_en_notas y estadisticas_vault con el pool de procesos"""
+    print("\n⚙️ Búsqueda y estadísticas repartidas entre procesos")
+    print("=" * 50)
+    
+    # Calentar la caché de páginas del sistema operativo
+    configurar_procesos(0)
+    obs._estadisticas_de_vault(vault)
+    
+    base = {}
+    for n in procesos:
+        configurar_procesos(n)
+        inicio = time.perf_counter()
+        obtener_pool()
+        arranque = time.perf_counter() - inicio
+        
+        t_buscar = medir(obs._buscar_en_vault, vault, "meditación", "", False)
+        t_stats = medir(obs._estadisticas_de_vault, vault)
+        base.setdefault("buscar", t_buscar)
+        base.setdefault("stats", t_stats)
+        print(f"   🧮 {n:>2} procesos | arranque del pool {arranque:.2f}s | "
+              f"buscar {t_buscar:.3f}s (x{base['buscar'] / t_buscar:.1f}) | "
+              f"estadísticas {t_stats:.3f}s (x{base['stats'] / t_stats:.1f})")
+    configurar_procesos(0)
+
+async def _medir_arranque(ruta: Path) -> tuple:
+    """Lanza el servidor por stdio y mide primera respuesta e índice listo"""
+    transporte = PythonStdioTransport(
+        Path(obs.__file__),
+        env={"OBSIDIAN_VAULTS": json.dumps({"benchmark": str(ruta)})},
+    )
+    inicio = time.perf_counter()
+    async with Client(transporte) as cliente:
+        await cliente.list_tools()
+        primera_respuesta = time.perf_counter() - inicio
+        
+        while True:
+            contenido = await cliente.read_resource("obsidian://estado_indices")
+            estado = json.loads(contenido[0].text)["benchmark"]
+            if estado["estado"] == "listo":
+                break
+            await asyncio.sleep(0.05)
+        indice_listo = time.perf_counter() - inicio
+        
+        # Primera búsqueda respondida desde el índice
+        inicio_busqueda = time.perf_counter()
+        await cliente.call_tool("buscar_en_notas", {"texto": "estoicismo"})
+        busqueda = time.perf_counter() - inicio_busqueda
+    return primera_respuesta, indice_listo, busqueda
+
+def benchmark_arranque(ruta: Path):
+    """Tiempo hasta la primera respuesta (tools/list) y hasta tener el índice listo"""
+    print("\n🚀 Arranque del servidor e índice en segundo plano")
+    print("=" * 50)
+    primera_respuesta, indice_listo, busqueda = asyncio.run(_medir_arranque(ruta))
+    print(f"   ⏱️ Primera respuesta (tools/list): {primera_respuesta:.2f}s")
+    print(f"   🗂️ Índice listo: {indice_listo:.2f}s")
+    print(f"   ⚡ Búsqueda desde el índice: {busqueda * 1000:.1f}ms")
+
+async def _medir_primer_resultado(texto: str) -> tuple:
+    """(primer resultado adelantado, respuesta completa) de una búsqueda, en segundos"""
+    primero = None
+    
+    async def al_recibir_mensaje(mensaje):
+        nonlocal primero
+        if primero is None:
+            primero = time.perf_counter() - inicio
+    
+    async with Client(obs.mcp, log_handler=al_recibir_mensaje) as cliente:
+        inicio = time.perf_counter()
+        await cliente.call_tool("buscar_en_notas", {"texto": texto, "usar_cache": False})
+        return primero, time.perf_counter() - inicio
+
+def benchmark_primer_resultado(ruta: Path):
+    """Tiempo hasta el primer resultado útil de un recorrido completo frente a la respuesta final"""
+    print("\n⏱️ Primer resultado de un recorrido completo")
+    print("=" * 50)
+    obs.configurar_vaults({"benchmark": str(ruta)})
+    # "]]" no tiene palabras indexables: siempre recorre todas las notas
+    primero, total = asyncio.run(_medir_primer_resultado("]]"))
+    print(f"   🥇 Primer resultado: {primero * 1000:.0f}ms")
+    print(f"   🏁 Respuesta completa: {total * 1000:.0f}ms")
+
+def benchmark_metadatos(ruta: Path):
+    """Memoria por nota del almacén columnar frente a un dict por nota, y listado completo"""
+    print("\n🗃️ Almacén compacto de metadatos")
+    print("=" * 50)
+    indice = IndiceVault(ruta)
+    indice.construir()
+    metadatos = indice.metadatos
+    
+    # Lo que costaría mantener residentes los dicts que construía listar_notas
+    tracemalloc.start()
+    dicts = []
+    for archivo in ruta.rglob("*.md"):
+        stats = archivo.stat()
+        ruta_relativa = archivo.relative_to(ruta)
+        dicts.append({
+            'nombre': archivo.name,
+            'ruta': str(ruta_relativa),
+            'tamaño': f"{stats.st_size / 1024:.1f}KB",
+            'modificado': datetime.fromtimestamp(stats.st_mtime).strftime('%Y-%m-%d %H:%M'),
+        })
+    bytes_dicts = tracemalloc.get_traced_memory()[0] / len(dicts)
+    tracemalloc.stop()
+    del dicts
+    
+    print(f"   📦 Almacén columnar: {metadatos.bytes_por_nota():.0f} bytes por nota")
+    print(f"   🐘 Un dict por nota: {bytes_dicts:.0f} bytes por nota")
+    
+    t_almacen = medir(metadatos.listar)
+    t_disco = medir(lambda: [FilaNota.desde_archivo(a, ruta) for a in ruta.rglob("*.md")])
+    print(f"   📚 Listado completo ({len(metadatos)} notas): almacén {t_almacen * 1000:.1f}ms | "
+          f"recorrido {t_disco * 1000:.1f}ms (x{t_disco / t_almacen:.1f})")
+
+def _construir_midiendo(ruta: Path, directorio_disco: str) -> tuple:
+    """Construye un índice y devuelve (índice, MB reservados mientras sigue vivo)"""
+    segmentos.OBSIDIAN_INDICE_EN_DISCO = directorio_disco
+    tracemalloc.start()
+    indice = IndiceVault(ruta)
+    indice.construir()
+    memoria = tracemalloc.get_traced_memory()[0] / 1024 / 1024
+    tracemalloc.stop()
+    return indice, memoria
+
+def benchmark_segmentos(ruta: Path, directorio: Path):
+    """Índice de términos en RAM frente a segmentos en disco mapeados en memoria"""
+    print("\n💽 Índice de términos en segmentos en disco")
+    print("=" * 50)
+    configurado = segmentos.OBSIDIAN_INDICE_EN_DISCO
+    en_ram, memoria_ram = _construir_midiendo(ruta, "")
+    en_disco, memoria_disco = _construir_midiendo(ruta, str(directorio))
+    segmentos.OBSIDIAN_INDICE_EN_DISCO = configurado
+    
+    print(f"   🧠 En RAM: {memoria_ram:.1f}MB | {en_ram.terminos.describir()}")
+    print(f"   💽 En disco: {memoria_disco:.1f}MB | {en_disco.terminos.describir()}")
+    for consulta in ("estoicismo", "medit", "python datos", "nota 1"):
+        t_ram = medir(en_ram.candidatos, consulta)
+        t_disco = medir(en_disco.candidatos, consulta)
+        print(f"   🔤 '{consulta}': RAM {t_ram * 1000:.2f}ms | disco {t_disco * 1000:.2f}ms (x{t_disco / t_ram:.1f})")
+    en_disco.cancelar()
+
+def benchmark_tocar(ruta: Path):
+    """Refresco tras tocar el mtime de todas las notas (huella) frente a reanalizarlas"""
+    print("\n👆 Todas las notas tocadas sin cambiar su contenido")
+    print("=" * 50)
+    indice = IndiceVault(ruta)
+    indice.construir()
+    archivos = list(ruta.rglob("*.md"))
+    
+    def tocar_todo():
+        ahora = time.time()
+        for archivo in archivos:
+            os.utime(archivo, (ahora, ahora))
+    
+    mejor_huella = float("inf")
+    for _ in range(3):
+        time.sleep(0.01)
+        tocar_todo()
+        inicio = time.perf_counter()
+        cambios = indice.refrescar(forzar=True)
+        mejor_huella = min(mejor_huella, time.perf_counter() - inicio)
+    t_completo = medir(lambda: IndiceVault(ruta).construir())
+    
+    print(f"   #️⃣ Solo huella: {mejor_huella:.2f}s ({cambios} notas reindexadas de {len(archivos)})")
+    print(f"   📖 Reanálisis completo: {t_completo:.2f}s (x{t_completo / mejor_huella:.1f})")
+
+async def _importar_de_una_en_una(notas: list) -> float:
+    """Segundos para crear las notas con una llamada a crear_nota por nota"""
+    # En proceso no hay límites por cliente (solo se activan en HTTP): se mide la escritura
+    async with Client(obs.mcp) as cliente:
+        inicio = time.perf_counter()
+        for nota in notas:
+            await cliente.call_tool("crear_nota", nota)
+        return time.perf_counter() - inicio
+
+async def _importar_en_bloque(origen: Path) -> float:
+    """Segundos para importar las notas con una única llamada a importar_notas"""
+    async with Client(obs.mcp) as cliente:
+        inicio = time.perf_counter()
+        await cliente.call_tool("importar_notas", {"origen": str(origen)})
+        return time.perf_counter() - inicio
+
+def arbol_profundo(ruta: Path, profundidad: int, ramas: int, notas_por_carpeta: int) -> Path:
+    """Árbol de carpetas anidadas (ramas^profundidad hojas) con unas pocas notas en cada carpeta"""
+    pendientes = [(ruta, 0)]
+    while pendientes:
+        carpeta, nivel = pendientes.pop()
+        carpeta.mkdir(parents=True, exist_ok=True)
+        for i in range(notas_por_carpeta):
+            (carpeta / f"Nota {nivel}-{i}.md").write_text(f"# Nota {i}\n\nNivel {nivel} de {carpeta.name}\n", encoding="utf-8")
+        if nivel < profundidad:
+            pendientes.extend((carpeta / f"Rama {j}", nivel + 1) for j in range(ramas))
+    return ruta
+
+def benchmark_refresco(directorio: Path, profundidad: int = 6, ramas: int = 3, notas_por_carpeta: int = 10):
+    """Detección de cambios en un árbol profundo: stat de cada nota frente a podar por mtime de carpeta"""
+    print("\n🌲 Refresco en un árbol de carpetas profundo")
+    print("=" * 50)
+    ruta = arbol_profundo(directorio, profundidad, ramas, notas_por_carpeta)
+    
+    def con_rglob():
+        for archivo in ruta.rglob("*"):
+            archivo.stat()
+    
+    explorador = ExploradorVault(ruta, ReglasIgnorar.del_vault(ruta))
+    explorador.explorar()
+    # Las carpetas recién creadas caen dentro del margen de mtime no fiable
+    time.sleep(MARGEN_MTIME_CARPETA_NS / 1e9)
+    explorador.explorar()
+    t_rglob = medir(con_rglob)
+    t_completo = medir(explorador.explorar, True)
+    stats_completo = explorador.stats
+    t_podado = medir(explorador.explorar, False)
+    stats_podado = explorador.stats
+    
+    hoja = ruta.joinpath(*["Rama 0"] * profundidad)
+    (hoja / "Nueva.md").write_text("# Nueva\n", encoding="utf-8")
+    inicio = time.perf_counter()
+    cambiados, _ = explorador.explorar(False)
+    t_cambio = time.perf_counter() - inicio
+    
+    num_carpetas = len(explorador.carpetas)
+    num_archivos = sum(len(listado.archivos) for listado in explorador.carpetas.values())
+    print(f"   🗂️ {num_carpetas} carpetas, {num_archivos} notas, {profundidad} niveles")
+    print(f"   🐢 rglob + stat de cada archivo: {t_rglob * 1000:.0f}ms")
+    print(f"   📋 scandir completo: {t_completo * 1000:.0f}ms ({stats_completo} stats)")
+    print(f"   ✂️ Podado por mtime de carpeta: {t_podado * 1000:.0f}ms ({stats_podado} stats, x{t_rglob / t_podado:.1f})")
+    print(f"   🆕 Nota nueva en la hoja más honda: {t_cambio * 1000:.0f}ms ({explorador.stats} stats, "
+          f"{explorador.listadas} carpeta listada, {len(cambiados)} cambio)")
+
+def _vault_indexado(ruta: Path) -> Vault:
+    """Vault vacío configurado como único vault del servidor, con el índice ya listo"""
+    ruta.mkdir(parents=True)
+    obs.configurar_vaults({"importacion": str(ruta)})
+    vault = obs.obtener_vault()
+    vault.asegurar_indice()
+    while vault.indice_listo() is None:
+        time.sleep(0.01)
+    return vault
+
+def benchmark_importacion(directorio: Path, num_notas: int, carpetas: int = 20):
+    """Notas por segundo importando un JSONL en bloque frente a una llamada a crear_nota por nota"""
+    print("\n📥 Importación en bloque frente a crear_nota")
+    print("=" * 50)
+    rng = random.Random(7)
+    notas = [{
+        "titulo": f"Importada {i}",
+        "contenido": " ".join(rng.choices(PALABRAS, k=200)),
+        "carpeta": f"Carpeta {i % carpetas:02d}",
+        "etiquetas": rng.choice(PALABRAS),
+    } for i in range(num_notas)]
+    origen = directorio / "notas.jsonl"
+    directorio.mkdir(parents=True, exist_ok=True)
+    with open(origen, "w", encoding="utf-8") as f:
+        for nota in notas:
+            f.write(json.dumps(nota, ensure_ascii=False) + "\n")
+    
+    _vault_indexado(directorio / "de_una_en_una")
+    t_llamadas = asyncio.run(_importar_de_una_en_una(notas))
+    _vault_indexado(directorio / "en_bloque")
+    t_bloque = asyncio.run(_importar_en_bloque(origen))
+    
+    print(f"   🐢 crear_nota ({num_notas} llamadas): {t_llamadas:.2f}s ({num_notas / t_llamadas:.0f} notas/s)")
+    print(f"   🚚 importar_notas (1 llamada): {t_bloque:.2f}s ({num_notas / t_bloque:.0f} notas/s, x{t_llamadas / t_bloque:.1f})")
+
+def grafo_sintetico(num_nodos: int, enlaces_por_nota: int = 8, semilla: int = 42) -> list:
+    """Enlaces salientes aleatorios donde unas pocas notas reciben la mayoría de enlaces"""
+    rng = random.Random(semilla)
+    salientes = []
+    for i in range(num_nodos):
+        # Distribución sesgada hacia los primeros nodos (notas índice muy enlazadas)
+        destinos = {int(num_nodos * rng.random() ** 3) for _ in range(rng.randrange(enlaces_por_nota * 2))}
+        destinos.discard(i)
+        salientes.append(sorted(destinos))
+    return salientes
+
+def benchmark_grafo(num_nodos: int):
+    """Construcción del grafo, PageRank, componentes y camino más corto sobre un grafo grande"""
+    print("\n🕸️ Análisis del grafo de enlaces")
+    print("=" * 50)
+    if np is None and num_nodos > 50000:
+        print(f"   ⚠️ Sin numpy: se usan 50000 nodos en lugar de {num_nodos}")
+        num_nodos = 50000
+    salientes = grafo_sintetico(num_nodos)
+    inicio = time.perf_counter()
+    grafo = GrafoEnlaces([f"Nota {i}.md" for i in range(num_nodos)], salientes)
+    t_construir = time.perf_counter() - inicio
+    
+    inicio = time.perf_counter()
+    grafo.pagerank()
+    t_pagerank = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    num_componentes = len(set(grafo.componentes()))
+    t_componentes = time.perf_counter() - inicio
+    t_camino = medir(grafo.camino, num_nodos - 1, num_nodos // 2)
+    
+    calculo = "numpy" if np is not None else "Python puro"
+    print(f"   🧱 {num_nodos} notas, {grafo.num_enlaces} enlaces: CSR en {t_construir:.2f}s")
+    print(f"   🏆 PageRank ({calculo}): {t_pagerank:.2f}s")
+    print(f"   🧩 Componentes ({calculo}): {t_componentes:.2f}s ({num_componentes} componentes)")
+    print(f"   🧭 Camino más corto: {t_camino * 1000:.1f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del servidor MCP de Obsidian")
+    parser.add_argument("--notas", type=int, default=5000, help="Notas del vault sintético")
+    parser.add_argument("--vault", default="", help="Usar un vault existente en lugar del sintético")
+    parser.add_argument("--nodos-grafo", type=int, default=500000, help="Notas del grafo sintético de enlaces")
+    args = parser.parse_args()
+    
+    print("🏁 Benchmarks del Servidor MCP de Obsidian")
+    print("=" * 70)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.vault:
+            ruta = Path(args.vault)
+        else:
+            inicio = time.perf_counter()
+            ruta = crear_vault_sintetico(Path(tmp) / "vault", args.notas)
+            print(f"📚 Vault sintético: {args.notas} notas en {time.perf_counter() - inicio:.1f}s")
+        
+        vault = Vault("benchmark", str(ruta))
+        benchmark_arranque(ruta)
+        benchmark_primer_resultado(ruta)
+        benchmark_metadatos(ruta)
+        benchmark_segmentos(ruta, Path(tmp) / "segmentos")
+        benchmark_tocar(ruta)
+        benchmark_refresco(Path(tmp) / "arbol")
+        benchmark_importacion(Path(tmp) / "importacion", min(args.notas, 5000))
+        benchmark_grafo(args.nodos_grafo)
+        benchmark_procesos(vault)
+    
+    print("\n" + "=" * 70)
+    print("✅ Benchmarks completados")
+
+if __name__ == "__main__":
+    main()
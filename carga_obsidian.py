@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Generador de carga para el servidor MCP de Obsidian
+Lanza N clientes concurrentes que llaman a una mezcla de herramientas y
+mide el rendimiento (llamadas por segundo) y la latencia de cola (p50/p95/p99)
+"""
+
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from fastmcp import Client
+
+import obsidian_mcp_server as obs
+from benchmark_obsidian import crear_vault_sintetico
+
+# Mezcla de llamadas: (peso, herramienta, argumentos)
+MEZCLA = [
+    (30, "leer_nota", lambda rng, n: {"nombre_archivo": f"Nota {rng.randrange(n)}"}),
+    (25, "buscar_en_notas", lambda rng, n: {"texto": rng.choice(["estoicismo", "memoria", "Nota 1", "proyecto idea"])}),
+    (15, "buscar_en_notas", lambda rng, n: {"texto": "nota", "solo_titulos": True}),
+    (10, "buscar_notas_por_fecha", lambda rng, n: {"fecha_desde": "2020-01-01"}),
+    (10, "listar_notas", lambda rng, n: {"carpeta": f"Carpeta {rng.randrange(20):02d}"}),
+    (5, "estadisticas_vault", lambda rng, n: {}),
+    (5, "estado_indices", lambda rng, n: {}),
+]
+
+# Espera tras un rechazo por límite de llamadas: empieza en el mínimo, se dobla con
+# cada rechazo seguido hasta el máximo y vuelve al mínimo con la siguiente llamada atendida
+ESPERA_RECHAZO_MINIMA = 0.05
+ESPERA_RECHAZO_MAXIMA = 1.0
+
+def es_rechazo_por_limite(error: Exception) -> bool:
+    return "Demasiadas llamadas" in str(error)
+
+def percentil(valores: list, p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+async def cliente_simulado(destino, id_cliente: int, duracion: float, num_notas: int, pausa: float,
+                           latencias: dict, errores: dict, rechazos: dict):
+    """
+    Un cliente que llama herramientas en bucle hasta agotar la duración. Si
+    el servidor lo rechaza por sus límites por cliente, espera (cada vez más)
+    antes de seguir, y el rechazo no cuenta como llamada ni como error.
+    """
+    rng = random.Random(id_cliente)
+    pesos = [peso for peso, _, _ in MEZCLA]
+    espera_rechazo = ESPERA_RECHAZO_MINIMA
+    async with Client(destino) as cliente:
+        fin = time.perf_counter() + duracion
+        while time.perf_counter() < fin:
+            _, herramienta, argumentos = rng.choices(MEZCLA, weights=pesos)[0]
+            inicio = time.perf_counter()
+            try:
+                await cliente.call_tool(herramienta, argumentos(rng, num_notas))
+                latencias.setdefault(herramienta, []).append(time.perf_counter() - inicio)
+                espera_rechazo = ESPERA_RECHAZO_MINIMA
+            except Exception as e:
+                if es_rechazo_por_limite(e):
+                    rechazos[herramienta] = rechazos.get(herramienta, 0) + 1
+                    await asyncio.sleep(espera_rechazo)
+                    espera_rechazo = min(ESPERA_RECHAZO_MAXIMA, espera_rechazo * 2)
+                    continue
+                clave = f"{herramienta}: {str(e)[:60]}"
+                errores[clave] = errores.get(clave, 0) + 1
+            if pausa:
+                await asyncio.sleep(pausa)
+
+async def ejecutar_carga(destino, clientes: int, duracion: float, num_notas: int, pausa: float, hilos: int) -> tuple:
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=hilos))
+    latencias: dict = {}
+    errores: dict = {}
+    rechazos: dict = {}
+    inicio = time.perf_counter()
+    await asyncio.gather(*(
+        cliente_simulado(destino, i, duracion, num_notas, pausa, latencias, errores, rechazos)
+        for i in range(clientes)
+    ))
+    return latencias, errores, rechazos, time.perf_counter() - inicio
+
+def mostrar_informe(latencias: dict, errores: dict, rechazos: dict, segundos: float, clientes: int):
+    todas = [l for lista in latencias.values() for l in lista]
+    total_errores = sum(errores.values())
+    
+    print(f"\n📊 Resultados ({clientes} clientes, {segundos:.1f}s)")
+    print("=" * 70)
+    print(f"   ✅ Llamadas completadas: {len(todas)} | ❌ Errores: {total_errores}")
+    if rechazos:
+        detalle = ", ".join(f"{h} {n}" for h, n in sorted(rechazos.items(), key=lambda x: -x[1]))
+        print(f"   🚦 Rechazadas por los límites por cliente (fuera del rendimiento y las latencias): "
+              f"{sum(rechazos.values())} ({detalle})")
+    print(f"   🚀 Rendimiento: {len(todas) / segundos:.1f} llamadas/s")
+    print(f"   ⏱️ Latencia global: p50 {percentil(todas, 50) * 1000:.1f}ms | "
+          f"p95 {percentil(todas, 95) * 1000:.1f}ms | p99 {percentil(todas, 99) * 1000:.1f}ms | "
+          f"máx {max(todas, default=0) * 1000:.1f}ms")
+    
+    print("\n   Por herramienta:")
+    for herramienta, lista in sorted(latencias.items()):
+        print(f"   🛠️ {herramienta:<24} {len(lista):>6} llamadas | p50 {percentil(lista, 50) * 1000:>7.1f}ms | "
+              f"p95 {percentil(lista, 95) * 1000:>7.1f}ms | p99 {percentil(lista, 99) * 1000:>7.1f}ms")
+    
+    if errores:
+        print("\n   Errores:")
+        for clave, n in sorted(errores.items(), key=lambda x: -x[1]):
+            print(f"   ❌ {n:>5} × {clave}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Generador de carga para el servidor MCP de Obsidian")
+    parser.add_argument("--clientes", type=int, default=8, help="Clientes concurrentes")
+    parser.add_argument("--duracion", type=float, default=10, help="Segundos de carga")
+    parser.add_argument("--pausa", type=float, default=0, help="Segundos de espera entre llamadas de cada cliente")
+    parser.add_argument("--hilos", type=int, default=16, help="Hilos del servidor para las herramientas")
+    parser.add_argument("--notas", type=int, default=2000, help="Notas del vault sintético")
+    parser.add_argument("--vault", default="", help="Usar un vault existente en lugar del sintético")
+    parser.add_argument("--url", default="", help="Atacar un servidor HTTP ya arrancado (ej: http://127.0.0.1:8000/mcp/)")
+    parser.add_argument("--con-limites", action="store_true",
+                        help="Aplicar en el propio proceso los límites por cliente del modo HTTP")
+    args = parser.parse_args()
+    
+    print("🏋️ Generador de carga del Servidor MCP de Obsidian")
+    print("=" * 70)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.url:
+            destino = args.url
+            num_notas = args.notas
+            print(f"🌐 Servidor: {args.url}")
+        else:
+            if args.vault:
+                ruta = Path(args.vault)
+            else:
+                ruta = crear_vault_sintetico(Path(tmp) / "vault", args.notas)
+                print(f"📚 Vault sintético: {args.notas} notas")
+            
+            # El servidor corre en este mismo proceso: cada cliente usa el transporte en memoria
+            obs.configurar_vaults({"carga": str(ruta)})
+            if args.con_limites:
+                obs.instalar_limites_por_cliente()
+            obs.iniciar_indexado()
+            destino = obs.mcp
+            num_notas = args.notas
+        
+        print(f"🧑‍🤝‍🧑 {args.clientes} clientes durante {args.duracion:.0f}s...")
+        latencias, errores, rechazos, segundos = asyncio.run(
+            ejecutar_carga(destino, args.clientes, args.duracion, num_notas, args.pausa, args.hilos)
+        )
+    
+    mostrar_informe(latencias, errores, rechazos, segundos, args.clientes)
+
+if __name__ == "__main__":
+    main()
@@ -5,10 +5,20 @@ Este servidor incluye herramientas más prácticas y casos de uso reales
 """
 
 import asyncio
+import base64
+import bisect
+import codecs
+import heapq
 import os
 import json
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
 from pathlib import Path
+from typing import Optional
 from fastmcp import FastMCP
 
 # Crear el servidor MCP avanzado
@@ -16,13 +26,121 @@ mcp = FastMCP("Servidor MCP Avanzado")
 
 # ========== HERRAMIENTAS DE SISTEMA ==========
 
+# Listado de directorios: entradas por página, hilos que miden carpetas a la
+# vez y carpetas cuyo tamaño propio se recuerda
+ENTRADAS_POR_PAGINA = 200
+HILOS_TAMANO = min(8, (os.cpu_count() or 1) * 2)
+MAX_CARPETAS_MEDIDAS = 100_000
+
+ORDENES_LISTADO = ("nombre", "tamaño", "fecha")
+
+# Ruta -> (mtime_ns, bytes de sus archivos, nº de archivos, subcarpetas), del menos al más usado
+_carpetas_medidas: "OrderedDict[str, tuple]" = OrderedDict()
+_carpetas_lock = threading.Lock()
+
+def _tamano_legible(num_bytes: int) -> str:
+    for unidad in ("B", "KB", "MB", "GB"):
+        if num_bytes < 1024 or unidad == "GB":
+            return f"{num_bytes:.0f} {unidad}" if unidad == "B" else f"{num_bytes:.1f} {unidad}"
+        num_bytes /= 1024
+
+def _medir_carpeta(ruta: str) -> Optional[tuple]:
+    """
+    (bytes, archivos, subcarpetas) propios de una carpeta, sin bajar a sus
+    subcarpetas. Se reutiliza mientras no cambie el mtime de la carpeta,
+    es decir, mientras no se creen, borren o renombren entradas en ella.
+    """
+    try:
+        mtime = os.stat(ruta).st_mtime_ns
+        with _carpetas_lock:
+            guardada = _carpetas_medidas.get(ruta)
+            if guardada is not None and guardada[0] == mtime:
+                _carpetas_medidas.move_to_end(ruta)
+                return guardada[1:]
+        
+        total = 0
+        archivos = 0
+        subcarpetas = []
+        with os.scandir(ruta) as entradas:
+            for entrada in entradas:
+                try:
+                    if entrada.is_dir(follow_symlinks=False):
+                        subcarpetas.append(entrada.path)
+                    else:
+                        total += entrada.stat(follow_symlinks=False).st_size
+                        archivos += 1
+                except OSError:
+                    continue
+    except OSError:
+        return None
+    
+    with _carpetas_lock:
+        _carpetas_medidas[ruta] = (mtime, total, archivos, subcarpetas)
+        _carpetas_medidas.move_to_end(ruta)
+        while len(_carpetas_medidas) > MAX_CARPETAS_MEDIDAS:
+            _carpetas_medidas.popitem(last=False)
+    return total, archivos, subcarpetas
+
+def tamanos_recursivos(raices: list) -> dict:
+    """
+    {carpeta: (bytes, archivos)} de todo el árbol bajo cada carpeta, como
+    du. Se avanza nivel a nivel y las carpetas de cada nivel se miden a la
+    vez en un pool de hilos; las que no cambiaron salen de la caché.
+    """
+    totales = {raiz: [0, 0] for raiz in raices}
+    frontera = [(raiz, raiz) for raiz in raices]
+    if not frontera:
+        return {}
+    with ThreadPoolExecutor(max_workers=HILOS_TAMANO) as pool:
+        while frontera:
+            siguiente = []
+            for (raiz, _), medida in zip(frontera, pool.map(_medir_carpeta, [ruta for _, ruta in frontera])):
+                if medida is None:
+                    continue
+                propios, archivos, subcarpetas = medida
+                totales[raiz][0] += propios
+                totales[raiz][1] += archivos
+                siguiente.extend((raiz, subcarpeta) for subcarpeta in subcarpetas)
+            frontera = siguiente
+    return {raiz: tuple(total) for raiz, total in totales.items()}
+
+def _stat(entrada: os.DirEntry) -> Optional[os.stat_result]:
+    """stat de la entrada (scandir lo guarda en ella), o None si no se puede"""
+    try:
+        return entrada.stat()
+    except OSError:
+        return None
+
+def _codificar_cursor(ordenar: str, descendente: bool, clave: tuple, vistas: int) -> str:
+    datos = json.dumps([ordenar, descendente, list(clave), vistas], ensure_ascii=False)
+    return base64.urlsafe_b64encode(datos.encode("utf-8")).decode("ascii")
+
+def _leer_cursor(cursor: str, ordenar: str, descendente: bool) -> tuple:
+    """(clave de la última entrada mostrada, entradas ya mostradas) o (None, 0)"""
+    if not cursor:
+        return None, 0
+    try:
+        orden, desc, clave, vistas = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError):
+        raise ValueError("cursor no válido (usa el valor de la respuesta anterior)")
+    if orden != ordenar or desc != descendente:
+        raise ValueError("el cursor es de un listado con otro orden; repite la llamada con el mismo ordenar/descendente")
+    return tuple(clave), vistas
+
 @mcp.tool()
-def listar_archivos(directorio: str = ".") -> str:
+def listar_archivos(directorio: str = ".", ordenar: str = "nombre", descendente: bool = False,
+                    limite: int = ENTRADAS_POR_PAGINA, cursor: str = "", tamano_recursivo: bool = False) -> str:
     """
-    Lista los archivos y directorios en una ruta específica
+    Lista los archivos y directorios en una ruta específica, por páginas
     
     Args:
         directorio: Ruta del directorio a listar (por defecto: directorio actual)
+        ordenar: "nombre", "tamaño" o "fecha" (de modificación); los directorios van siempre primero
+        descendente: Si invertir el orden
+        limite: Entradas por página (por defecto: 200)
+        cursor: Cursor de la página anterior para ver la siguiente
+        tamano_recursivo: Si mostrar el tamaño total de cada directorio, como du
+            (se calcula en paralelo y se recuerda mientras no cambie cada carpeta)
     """
     try:
         path = Path(directorio)
@@ -32,45 +150,250 @@ def listar_archivos(directorio: str = ".") -> str:
         if not path.is_dir():
             return f"❌ '{directorio}' no es un directorio"
         
-        archivos = []
-        directorios = []
+        ordenar = "tamaño" if ordenar == "tamano" else ordenar
+        if ordenar not in ORDENES_LISTADO:
+            return f"❌ Orden '{ordenar}' no válido (usa: {', '.join(ORDENES_LISTADO)})"
+        limite = max(1, limite)
+        ultima, vistas = _leer_cursor(cursor, ordenar, descendente)
+        
+        # Una sola pasada con scandir: el tipo de cada entrada viene del propio
+        # directorio y solo se hace stat cuando el orden lo necesita
+        with os.scandir(path) as iterador:
+            entradas = list(iterador)
+        es_directorio = {entrada.name: entrada.is_dir() for entrada in entradas}
+        num_directorios = sum(es_directorio.values())
+        
+        tamanos = {}
+        if tamano_recursivo and ordenar == "tamaño":
+            tamanos = tamanos_recursivos([e.path for e in entradas if es_directorio[e.name]])
+        
+        def clave(entrada: os.DirEntry) -> tuple:
+            carpeta = es_directorio[entrada.name]
+            if ordenar == "nombre":
+                valor = entrada.name.lower()
+            elif ordenar == "fecha":
+                stats = _stat(entrada)
+                valor = stats.st_mtime_ns if stats else 0
+            elif carpeta:
+                valor = tamanos.get(entrada.path, (0, 0))[0]
+            else:
+                stats = _stat(entrada)
+                valor = stats.st_size if stats else 0
+            # Con orden inverso se usa nlargest: el grupo se niega para que los directorios sigan primero
+            grupo = 0 if carpeta else 1
+            return (-grupo if descendente else grupo, valor, entrada.name)
         
-        for item in path.iterdir():
-            if item.is_dir():
-                directorios.append(f"📁 {item.name}/")
+        # Paginación por clave: solo las entradas posteriores a la última mostrada,
+        # y de ellas las `limite` primeras sin ordenar el directorio entero. La
+        # clave termina en el nombre, así que es única y basta para compararlas
+        candidatas = map(clave, entradas)
+        if ultima is not None:
+            candidatas = (c for c in candidatas if (c < ultima if descendente else c > ultima))
+        elegir = heapq.nlargest if descendente else heapq.nsmallest
+        claves = elegir(limite + 1, candidatas)
+        hay_mas = len(claves) > limite
+        claves = claves[:limite]
+        por_nombre = {entrada.name: entrada for entrada in entradas}
+        pagina = [por_nombre[c[-1]] for c in claves]
+        
+        if tamano_recursivo and not tamanos:
+            tamanos = tamanos_recursivos([e.path for e in pagina if es_directorio[e.name]])
+        
+        directorios = []
+        archivos = []
+        for item in pagina:
+            if es_directorio[item.name]:
+                linea = f"📁 {item.name}/"
+                if item.path in tamanos:
+                    total, num_archivos = tamanos[item.path]
+                    linea += f" ({_tamano_legible(total)}, {num_archivos} archivos)"
+                directorios.append(linea)
             else:
-                size = item.stat().st_size
-                archivos.append(f"📄 {item.name} ({size} bytes)")
+                stats = _stat(item)
+                archivos.append(f"📄 {item.name} ({stats.st_size if stats else '?'} bytes)")
         
         resultado = f"📂 Contenido de '{directorio}':\n\n"
         
         if directorios:
             resultado += "Directorios:\n"
-            for dir_item in sorted(directorios):
+            for dir_item in directorios:
                 resultado += f"  {dir_item}\n"
             resultado += "\n"
         
         if archivos:
             resultado += "Archivos:\n"
-            for archivo in sorted(archivos):
+            for archivo in archivos:
                 resultado += f"  {archivo}\n"
         
-        if not directorios and not archivos:
+        if not entradas:
             resultado += "  (directorio vacío)"
+        elif pagina:
+            resultado += (("\n" if archivos else "") + f"📊 Entradas {vistas + 1}-{vistas + len(pagina)} de {len(entradas)} "
+                          f"({num_directorios} directorios, {len(entradas) - num_directorios} archivos)\n")
+        if hay_mas:
+            resultado += f"▶️ Siguiente página: cursor=\"{_codificar_cursor(ordenar, descendente, claves[-1], vistas + len(pagina))}\""
         
         return resultado
         
     except Exception as e:
         return f"❌ Error al listar archivos: {e}"
 
+# Lectura de archivos: tamaño de los bloques que se leen (hacia delante o
+# hacia atrás desde el final) y archivos cuyo índice de líneas se recuerda
+BLOQUE_LECTURA = 64 * 1024
+MAX_INDICES_LINEAS = 32
+
+MODOS_LECTURA = ("inicio", "final", "rango", "seguir")
+
+class IndiceLineas:
+    """
+    Índice disperso de líneas de un archivo: al principio de cada bloque de
+    BLOQUE_LECTURA bytes guarda cuántas líneas terminan antes. Para llegar
+    a una línea basta con saltar al bloque anterior a ella y contar saltos
+    de línea desde ahí; ocupa unos 250KB por GB de archivo.
+    """
+    
+    def __init__(self, ruta: Path):
+        self.desplazamientos = array("q")
+        self.lineas_antes = array("q")
+        saltos = 0
+        tamano = 0
+        ultimo = b""
+        with open(ruta, "rb") as file:
+            while True:
+                self.desplazamientos.append(tamano)
+                self.lineas_antes.append(saltos)
+                bloque = file.read(BLOQUE_LECTURA)
+                if not bloque:
+                    break
+                saltos += bloque.count(b"\n")
+                tamano += len(bloque)
+                ultimo = bloque
+        # Una última línea sin salto de línea final también cuenta
+        self.total_lineas = saltos + (1 if ultimo and not ultimo.endswith(b"\n") else 0)
+    
+    def posicion(self, linea: int) -> tuple:
+        """(desplazamiento desde el que leer, saltos de línea a pasar para llegar a `linea`)"""
+        if linea <= 1:
+            return 0, 0
+        # El último bloque que empieza antes del salto de línea que abre `linea`
+        i = bisect.bisect_left(self.lineas_antes, linea - 1) - 1
+        return self.desplazamientos[i], linea - 1 - self.lineas_antes[i]
+
+# Ruta -> ((inodo, tamaño, mtime), índice), del menos al más usado
+_indices_lineas: "OrderedDict[str, tuple]" = OrderedDict()
+_indices_lock = threading.Lock()
+
+def indice_lineas(path: Path) -> IndiceLineas:
+    """Índice de líneas del archivo, reutilizado mientras no cambien su inodo, tamaño ni mtime"""
+    stats = path.stat()
+    clave = (stats.st_ino, stats.st_size, stats.st_mtime_ns)
+    ruta = str(path.resolve())
+    with _indices_lock:
+        guardado = _indices_lineas.get(ruta)
+        if guardado is not None and guardado[0] == clave:
+            _indices_lineas.move_to_end(ruta)
+            return guardado[1]
+    indice = IndiceLineas(path)
+    with _indices_lock:
+        _indices_lineas[ruta] = (clave, indice)
+        _indices_lineas.move_to_end(ruta)
+        while len(_indices_lineas) > MAX_INDICES_LINEAS:
+            _indices_lineas.popitem(last=False)
+    return indice
+
+def _enesimo_salto(bloque: bytes, n: int) -> int:
+    """Posición del n-ésimo salto de línea del bloque (n >= 1)"""
+    pos = -1
+    for _ in range(n):
+        pos = bloque.index(b"\n", pos + 1)
+    return pos
+
+def _tomar_lineas(file, saltar: int, cuantas: int) -> tuple:
+    """
+    Desde la posición actual del archivo, pasa `saltar` líneas y devuelve
+    (bytes de las `cuantas` siguientes, si quedan más detrás)
+    """
+    tomados = []
+    while True:
+        bloque = file.read(BLOQUE_LECTURA)
+        if not bloque:
+            return b"".join(tomados), False
+        if saltar:
+            saltos = bloque.count(b"\n")
+            if saltos < saltar:
+                saltar -= saltos
+                continue
+            bloque = bloque[_enesimo_salto(bloque, saltar) + 1:]
+            saltar = 0
+        saltos = bloque.count(b"\n")
+        if saltos >= cuantas:
+            fin = _enesimo_salto(bloque, cuantas) + 1
+            tomados.append(bloque[:fin])
+            return b"".join(tomados), fin < len(bloque) or bool(file.read(1))
+        tomados.append(bloque)
+        cuantas -= saltos
+
+def _ultimas_lineas(file, cuantas: int) -> tuple:
+    """
+    Lee hacia atrás desde el final, bloque a bloque, hasta reunir `cuantas`
+    líneas. Devuelve (bytes de esas líneas, si hay más antes)
+    """
+    pos = file.seek(0, os.SEEK_END)
+    partes = []
+    saltos = 0
+    termina_en_salto = None
+    while pos > 0:
+        leer = min(BLOQUE_LECTURA, pos)
+        pos -= leer
+        file.seek(pos)
+        bloque = file.read(leer)
+        if termina_en_salto is None:
+            termina_en_salto = bloque.endswith(b"\n")
+        partes.append(bloque)
+        saltos += bloque.count(b"\n")
+        # Hace falta también el salto de línea que precede a la primera línea pedida
+        if saltos - termina_en_salto >= cuantas:
+            break
+    datos = b"".join(reversed(partes))
+    if termina_en_salto:
+        datos = datos[:-1]
+    trozos = datos.rsplit(b"\n", cuantas)
+    hay_antes = len(trozos) > cuantas
+    datos = b"\n".join(trozos[1:] if hay_antes else trozos)
+    return datos + (b"\n" if termina_en_salto else b""), hay_antes
+
+def _texto(datos: bytes) -> str:
+    return datos.decode("utf-8").replace("\r\n", "\n")
+
+def _cursor_seguir(estado: os.stat_result, posicion: int) -> str:
+    """Cursor del modo "seguir": identifica el archivo (dispositivo e inodo) y el byte leído"""
+    return f"{estado.st_dev}:{estado.st_ino}:{posicion}"
+
+def _leer_cursor_seguir(cursor: str) -> tuple:
+    """(dispositivo, inodo, byte) de un cursor del modo "seguir" """
+    try:
+        dispositivo, inodo, posicion = (int(parte) for parte in cursor.split(":"))
+    except ValueError:
+        raise ValueError(f"cursor '{cursor}' no válido (usa el valor de ▶️ cursor= de la llamada anterior)") from None
+    if posicion < 0:
+        raise ValueError(f"cursor '{cursor}' no válido (usa el valor de ▶️ cursor= de la llamada anterior)")
+    return dispositivo, inodo, posicion
+
 @mcp.tool()
-def leer_archivo(ruta: str, max_lineas: int = 50) -> str:
+def leer_archivo(ruta: str, max_lineas: int = 50, modo: str = "inicio", desde_linea: int = 1, cursor: str = "") -> str:
     """
-    Lee el contenido de un archivo de texto
+    Lee parte de un archivo de texto sin cargarlo entero en memoria
     
     Args:
         ruta: Ruta del archivo a leer
         max_lineas: Número máximo de líneas a mostrar (por defecto: 50)
+        modo: "inicio" (primeras líneas), "final" (últimas), "rango" (a partir de
+            desde_linea) o "seguir" (solo lo añadido desde `cursor`, como tail -f)
+        desde_linea: Primera línea a mostrar en modo "rango" (la primera es 1)
+        cursor: En modo "seguir", el cursor que devolvió la llamada anterior
+            ("" = empezar a seguir ahora, mostrando las últimas líneas). Identifica
+            el archivo además de la posición, así que si se rota se vuelve a empezar
     """
     try:
         path = Path(ruta)
@@ -80,22 +403,74 @@ def leer_archivo(ruta: str, max_lineas: int = 50) -> str:
         if not path.is_file():
             return f"❌ '{ruta}' no es un archivo"
         
-        with open(path, 'r', encoding='utf-8') as file:
-            lineas = file.readlines()
+        if modo not in MODOS_LECTURA:
+            return f"❌ Modo '{modo}' no válido (usa: {', '.join(MODOS_LECTURA)})"
         
-        total_lineas = len(lineas)
+        max_lineas = max(1, max_lineas)
+        resultado = f"📄 Archivo: {ruta}\n"
         
-        if total_lineas > max_lineas:
-            contenido = ''.join(lineas[:max_lineas])
-            resultado = f"📄 Archivo: {ruta}\n"
-            resultado += f"📊 Mostrando las primeras {max_lineas} de {total_lineas} líneas\n\n"
-            resultado += contenido
-            resultado += f"\n... ({total_lineas - max_lineas} líneas más)"
-        else:
-            contenido = ''.join(lineas)
-            resultado = f"📄 Archivo: {ruta}\n"
-            resultado += f"📊 Total: {total_lineas} líneas\n\n"
-            resultado += contenido
+        with open(path, "rb") as file:
+            if modo == "inicio":
+                datos, hay_mas = _tomar_lineas(file, 0, max_lineas)
+                if hay_mas:
+                    resultado += f"📊 Mostrando las primeras {max_lineas} líneas\n\n"
+                    resultado += _texto(datos)
+                    resultado += f"\n... (el archivo continúa: modo='rango' con desde_linea={max_lineas + 1})"
+                else:
+                    total_lineas = datos.count(b"\n") + (1 if datos and not datos.endswith(b"\n") else 0)
+                    resultado += f"📊 Total: {total_lineas} líneas\n\n"
+                    resultado += _texto(datos)
+                
+            elif modo == "final":
+                datos, hay_antes = _ultimas_lineas(file, max_lineas)
+                if hay_antes:
+                    resultado += f"📊 Mostrando las últimas {max_lineas} líneas\n\n... (líneas anteriores)\n"
+                else:
+                    resultado += "📊 Archivo completo\n\n"
+                resultado += _texto(datos)
+                
+            elif modo == "rango":
+                indice = indice_lineas(path)
+                if desde_linea < 1 or desde_linea > max(indice.total_lineas, 1):
+                    return f"❌ La línea {desde_linea} está fuera del archivo ({indice.total_lineas} líneas)"
+                desplazamiento, saltar = indice.posicion(desde_linea)
+                file.seek(desplazamiento)
+                datos, _ = _tomar_lineas(file, saltar, max_lineas)
+                hasta = min(desde_linea + max_lineas - 1, indice.total_lineas)
+                resultado += f"📊 Líneas {desde_linea}-{hasta} de {indice.total_lineas}\n\n"
+                resultado += _texto(datos)
+                if hasta < indice.total_lineas:
+                    resultado += f"\n... ({indice.total_lineas - hasta} líneas más: desde_linea={hasta + 1})"
+                
+            else:
+                # El estado del descriptor abierto, no de la ruta: si se rota justo ahora,
+                # el cursor sigue describiendo lo que se ha leído
+                estado = os.fstat(file.fileno())
+                tamano = file.seek(0, os.SEEK_END)
+                if not cursor:
+                    datos, _ = _ultimas_lineas(file, max_lineas)
+                    resultado += f"👀 Siguiendo el archivo desde el byte {tamano}; últimas líneas:\n\n"
+                    resultado += _texto(datos)
+                    return resultado + f"\n▶️ cursor={_cursor_seguir(estado, tamano)}"
+                dispositivo, inodo, posicion = _leer_cursor_seguir(cursor)
+                if (dispositivo, inodo) != (estado.st_dev, estado.st_ino):
+                    # Otro archivo con el mismo nombre (rotado): puede haber crecido más allá del cursor
+                    resultado += "⚠️ El archivo se ha rotado; se lee el nuevo desde el principio\n"
+                    posicion = 0
+                elif posicion > tamano:
+                    resultado += "⚠️ El archivo es más corto que el cursor (¿truncado?); se lee desde el principio\n"
+                    posicion = 0
+                file.seek(posicion)
+                datos, _ = _tomar_lineas(file, 0, max_lineas)
+                # Solo líneas completas: una línea a medio escribir llegará en la siguiente llamada
+                datos = datos[:datos.rfind(b"\n") + 1]
+                posicion += len(datos)
+                nuevas = datos.count(b"\n")
+                pendiente = tamano - posicion
+                resultado += f"👀 {nuevas} líneas nuevas"
+                if pendiente:
+                    resultado += f" ({pendiente} bytes más por leer)"
+                resultado += "\n\n" + _texto(datos) + f"\n▶️ cursor={_cursor_seguir(estado, posicion)}"
         
         return resultado
         
@@ -133,52 +508,198 @@ def crear_nota(titulo: str, contenido: str) -> str:
     except Exception as e:
         return f"❌ Error al crear nota: {e}"
 
+# Búsqueda de texto: tamaño de cada lectura, bytes que se miran para
+# decidir si un archivo es binario e hilos que leen archivos a la vez
+TAMANO_BLOQUE = 1024 * 1024
+MUESTRA_BINARIO = 8192
+HILOS_BUSQUEDA = min(8, (os.cpu_count() or 1) * 2)
+
+# Directorios que nunca se recorren (además de los ocultos)
+DIRECTORIOS_IGNORADOS = {"__pycache__", "node_modules"}
+
+def _extensiones(extension: str) -> tuple:
+    """".txt, md,.py" -> (".txt", ".md", ".py"); vacío o "*" = cualquier archivo"""
+    extensiones = tuple(
+        "." + e.strip().lstrip(".").lower() for e in extension.split(",") if e.strip().lstrip(".")
+    )
+    return () if not extensiones or ".*" in extensiones else extensiones
+
+def _recorrer_archivos(directorio: str, extensiones: tuple, recursivo: bool = True):
+    """Produce las rutas de los archivos con scandir, sin cargar el árbol en memoria"""
+    pendientes = [directorio]
+    while pendientes:
+        actual = pendientes.pop()
+        try:
+            with os.scandir(actual) as entradas:
+                for entrada in entradas:
+                    if entrada.is_dir(follow_symlinks=False):
+                        if recursivo and not entrada.name.startswith(".") and entrada.name not in DIRECTORIOS_IGNORADOS:
+                            pendientes.append(entrada.path)
+                    elif (not extensiones or entrada.name.lower().endswith(extensiones)) and entrada.is_file():
+                        yield entrada.path
+        except OSError:
+            continue
+
+def _lineas_con_patron(zona: str, patron_lower: str, primera_linea: int):
+    """(número de línea, línea) de las líneas de `zona` que contienen el patrón"""
+    zona_lower = zona.lower()
+    if len(zona_lower) != len(zona):
+        # Algún carácter cambia de longitud al pasar a minúsculas: línea a línea
+        for num_linea, linea in enumerate(zona.split("\n"), primera_linea):
+            if patron_lower in linea.lower():
+                yield num_linea, linea
+        return
+    
+    num_linea = primera_linea
+    contadas = 0
+    pos = zona_lower.find(patron_lower)
+    while pos != -1:
+        inicio = zona.rfind("\n", 0, pos) + 1
+        fin = zona.find("\n", pos)
+        fin = len(zona) if fin == -1 else fin
+        num_linea += zona.count("\n", contadas, inicio)
+        contadas = inicio
+        yield num_linea, zona[inicio:fin]
+        pos = zona_lower.find(patron_lower, fin)
+
+def _buscar_en_archivo(ruta: str, patron_lower: str, limite: int, parar: threading.Event) -> tuple:
+    """
+    Busca el patrón leyendo el archivo en bloques de TAMANO_BLOQUE.
+    Devuelve (coincidencias, bytes leídos, completo); coincidencias es None
+    si el archivo es binario o no se pudo leer, y completo es False si la
+    búsqueda paró antes de revisar todo el archivo.
+    """
+    coincidencias = []
+    leidos = 0
+    decodificador = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pendiente = ""  # Última línea del bloque anterior, aún sin terminar
+    lineas_anteriores = 0
+    try:
+        with open(ruta, "rb") as file:
+            bloque = file.read(TAMANO_BLOQUE)
+            if b"\0" in bloque[:MUESTRA_BINARIO]:
+                return None, len(bloque), True
+            while True:
+                leidos += len(bloque)
+                final = not bloque
+                texto = pendiente + decodificador.decode(bloque, final=final)
+                corte = len(texto) if final else texto.rfind("\n") + 1
+                zona = texto[:corte]
+                lineas = _lineas_con_patron(zona, patron_lower, lineas_anteriores + 1)
+                for num_linea, linea in lineas:
+                    coincidencias.append((num_linea, linea.strip()))
+                    if len(coincidencias) >= limite:
+                        # Completo solo si este era el último bloque (uno corto es el final del
+                        # archivo) y no quedan más coincidencias ni en él ni en la línea sin terminar
+                        ultimo = final or len(bloque) < TAMANO_BLOQUE
+                        completo = ultimo and next(lineas, None) is None and patron_lower not in texto[corte:].lower()
+                        return coincidencias, leidos, completo
+                lineas_anteriores += zona.count("\n")
+                pendiente = texto[corte:]
+                if final:
+                    return coincidencias, leidos, True
+                bloque = file.read(TAMANO_BLOQUE)
+                if bloque and parar.is_set():
+                    # Otro hilo ya reunió los resultados pedidos: el archivo queda a medias
+                    return coincidencias, leidos, False
+    except OSError:
+        return None, leidos, True
+
+def buscar_en_arbol(patron: str, directorio: str = ".", extension: str = ".txt", max_resultados: int = 20,
+                    recursivo: bool = True, hilos: int = HILOS_BUSQUEDA) -> dict:
+    """
+    Motor de buscar_texto: reparte los archivos entre un pool de hilos
+    según los va encontrando el recorrido y se detiene en cuanto hay
+    max_resultados coincidencias. "completa" es False solo si quedaron
+    archivos sin revisar o alguno se revisó a medias
+    """
+    patron_lower = patron.lower()
+    parar = threading.Event()
+    estado = {"resultados": [], "archivos_revisados": 0, "binarios": 0, "bytes_leidos": 0, "completa": True}
+    
+    def recoger(futuros):
+        for futuro in futuros:
+            ruta = pendientes.pop(futuro)
+            coincidencias, leidos, completo = futuro.result()
+            estado["bytes_leidos"] += leidos
+            if not completo:
+                estado["completa"] = False
+            if coincidencias is None:
+                estado["binarios"] += 1
+                continue
+            estado["archivos_revisados"] += 1
+            nombre = os.path.relpath(ruta, directorio)
+            estado["resultados"].extend(
+                {"archivo": nombre, "linea": num_linea, "contenido": linea} for num_linea, linea in coincidencias
+            )
+            if len(estado["resultados"]) >= max_resultados:
+                parar.set()
+    
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        pendientes = {}
+        for ruta in _recorrer_archivos(directorio, _extensiones(extension), recursivo):
+            if parar.is_set():
+                estado["completa"] = False
+                break
+            pendientes[pool.submit(_buscar_en_archivo, ruta, patron_lower, max_resultados, parar)] = ruta
+            # Pocos archivos en vuelo: el recorrido no se adelanta a la lectura
+            if len(pendientes) >= hilos * 4:
+                hechos, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+                recoger(hechos)
+        recoger(list(pendientes))
+    
+    if len(estado["resultados"]) > max_resultados:
+        estado["completa"] = False
+    estado["resultados"] = sorted(estado["resultados"], key=lambda r: (r["archivo"], r["linea"]))[:max_resultados]
+    return estado
+
 @mcp.tool()
-def buscar_texto(patron: str, directorio: str = ".", extension: str = ".txt") -> str:
+def buscar_texto(patron: str, directorio: str = ".", extension: str = ".txt", max_resultados: int = 20,
+                 recursivo: bool = True) -> str:
     """
-    Busca un patrón de texto en archivos de un directorio
+    Busca un patrón de texto en los archivos de un directorio y sus subdirectorios
     
     Args:
-        patron: Texto a buscar
+        patron: Texto a buscar (sin distinguir mayúsculas)
         directorio: Directorio donde buscar (por defecto: directorio actual)
-        extension: Extensión de archivos a buscar (por defecto: .txt)
+        extension: Extensiones de archivo separadas por comas (ej: ".txt,.md,.py"; "*" = todas)
+        max_resultados: Coincidencias a mostrar; la búsqueda se detiene al alcanzarlas (por defecto: 20)
+        recursivo: Si buscar también en los subdirectorios (se saltan los ocultos)
+    
+    Los archivos binarios se detectan y se omiten, y cada archivo se lee
+    en bloques en lugar de cargarlo entero. Los archivos se revisan en
+    paralelo: si la búsqueda se detiene en max_resultados, qué coincidencias
+    se muestran depende de qué archivos terminaron antes y puede variar
+    entre ejecuciones.
     """
     try:
         path = Path(directorio)
         if not path.exists():
             return f"❌ El directorio '{directorio}' no existe"
         
-        resultados = []
-        archivos_revisados = 0
+        if not patron:
+            return "❌ Indica el texto a buscar"
         
-        for archivo in path.glob(f"*{extension}"):
-            if archivo.is_file():
-                archivos_revisados += 1
-                try:
-                    with open(archivo, 'r', encoding='utf-8') as file:
-                        lineas = file.readlines()
-                    
-                    for num_linea, linea in enumerate(lineas, 1):
-                        if patron.lower() in linea.lower():
-                            resultados.append({
-                                "archivo": archivo.name,
-                                "linea": num_linea,
-                                "contenido": linea.strip()
-                            })
-                except:
-                    continue
+        inicio = time.perf_counter()
+        busqueda = buscar_en_arbol(patron, directorio, extension, max(1, max_resultados), recursivo)
+        segundos = time.perf_counter() - inicio
+        resultados = busqueda["resultados"]
+        archivos_revisados = busqueda["archivos_revisados"]
         
         if not resultados:
             return f"🔍 No se encontró '{patron}' en {archivos_revisados} archivos {extension} en '{directorio}'"
         
         resultado = f"🔍 Búsqueda de '{patron}' en {archivos_revisados} archivos:\n\n"
         
-        for match in resultados[:20]:  # Limitar a 20 resultados
+        for match in resultados:
             resultado += f"📄 {match['archivo']} (línea {match['linea']}):\n"
             resultado += f"   {match['contenido']}\n\n"
         
-        if len(resultados) > 20:
-            resultado += f"... y {len(resultados) - 20} resultados más"
+        if not busqueda["completa"]:
+            resultado += f"⏹️ Búsqueda detenida al llegar a {len(resultados)} resultados (sube max_resultados para ver más)\n"
+        if busqueda["binarios"]:
+            resultado += f"🚫 {busqueda['binarios']} archivos binarios o ilegibles omitidos\n"
+        resultado += f"⚡ {busqueda['bytes_leidos'] / 1048576:.1f}MB leídos en {segundos:.2f}s"
         
         return resultado
         
@@ -187,6 +708,18 @@ def buscar_texto(patron: str, directorio: str = ".", extension: str = ".txt") ->
 
 # ========== RECURSOS ==========
 
+def _contar_entradas(ruta: str) -> tuple:
+    """(archivos, directorios) de una carpeta; scandir da el tipo sin stat por entrada"""
+    archivos = 0
+    directorios = 0
+    with os.scandir(ruta) as entradas:
+        for entrada in entradas:
+            if entrada.is_dir():
+                directorios += 1
+            elif entrada.is_file():
+                archivos += 1
+    return archivos, directorios
+
 @mcp.resource("file://directorio_trabajo")
 async def info_directorio_trabajo() -> str:
     """Información sobre el directorio de trabajo actual"""
@@ -194,9 +727,8 @@ async def info_directorio_trabajo() -> str:
         cwd = os.getcwd()
         path = Path(cwd)
         
-        # Contar archivos y directorios
-        archivos = sum(1 for x in path.iterdir() if x.is_file())
-        directorios = sum(1 for x in path.iterdir() if x.is_dir())
+        # Contar archivos y directorios en una sola pasada, fuera del bucle de eventos
+        archivos, directorios = await asyncio.to_thread(_contar_entradas, cwd)
         
         # Información del directorio
         info = {
@@ -248,16 +780,16 @@ def prompt_gestor_archivos() -> str:
     Tienes acceso a las siguientes herramientas:
     
     🗂️ GESTIÓN DE ARCHIVOS:
-    - listar_archivos(directorio): Lista contenido de directorios
-    - leer_archivo(ruta, max_lineas): Lee archivos de texto
+    - listar_archivos(directorio, ordenar, cursor, tamano_recursivo): Lista directorios por páginas
+    - leer_archivo(ruta, max_lineas, modo): Lee el inicio, el final, un rango de líneas o lo nuevo de un archivo
     - crear_nota(titulo, contenido): Crea notas en JSON
-    - buscar_texto(patron, directorio, extension): Busca texto en archivos
+    - buscar_texto(patron, directorio, extension, max_resultados): Busca texto en archivos y subdirectorios
     
     📋 CONSEJOS DE USO:
     - Siempre verifica que los archivos/directorios existan antes de operaciones
     - Usa rutas relativas cuando sea posible
-    - Limita la lectura de archivos grandes especificando max_lineas
-    - Para búsquedas específicas, ajusta la extensión de archivo
+    - Para archivos grandes usa modo="final" o modo="rango"; para logs en curso, modo="seguir" con el cursor
+    - Para búsquedas específicas, ajusta las extensiones de archivo (ej: ".py,.md")
     
     ¿En qué puedo ayudarte con la gestión de archivos?
     """
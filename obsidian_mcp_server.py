@@ -1,124 +1,323 @@
 #!/usr/bin/env python3
 """
 Servidor MCP para Obsidian - Gestión avanzada de tu vault
-Permite interactuar con tu vault de Obsidian desde Claude
+Permite interactuar con uno o varios vaults de Obsidian desde Claude
 """
 
+import argparse
+import asyncio
+import csv
+import heapq
 import json
+import mimetypes
 import os
 import re
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import date, datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set
+from urllib.parse import unquote
 
-from fastmcp import FastMCP
+from fastmcp import Context, FastMCP
+
+from obsidian_vault.exclusiones import IGNORAR, recorrer_archivos, ReglasIgnorar
+from obsidian_vault.propiedades import (
+    CAMPOS_DE_ARCHIVO, PROPIEDADES_INDEXADAS, campo_de_archivo, clave_orden, cumple, parsear_filtros,
+    propiedades_indexables, valor_mostrado,
+)
+from obsidian_vault.sintaxis import PATRON_ENLACE, claves_de_nota, destino_enlace
+from obsidian_vault.explorador import MODO_REFRESCO, ExploradorVault
+from obsidian_vault.metadatos import AlmacenMetadatos, FilaNota
+from obsidian_vault.fragmentos import AlmacenFragmentos, trocear_nota
+from obsidian_vault.tareas import ESTADOS_TAREA, MARCAS_CERRADAS, PATRON_TAREA, extraer_tareas, FiltroTareas
+from obsidian_vault.grafo import GrafoEnlaces, np
+from obsidian_vault.vaults import (
+    VAULTS, configurar_vaults, en_paralelo, en_paralelo_desde, iniciar_indexado, obtener_vault, Vault,
+    vaults_objetivo,
+)
+from obsidian_vault.progreso import (
+    aviso_parcial, con_progreso, crear_seguimiento, CursorNoValido, leer_cursor, notas_tras, recorrer_con_plazo,
+    rutas_tras, Seguimiento, ultima_cubierta, vaults_a_recorrer,
+)
+from obsidian_vault.paralelo import (
+    cerrar_pool, combinar_estadisticas, fragmento_buscar, fragmento_estadisticas, recorrer_por_fragmentos,
+)
+from obsidian_vault.concurrencia import (
+    ESPERA_MAXIMA_SEGUNDOS, MAX_LLAMADAS_EN_CURSO, MAX_LLAMADAS_POR_SEGUNDO_POR_CLIENTE,
+    MAX_LLAMADAS_SIMULTANEAS_POR_CLIENTE, MAX_RECORRIDOS_SIMULTANEOS, OBSIDIAN_HILOS, ControlDeAdmision, en_hilo,
+    LimitePorCliente,
+)
 
 # Configuración del vault de Obsidian
 OBSIDIAN_VAULT_PATH = "/Users/enriquebook/Desktop/Obsidian/Secundo Selebro"
+OBSIDIAN_VAULT_NAME = "Secundo Selebro"
+
+# Vaults servidos por este proceso: {"nombre": "ruta"}. Si está vacío se usa
+# solo OBSIDIAN_VAULT_PATH. También se puede definir con la variable de entorno
+# OBSIDIAN_VAULTS, como JSON (ej: '{"personal": "~/Vaults/Personal"}').
+# El primer vault de la lista es el vault por defecto.
+OBSIDIAN_VAULTS: Dict[str, str] = {}
 
 # Crear el servidor MCP
 mcp = FastMCP("Obsidian MCP Server")
 
+def _cargar_vaults() -> Dict[str, str]:
+    """Lee la configuración de vaults (variable de entorno o constantes)"""
+    config = OBSIDIAN_VAULTS
+    if os.environ.get("OBSIDIAN_VAULTS"):
+        config = json.loads(os.environ["OBSIDIAN_VAULTS"])
+    if not config:
+        config = {OBSIDIAN_VAULT_NAME: OBSIDIAN_VAULT_PATH}
+    return config
+
+configurar_vaults(_cargar_vaults())
+
+# ========== CONCURRENCIA ==========
+
+def instalar_limites_por_cliente() -> LimitePorCliente:
+    """
+    Activa LimitePorCliente (una sola vez) como primer middleware, antes
+    de la cola de admisión: una llamada rechazada no llega a ocupar sitio
+    """
+    for middleware in mcp.middleware:
+        if isinstance(middleware, LimitePorCliente):
+            return middleware
+    limite = LimitePorCliente(MAX_LLAMADAS_SIMULTANEAS_POR_CLIENTE, MAX_LLAMADAS_POR_SEGUNDO_POR_CLIENTE)
+    mcp.middleware.insert(0, limite)
+    return limite
+
+admision = ControlDeAdmision(MAX_RECORRIDOS_SIMULTANEOS, MAX_LLAMADAS_EN_CURSO, ESPERA_MAXIMA_SEGUNDOS)
+mcp.add_middleware(admision)
+
+# ========== FORMATO DE LAS RESPUESTAS ==========
+
+def _ruta_mostrada(vault: Vault, ruta_relativa, varios_vaults: bool) -> str:
+    """Ruta de una nota, prefijada con el vault si la respuesta mezcla varios"""
+    return f"{vault.nombre}:{ruta_relativa}" if varios_vaults else str(ruta_relativa)
+
+def _fuente(v: Vault) -> str:
+    """De dónde sale la respuesta para un vault: del índice o de un recorrido"""
+    indice = v.indice
+    if indice is not None and indice.listo:
+        return "índice"
+    progreso = indice.progreso() if indice is not None else "sin cargar"
+    return f"recorrido del vault (índice {progreso})"
+
+def _describir_fuentes(vaults: List[Vault], fuentes: List[str]) -> str:
+    """Línea final que indica si la respuesta salió del índice o de un recorrido"""
+    if len(set(fuentes)) == 1:
+        icono = {"índice": "⚡", "caché de resultados": "♻️"}.get(fuentes[0], "🔎")
+        return f"{icono} Fuente: {fuentes[0]}\n"
+    detalle = ", ".join(f"{v.nombre}: {f}" for v, f in zip(vaults, fuentes))
+    return f"🗂️ Fuentes: {detalle}\n"
+
 # ========== HERRAMIENTAS DE NAVEGACIÓN ==========
 
 @mcp.tool()
-def listar_notas(carpeta: str = "", incluir_subcarpetas: bool = True) -> str:
+def listar_vaults() -> str:
+    """
+    Lista los vaults configurados en el servidor y el estado de sus índices
+    """
+    resultado = f"🗄️ Vaults configurados ({len(VAULTS)}):\n\n"
+    for i, vault in enumerate(VAULTS.values()):
+        por_defecto = " (por defecto)" if i == 0 else ""
+        estado = "✅" if vault.ruta.exists() else "❌ no encontrado"
+        indices = vault.indice.progreso() if vault.indice is not None else "sin cargar"
+        resultado += f"📚 {vault.nombre}{por_defecto} {estado}\n"
+        resultado += f"   📍 {vault.ruta}\n"
+        resultado += f"   🗂️ Índices: {indices} | Inactivo: {vault.inactivo_desde():.0f}s\n\n"
+    return resultado
+
+@mcp.tool()
+def estado_indices() -> str:
+    """
+    Muestra el progreso de construcción de los índices de cada vault
+    """
+    resultado = "🗂️ Estado de los índices:\n\n"
+    for vault in VAULTS.values():
+        indice = vault.indice
+        if indice is None:
+            resultado += f"📚 {vault.nombre}: sin cargar\n"
+            continue
+        icono = "✅" if indice.listo else "⏳"
+        resultado += f"📚 {vault.nombre}: {icono} {indice.progreso()}\n"
+        if indice.listo:
+            resultado += (f"   🏷️ {len(indice.etiquetas)} etiquetas | 🧩 {len(indice.fragmentos)} fragmentos | "
+                          f"☑️ {indice.total_tareas} tareas | "
+                          f"🔤 {indice.terminos.describir()}\n")
+    return resultado
+
+def metricas() -> dict:
+    """Métricas del servidor por vault (cachés, generación del vault, índice) y de la cola de admisión"""
+    datos = {}
+    for v in VAULTS.values():
+        metadatos = v.indice.metadatos if v.indice is not None else AlmacenMetadatos()
+        explorador = v.indice.explorador if v.indice is not None else ExploradorVault(v.ruta, v.reglas_ignorar())
+        datos[v.nombre] = {
+            "generacion": v.generacion,
+            "indice": v.indice.estado if v.indice is not None else "sin cargar",
+            "metadatos": {
+                "notas": len(metadatos),
+                "bytes_por_nota": round(metadatos.bytes_por_nota(), 1),
+            },
+            "cache_resultados": {
+                "entradas": len(v.cache),
+                "bytes": v.cache.bytes,
+                "aciertos": v.cache.aciertos,
+                "fallos": v.cache.fallos,
+                "tasa_aciertos": round(v.cache.tasa_aciertos(), 3),
+            },
+            "cache_notas": {
+                "entradas": len(v.cache_notas),
+                "fijadas": v.cache_notas.num_fijadas,
+                "bytes": v.cache_notas.bytes,
+                "max_bytes": v.cache_notas.max_bytes,
+                "aciertos": v.cache_notas.aciertos,
+                "fallos": v.cache_notas.fallos,
+                "caducadas": v.cache_notas.caducadas,
+                "tasa_aciertos": round(v.cache_notas.tasa_aciertos(), 3),
+            },
+            "refresco": {
+                "modo": MODO_REFRESCO,
+                "carpetas": len(explorador.carpetas),
+                "stats_ultimo": explorador.stats,
+                "carpetas_listadas_ultimo": explorador.listadas,
+                "ms_ultimo": round(explorador.duracion * 1000, 1),
+            },
+        }
+    datos["admision"] = admision.metricas()
+    return datos
+
+@mcp.tool()
+def metricas_servidor() -> str:
+    """
+    Muestra las métricas del servidor: cachés y estado de cada vault
+    """
+    todas = metricas()
+    cola = todas.pop("admision")
+    resultado = "📈 Métricas del servidor:\n\n"
+    resultado += (f"🚦 Admisión: {cola['recorridos']['en_curso']} recorridos en curso "
+                  f"(máx. {cola['recorridos']['limite']}), {cola['recorridos']['en_cola']} en cola | "
+                  f"{cola['ligeras']['en_curso']} consultas en curso, {cola['ligeras']['en_cola']} en cola\n")
+    resultado += (f"   {cola['admitidas']} admitidas, {cola['compartidas']} compartidas con un recorrido idéntico, "
+                  f"{cola['rechazadas_por_espera']} rechazadas por espera | cola máx. {cola['max_en_cola']}, "
+                  f"espera media {cola['espera_media_ms']:.1f}ms\n\n")
+    for nombre, datos in todas.items():
+        cache = datos["cache_resultados"]
+        resultado += f"📚 {nombre} (generación {datos['generacion']}, índice {datos['indice']})\n"
+        resultado += (f"   🗃️ Metadatos: {datos['metadatos']['notas']} notas, "
+                      f"{datos['metadatos']['bytes_por_nota']:.0f} bytes por nota\n")
+        resultado += (f"   ♻️ Caché de resultados: {cache['entradas']} entradas, {cache['bytes'] / 1024:.0f}KB | "
+                      f"{cache['aciertos']} aciertos / {cache['fallos']} fallos ({cache['tasa_aciertos']:.0%})\n")
+        notas = datos["cache_notas"]
+        resultado += (f"   📖 Caché de notas: {notas['entradas']} notas ({notas['fijadas']} fijadas), "
+                      f"{notas['bytes'] / 1048576:.1f}/{notas['max_bytes'] / 1048576:.0f}MB | "
+                      f"{notas['aciertos']} aciertos / {notas['fallos']} fallos ({notas['tasa_aciertos']:.0%}), "
+                      f"{notas['caducadas']} caducadas\n")
+        refresco = datos["refresco"]
+        resultado += (f"   🔄 Refresco ({refresco['modo']}): {refresco['carpetas']} carpetas | último: "
+                      f"{refresco['stats_ultimo']} stats, {refresco['carpetas_listadas_ultimo']} carpetas listadas, "
+                      f"{refresco['ms_ultimo']:.1f}ms\n\n")
+    return resultado
+
+@mcp.tool()
+@en_hilo
+def listar_notas(carpeta: str = "", incluir_subcarpetas: bool = True, vault: str = "",
+                 plazo_segundos: float = 0, continuar: str = "") -> str:
     """
     Lista todas las notas (.md) en el vault o en una carpeta específica
     
     Args:
         carpeta: Carpeta específica a explorar (vacío = raíz del vault)
         incluir_subcarpetas: Si incluir subcarpetas en la búsqueda
+        vault: Vault a explorar (vacío = vault por defecto)
+        plazo_segundos: Tiempo máximo si hay que recorrer el vault (0 = plazo por defecto del servidor)
+        continuar: Cursor de una respuesta parcial anterior para seguir donde se quedó
     """
     try:
-        vault_path = Path(OBSIDIAN_VAULT_PATH)
-        if carpeta:
-            target_path = vault_path / carpeta
-            if not target_path.exists():
-                return f"❌ La carpeta '{carpeta}' no existe en el vault"
+        posiciones = leer_cursor(continuar)
+        if len(posiciones) > 1:
+            # listar_notas recorre un solo vault, así que su cursor tiene una sola posición
+            raise CursorNoValido(f"Cursor no válido: '{continuar}' (listar_notas sigue un solo vault; "
+                                 f"usa el valor de 'continuar' de su respuesta parcial)")
+        if posiciones:
+            (nombre, desde), = posiciones.items()
+            v = obtener_vault(nombre)
         else:
-            target_path = vault_path
+            v, desde = obtener_vault(vault), ""
+        vault_path = v.ruta
+        if carpeta and not (vault_path / carpeta).exists():
+            return f"❌ La carpeta '{carpeta}' no existe en el vault"
         
-        # Buscar archivos markdown
-        if incluir_subcarpetas:
-            pattern = "**/*.md"
+        indice = v.indice_listo()
+        seguimiento = crear_seguimiento(plazo_segundos)
+        siguiente = None
+        if indice is not None:
+            with indice._lock:
+                notas = [nota for nota in indice.metadatos.listar(carpeta, incluir_subcarpetas) if nota.ruta > desde]
         else:
-            pattern = "*.md"
-        
-        notas = list(target_path.glob(pattern))
+            archivos = notas_tras(v, desde, carpeta, recursivo=incluir_subcarpetas)
+            notas = [FilaNota.desde_archivo(nota, vault_path) for nota in recorrer_con_plazo(archivos, seguimiento)]
+            siguiente = ultima_cubierta(v, archivos, len(notas), desde)
         
-        if not notas:
+        if not notas and siguiente is None:
             return f"📂 No se encontraron notas en '{carpeta or 'raíz'}'"
         
         # Organizar por carpetas
         notas_por_carpeta = {}
         for nota in notas:
-            # Obtener ruta relativa al vault
-            ruta_relativa = nota.relative_to(vault_path)
-            carpeta_padre = str(ruta_relativa.parent) if ruta_relativa.parent != Path('.') else "📄 Raíz"
-            
-            if carpeta_padre not in notas_por_carpeta:
-                notas_por_carpeta[carpeta_padre] = []
-            
-            # Información de la nota
-            stats = nota.stat()
-            size_kb = stats.st_size / 1024
-            modified = datetime.fromtimestamp(stats.st_mtime).strftime('%Y-%m-%d %H:%M')
-            
-            notas_por_carpeta[carpeta_padre].append({
-                'nombre': nota.name,
-                'ruta': str(ruta_relativa),
-                'tamaño': f"{size_kb:.1f}KB",
-                'modificado': modified
-            })
+            notas_por_carpeta.setdefault(nota.carpeta or "📄 Raíz", []).append(nota)
         
-        # Formatear resultado
+        # Formatear resultado (solo aquí se da formato a tamaños y fechas)
         resultado = f"📚 Notas encontradas en el vault ({len(notas)} total):\n\n"
         
         for carpeta_nombre, lista_notas in sorted(notas_por_carpeta.items()):
             resultado += f"📁 {carpeta_nombre} ({len(lista_notas)} notas):\n"
-            for nota in sorted(lista_notas, key=lambda x: x['nombre']):
-                resultado += f"   📄 {nota['nombre']} ({nota['tamaño']}, {nota['modificado']})\n"
+            for nota in sorted(lista_notas, key=lambda x: x.ruta):
+                modificado = datetime.fromtimestamp(nota.mtime_ns / 1e9).strftime('%Y-%m-%d %H:%M')
+                resultado += f"   📄 {nota.nombre} ({nota.tamaño / 1024:.1f}KB, {modificado})\n"
             resultado += "\n"
         
+        if siguiente is not None:
+            resultado += aviso_parcial(seguimiento, [(v, siguiente)])
+        resultado += _describir_fuentes([v], [_fuente(v)])
         return resultado
         
+    except CursorNoValido as e:
+        return f"❌ {e}"
     except Exception as e:
         return f"❌ Error al listar notas: {e}"
 
 @mcp.tool()
-def leer_nota(nombre_archivo: str) -> str:
+@en_hilo
+def leer_nota(nombre_archivo: str, vault: str = "") -> str:
     """
     Lee el contenido completo de una nota específica
     
     Args:
         nombre_archivo: Nombre del archivo (puede incluir ruta, ej: "Diario/2024-01-01.md")
+        vault: Vault donde está la nota (vacío = vault por defecto)
     """
     try:
-        vault_path = Path(OBSIDIAN_VAULT_PATH)
+        v = obtener_vault(vault)
+        vault_path = v.ruta
         
         # Buscar el archivo (puede estar en cualquier subcarpeta)
-        nota_path = None
-        
-        # Si incluye ruta, buscar directamente
-        if "/" in nombre_archivo:
-            nota_path = vault_path / nombre_archivo
-        else:
-            # Buscar en todo el vault
-            for archivo in vault_path.rglob("*.md"):
-                if archivo.name == nombre_archivo or archivo.stem == nombre_archivo:
-                    nota_path = archivo
-                    break
+        nota_path = v.buscar_nota(nombre_archivo)
         
-        if not nota_path or not nota_path.exists():
+        if not nota_path:
             return f"❌ No se encontró la nota '{nombre_archivo}'"
         
-        # Leer contenido
-        with open(nota_path, 'r', encoding='utf-8') as f:
-            contenido = f.read()
+        # Leer contenido (desde la caché de notas si no cambió en disco)
+        contenido, stats = v.leer_contenido(nota_path)
         
         # Información del archivo
-        stats = nota_path.stat()
         size_kb = stats.st_size / 1024
         modified = datetime.fromtimestamp(stats.st_mtime).strftime('%Y-%m-%d %H:%M')
         ruta_relativa = nota_path.relative_to(vault_path)
@@ -135,7 +334,121 @@ def leer_nota(nombre_archivo: str) -> str:
         return f"❌ Error al leer nota: {e}"
 
 @mcp.tool()
-def buscar_en_notas(texto: str, carpeta: str = "", solo_titulos: bool = False) -> str:
+@en_hilo
+def fijar_nota(nombre_archivo: str, fijar: bool = True, vault: str = "") -> str:
+    """
+    Fija una nota en la caché de contenido para que leer_nota la sirva
+    siempre desde memoria (o la suelta con fijar=False)
+    
+    Args:
+        nombre_archivo: Nombre del archivo (puede incluir ruta)
+        fijar: True para fijarla, False para soltarla
+        vault: Vault donde está la nota (vacío = vault por defecto)
+    """
+    try:
+        v = obtener_vault(vault)
+        nota_path = v.buscar_nota(nombre_archivo)
+        if not nota_path:
+            return f"❌ No se encontró la nota '{nombre_archivo}'"
+        
+        clave = v.clave_nota(nota_path)
+        v.cache_notas.fijar(clave, fijar)
+        if not fijar:
+            return f"📌 Nota soltada de la caché: {clave}"
+        
+        # Cargarla ya para que la primera lectura también sea un acierto
+        _, stats = v.leer_contenido(nota_path)
+        return (f"📌 Nota fijada en la caché: {clave} ({stats.st_size / 1024:.1f}KB)\n"
+                f"📖 {v.cache_notas.num_fijadas} notas fijadas, "
+                f"{v.cache_notas.bytes / 1048576:.1f}MB en caché")
+        
+    except Exception as e:
+        return f"❌ Error al fijar nota: {e}"
+
+def _buscar_en_vault(v: Vault, texto: str, carpeta: str, solo_titulos: bool,
+                     seguimiento: Optional[Seguimiento] = None, desde: str = "") -> Optional[tuple]:
+    """
+    Busca texto en un vault. Devuelve (resultados, archivos_revisados, fuente,
+    siguiente), o None si la carpeta no existe en este vault. `siguiente` es
+    la última nota cubierta si el recorrido se detuvo antes de terminar
+    (None si terminó); `desde` es la de la llamada anterior.
+    
+    Con el índice listo solo se abren las notas que contienen todos los
+    términos de la búsqueda; si no, se recorre el vault completo.
+    """
+    vault_path = v.ruta
+    if carpeta and not (vault_path / carpeta).exists():
+        return None
+    
+    resultados = []
+    texto_lower = texto.lower()
+    indice = v.indice_listo()
+    fuente = _fuente(v)
+    
+    if solo_titulos:
+        # Buscar solo en el nombre del archivo
+        if indice is not None:
+            prefijo = carpeta.rstrip("/") + "/" if carpeta else ""
+            archivos = [vault_path / r for r in list(indice.notas) if r.startswith(prefijo)]
+        else:
+            archivos = v.archivos(carpeta)
+        for archivo in archivos:
+            if texto_lower in archivo.stem.lower():
+                resultados.append({
+                    'vault': v,
+                    'archivo': archivo.relative_to(vault_path),
+                    'tipo': 'título',
+                    'coincidencia': archivo.stem
+                })
+        return resultados, len(archivos), fuente, None
+    
+    candidatos = indice.candidatos(texto_lower, carpeta) if indice is not None else None
+    if candidatos is not None:
+        relativas = candidatos
+        archivos_revisados = len(indice.notas)
+    else:
+        # El texto no tiene palabras indexables (ej: "- [ ]") o no hay índice
+        relativas = sorted(str(archivo.relative_to(vault_path)) for archivo in v.archivos(carpeta))
+        archivos_revisados = len(relativas)
+        if indice is not None:
+            fuente = "recorrido del vault (la búsqueda no tiene palabras indexables)"
+    
+    # Buscar en todo el contenido (repartido entre procesos si está activado),
+    # a partir de la última nota que cubrió la llamada anterior si se continúa
+    relativas = rutas_tras(relativas, desde)
+    rutas = [str(vault_path / r) for r in relativas]
+    parciales, cubiertas = recorrer_por_fragmentos(
+        fragmento_buscar, rutas, str(vault_path), texto_lower, seguimiento=seguimiento or Seguimiento()
+    )
+    siguiente = None
+    if cubiertas < len(rutas):
+        siguiente = relativas[cubiertas - 1] if cubiertas else desde
+        archivos_revisados = cubiertas
+    for parcial in parciales:
+        for ruta, num_linea, coincidencia in parcial:
+            resultados.append({
+                'vault': v,
+                'archivo': Path(ruta),
+                'linea': num_linea,
+                'coincidencia': coincidencia
+            })
+    
+    return resultados, archivos_revisados, fuente, siguiente
+
+def _buscar_en_vault_cacheado(v: Vault, texto: str, carpeta: str, solo_titulos: bool, usar_cache: bool,
+                              seguimiento: Optional[Seguimiento] = None, desde: str = "") -> Optional[tuple]:
+    """_buscar_en_vault a través de la caché de resultados del vault"""
+    clave = ("buscar_en_notas", texto.lower(), carpeta.strip("/"), solo_titulos, desde)
+    resultado, desde_cache = v.resultado_cacheado(
+        clave, usar_cache, lambda: _buscar_en_vault(v, texto, carpeta, solo_titulos, seguimiento, desde), seguimiento
+    )
+    if desde_cache and resultado is not None:
+        resultado = (resultado[0], resultado[1], "caché de resultados", None)
+    return resultado
+
+@mcp.tool()
+async def buscar_en_notas(texto: str, carpeta: str = "", solo_titulos: bool = False, vault: str = "", usar_cache: bool = True,
+                          plazo_segundos: float = 0, continuar: str = "", ctx: Optional[Context] = None) -> str:
     """
     Busca texto en las notas del vault
     
@@ -143,51 +456,39 @@ def buscar_en_notas(texto: str, carpeta: str = "", solo_titulos: bool = False) -
         texto: Texto a buscar
         carpeta: Carpeta específica donde buscar (vacío = todo el vault)
         solo_titulos: Si buscar solo en los títulos de las notas
+        vault: Vault donde buscar (vacío = todos los vaults configurados)
+        usar_cache: Si reutilizar el resultado de una búsqueda idéntica reciente
+        plazo_segundos: Tiempo máximo de la búsqueda; al agotarse devuelve lo encontrado
+            hasta entonces (0 = plazo por defecto del servidor)
+        continuar: Cursor de una respuesta parcial anterior para seguir donde se quedó
+    
+    Mientras recorre el vault envía notificaciones de progreso y adelanta
+    como mensajes las primeras coincidencias.
     """
     try:
-        vault_path = Path(OBSIDIAN_VAULT_PATH)
-        if carpeta:
-            search_path = vault_path / carpeta
-            if not search_path.exists():
-                return f"❌ La carpeta '{carpeta}' no existe"
-        else:
-            search_path = vault_path
+        objetivos = vaults_a_recorrer(vault, continuar)
+        vaults = [v for v, _ in objetivos]
+        seguimiento = crear_seguimiento(plazo_segundos)
+        parciales = await con_progreso(
+            ctx, seguimiento,
+            en_paralelo_desde(_buscar_en_vault_cacheado, objetivos, texto, carpeta, solo_titulos, usar_cache, seguimiento),
+            lambda p: f"🔎 {p[0]} (línea {p[1]}): {p[2]}",
+        )
         
-        resultados = []
-        archivos_revisados = 0
+        vaults = [v for v, p in zip(vaults, parciales) if p is not None]
+        parciales = [p for p in parciales if p is not None]
+        if not parciales:
+            return f"❌ La carpeta '{carpeta}' no existe"
         
-        for archivo in search_path.rglob("*.md"):
-            archivos_revisados += 1
-            try:
-                with open(archivo, 'r', encoding='utf-8') as f:
-                    contenido = f.read()
-                
-                ruta_relativa = archivo.relative_to(vault_path)
-                
-                if solo_titulos:
-                    # Buscar solo en el nombre del archivo
-                    if texto.lower() in archivo.stem.lower():
-                        resultados.append({
-                            'archivo': str(ruta_relativa),
-                            'tipo': 'título',
-                            'coincidencia': archivo.stem
-                        })
-                else:
-                    # Buscar en todo el contenido
-                    lineas = contenido.split('\n')
-                    for num_linea, linea in enumerate(lineas, 1):
-                        if texto.lower() in linea.lower():
-                            resultados.append({
-                                'archivo': str(ruta_relativa),
-                                'linea': num_linea,
-                                'coincidencia': linea.strip()[:100] + "..." if len(linea.strip()) > 100 else linea.strip()
-                            })
-            except:
-                continue
+        resultados = [r for p in parciales for r in p[0]]
+        archivos_revisados = sum(p[1] for p in parciales)
+        fuentes = _describir_fuentes(vaults, [p[2] for p in parciales])
+        fuentes = aviso_parcial(seguimiento, [(v, p[3]) for v, p in zip(vaults, parciales) if p[3] is not None]) + fuentes
+        varios = len(vaults) > 1
         
         if not resultados:
             busqueda_tipo = "títulos" if solo_titulos else "contenido"
-            return f"🔍 No se encontró '{texto}' en {busqueda_tipo} de {archivos_revisados} notas"
+            return f"🔍 No se encontró '{texto}' en {busqueda_tipo} de {archivos_revisados} notas\n\n{fuentes}"
         
         # Formatear resultados
         busqueda_tipo = "títulos" if solo_titulos else "contenido"
@@ -196,7 +497,7 @@ def buscar_en_notas(texto: str, carpeta: str = "", solo_titulos: bool = False) -
         # Agrupar por archivo
         por_archivo = {}
         for r in resultados:
-            archivo = r['archivo']
+            archivo = _ruta_mostrada(r['vault'], r['archivo'], varios)
             if archivo not in por_archivo:
                 por_archivo[archivo] = []
             por_archivo[archivo].append(r)
@@ -213,17 +514,278 @@ def buscar_en_notas(texto: str, carpeta: str = "", solo_titulos: bool = False) -
             resultado += "\n"
         
         if len(por_archivo) > 20:
-            resultado += f"... y {len(por_archivo) - 20} archivos más con coincidencias"
+            resultado += f"... y {len(por_archivo) - 20} archivos más con coincidencias\n"
         
+        resultado += fuentes
         return resultado
         
     except Exception as e:
         return f"❌ Error en búsqueda: {e}"
 
+# Directorio local donde exportar_busqueda deja sus archivos
+DIRECTORIO_EXPORTACIONES = Path(os.environ.get(
+    "OBSIDIAN_DIRECTORIO_EXPORTACIONES", Path(tempfile.gettempdir()) / "obsidian_mcp_exportaciones"
+)).expanduser()
+
+# Caracteres de contexto a cada lado de la coincidencia en el fragmento exportado
+CONTEXTO_EXPORTACION = 60
+
+FORMATOS_EXPORTACION = ("jsonl", "csv")
+COLUMNAS_EXPORTACION = ("vault", "archivo", "linea", "columna", "fragmento")
+
+def _notas_a_exportar(v: Vault, texto_lower: str, carpeta: str):
+    """Rutas relativas de las notas donde buscar; en modo recorrido se producen sin listarlas antes"""
+    indice = v.indice_listo()
+    candidatos = indice.candidatos(texto_lower, carpeta) if indice is not None else None
+    if candidatos is not None:
+        yield from sorted(candidatos)
+        return
+    for ruta_relativa, entrada in recorrer_archivos(v.ruta, v.reglas_ignorar(), carpeta):
+        if entrada.name.endswith(".md"):
+            yield Path(ruta_relativa).as_posix()
+
+def _coincidencias_en_archivo(archivo: Path, patron: re.Pattern):
+    """(línea, columna, fragmento) de cada aparición, leyendo la nota línea a línea"""
+    with open(archivo, 'r', encoding='utf-8', errors='replace') as f:
+        for num_linea, linea in enumerate(f, 1):
+            for m in patron.finditer(linea):
+                inicio = max(0, m.start() - CONTEXTO_EXPORTACION)
+                yield num_linea, m.start() + 1, linea[inicio:m.end() + CONTEXTO_EXPORTACION].strip()
+
+def _coincidencias_exportables(vaults: List[Vault], texto: str, carpeta: str,
+                               seguimiento: Seguimiento, resumen: Counter):
+    """
+    Filas (vault, archivo, línea, columna, fragmento) de todas las
+    apariciones del texto. Es un generador: nunca hay en memoria más que
+    la línea que se está examinando, y `resumen` lleva los recuentos.
+    """
+    patron = re.compile(re.escape(texto), re.IGNORECASE)
+    texto_lower = texto.lower()
+    for v in vaults:
+        for ruta_relativa in _notas_a_exportar(v, texto_lower, carpeta):
+            if seguimiento.detenido:
+                return
+            resumen["notas"] += 1
+            antes = resumen["coincidencias"]
+            try:
+                for linea, columna, fragmento in _coincidencias_en_archivo(v.ruta / ruta_relativa, patron):
+                    resumen["coincidencias"] += 1
+                    yield v.nombre, ruta_relativa, linea, columna, fragmento
+            except OSError:
+                resumen["ilegibles"] += 1
+                continue
+            if resumen["coincidencias"] > antes:
+                resumen["notas_con_coincidencias"] += 1
+
+def _escribir_exportacion(filas, destino: Path, formato: str):
+    """Vuelca las filas según llegan; el archivo final solo aparece completo"""
+    provisional = destino.with_name(destino.name + ".parcial")
+    try:
+        with open(provisional, 'w', encoding='utf-8', newline='') as f:
+            if formato == "csv":
+                escritor = csv.writer(f)
+                escritor.writerow(COLUMNAS_EXPORTACION)
+                escritor.writerows(filas)
+            else:
+                # Un único codificador: json.dumps con opciones crea uno nuevo en cada llamada
+                codificar = json.JSONEncoder(ensure_ascii=False).encode
+                for fila in filas:
+                    f.write(codificar(dict(zip(COLUMNAS_EXPORTACION, fila))) + "\n")
+    except BaseException:
+        provisional.unlink(missing_ok=True)
+        raise
+    os.replace(provisional, destino)
+
+@mcp.tool()
+@en_hilo
+def exportar_busqueda(texto: str, formato: str = "jsonl", carpeta: str = "", vault: str = "",
+                      plazo_segundos: float = 0) -> str:
+    """
+    Exporta TODAS las apariciones de un texto a un archivo local JSONL o CSV
+    (vault, archivo, línea, columna, fragmento), sin el límite de resultados
+    de buscar_en_notas. Devuelve solo la ruta del archivo y los recuentos.
+    
+    Args:
+        texto: Texto a buscar (sin distinguir mayúsculas)
+        formato: "jsonl" (un objeto por línea) o "csv"
+        carpeta: Carpeta específica donde buscar (vacío = todo el vault)
+        vault: Vault donde buscar (vacío = todos los vaults configurados)
+        plazo_segundos: Tiempo máximo de la exportación (0 = plazo por defecto del servidor)
+    
+    Las coincidencias pasan de la nota al archivo según se encuentran, así
+    que la memoria no crece con su número.
+    """
+    try:
+        formato = formato.lower().lstrip(".")
+        if formato not in FORMATOS_EXPORTACION:
+            return f"❌ Formato '{formato}' no soportado (usa: {', '.join(FORMATOS_EXPORTACION)})"
+        if not texto:
+            return "❌ Indica el texto a exportar"
+        
+        vaults = [v for v in vaults_objetivo(vault) if not carpeta or (v.ruta / carpeta).exists()]
+        if not vaults:
+            return f"❌ La carpeta '{carpeta}' no existe"
+        
+        DIRECTORIO_EXPORTACIONES.mkdir(parents=True, exist_ok=True)
+        nombre = re.sub(r'[^\w-]+', '_', texto).strip('_')[:40] or "busqueda"
+        destino = DIRECTORIO_EXPORTACIONES / f"busqueda_{nombre}_{datetime.now():%Y%m%d_%H%M%S_%f}.{formato}"
+        
+        inicio = time.perf_counter()
+        seguimiento = crear_seguimiento(plazo_segundos)
+        resumen = Counter()
+        _escribir_exportacion(_coincidencias_exportables(vaults, texto, carpeta, seguimiento, resumen), destino, formato)
+        segundos = time.perf_counter() - inicio
+        
+        resultado = f"📤 Exportación de '{texto}' ({formato.upper()}):\n\n"
+        resultado += f"📁 Archivo: {destino}\n"
+        resultado += (f"🔍 {resumen['coincidencias']} coincidencias en {resumen['notas_con_coincidencias']} notas "
+                      f"({resumen['notas']} notas revisadas)\n")
+        resultado += f"💾 {destino.stat().st_size / 1024:.1f}KB en {segundos:.2f}s\n"
+        if resumen["ilegibles"]:
+            resultado += f"⚠️ {resumen['ilegibles']} notas no se pudieron leer\n"
+        if seguimiento.detenido:
+            motivo = "la llamada se canceló" if seguimiento.cancelado else f"se agotó el plazo de {seguimiento.plazo:g}s"
+            resultado += f"⚠️ Exportación parcial: {motivo}; repítela con un plazo_segundos mayor\n"
+        resultado += "\n" + _describir_fuentes(vaults, [_fuente(v) for v in vaults])
+        return resultado
+        
+    except Exception as e:
+        return f"❌ Error al exportar la búsqueda: {e}"
+
+# Caracteres máximos que se muestran de cada pasaje
+MAX_CARACTERES_PASAJE = 1500
+
+def _leer_pasaje(archivo: Path, desplazamiento: int, longitud: int) -> str:
+    """Lee del disco solo los bytes del fragmento"""
+    with open(archivo, 'rb') as f:
+        f.seek(desplazamiento)
+        return f.read(longitud).decode('utf-8', errors='replace').strip()
+
+def _pasajes_en_vault(v: Vault, consulta: str, k: int, carpeta: str,
+                      seguimiento: Optional[Seguimiento] = None) -> Optional[tuple]:
+    """
+    Devuelve (pasajes, fragmentos considerados, fuente, completo), o None si
+    la carpeta no existe en este vault. Cada pasaje es (puntuación, ruta
+    relativa, primera línea, última línea, texto).
+    
+    Con el índice listo se puntúan los fragmentos ya indexados y solo se
+    leen los k elegidos; si no, se trocean las notas al recorrer el vault.
+    """
+    if carpeta and not (v.ruta / carpeta).exists():
+        return None
+    seguimiento = seguimiento or Seguimiento()
+    indice = v.indice_listo()
+    
+    if indice is None:
+        almacen = AlmacenFragmentos()
+        for archivo in recorrer_con_plazo(sorted(v.archivos(carpeta)), seguimiento):
+            try:
+                almacen.poner(str(archivo.relative_to(v.ruta)), trocear_nota(archivo.read_bytes()))
+            except OSError:
+                continue
+        elegidos = [(p,) + almacen.fragmento(i) for p, i in almacen.mejores(consulta, k)]
+        pasajes = [(p, ruta, inicio, fin, _leer_pasaje(v.ruta / ruta, desplazamiento, longitud))
+                   for p, ruta, desplazamiento, longitud, inicio, fin in elegidos]
+        return pasajes, len(almacen), _fuente(v), not seguimiento.detenido
+    
+    # Si una nota cambió desde que se indexó, se reindexa y se vuelve a puntuar
+    for _ in range(2):
+        elegidos, total = indice.pasajes(consulta, k, carpeta)
+        pasajes = []
+        cambiadas = []
+        for p, ruta, desplazamiento, longitud, inicio, fin in elegidos:
+            archivo = v.ruta / ruta
+            try:
+                if not indice.metadatos.vigente(ruta, archivo.stat()):
+                    cambiadas.append(archivo)
+                    continue
+                pasajes.append((p, ruta, inicio, fin, _leer_pasaje(archivo, desplazamiento, longitud)))
+            except OSError:
+                cambiadas.append(archivo)
+        if not cambiadas:
+            break
+        for archivo in cambiadas:
+            indice.actualizar_nota(archivo)
+    return pasajes, total, _fuente(v), True
+
+@mcp.tool()
+async def buscar_pasajes(consulta: str, k: int = 5, carpeta: str = "", vault: str = "",
+                         plazo_segundos: float = 0, ctx: Optional[Context] = None) -> str:
+    """
+    Devuelve los pasajes (secciones o párrafos) más relevantes para una consulta,
+    con la nota y el rango de líneas de cada uno, sin leer las notas completas
+    
+    Args:
+        consulta: Palabras a buscar; se puntúan con BM25 sobre los fragmentos de las notas
+        k: Número de pasajes a devolver (por defecto: 5)
+        carpeta: Carpeta específica donde buscar (vacío = todo el vault)
+        vault: Vault donde buscar (vacío = todos los vaults configurados)
+        plazo_segundos: Tiempo máximo si hay que recorrer el vault (0 = plazo por defecto del servidor)
+    """
+    try:
+        vaults = vaults_objetivo(vault)
+        seguimiento = crear_seguimiento(plazo_segundos)
+        parciales = await con_progreso(ctx, seguimiento, en_paralelo(_pasajes_en_vault, vaults, consulta, k, carpeta, seguimiento))
+        
+        vaults = [v for v, p in zip(vaults, parciales) if p is not None]
+        parciales = [p for p in parciales if p is not None]
+        if not parciales:
+            return f"❌ La carpeta '{carpeta}' no existe"
+        
+        pasajes = heapq.nlargest(k, ((pasaje, v) for v, p in zip(vaults, parciales) for pasaje in p[0]),
+                                 key=lambda x: x[0][0])
+        total = sum(p[1] for p in parciales)
+        fuentes = _describir_fuentes(vaults, [p[2] for p in parciales])
+        fuentes = aviso_parcial(seguimiento, [(v, "") for v, p in zip(vaults, parciales) if not p[3]], continuable=False) + fuentes
+        varios = len(vaults) > 1
+        
+        if not pasajes:
+            return f"🔍 Ningún pasaje contiene '{consulta}' ({total} fragmentos revisados)\n\n{fuentes}"
+        
+        resultado = f"📚 Pasajes más relevantes para '{consulta}' ({len(pasajes)} de {total} fragmentos):\n\n"
+        for i, ((puntuacion, ruta, inicio, fin, texto), v) in enumerate(pasajes, 1):
+            if len(texto) > MAX_CARACTERES_PASAJE:
+                texto = texto[:MAX_CARACTERES_PASAJE] + "…"
+            lineas = f"línea {inicio}" if inicio == fin else f"líneas {inicio}-{fin}"
+            resultado += f"{i}. 📄 **{_ruta_mostrada(v, ruta, varios)}** ({lineas}, puntuación {puntuacion:.2f})\n"
+            resultado += "".join(f"   {linea}\n" for linea in texto.splitlines())
+            resultado += "\n"
+        
+        resultado += fuentes
+        return resultado
+        
+    except Exception as e:
+        return f"❌ Error al buscar pasajes: {e}"
+
 # ========== HERRAMIENTAS DE CREACIÓN ==========
 
+def _nombre_de_nota(titulo: str) -> str:
+    """Nombre de archivo de una nota a partir de su título"""
+    nombre_archivo = titulo.replace('/', '-').replace('\\', '-')
+    if not nombre_archivo.endswith('.md'):
+        nombre_archivo += '.md'
+    return nombre_archivo
+
+def _componer_nota(titulo: str, contenido: str, etiquetas: str = "") -> str:
+    """Contenido completo de una nota nueva: frontmatter con etiquetas, título y cuerpo"""
+    contenido_completo = ""
+    
+    # Agregar frontmatter si hay etiquetas
+    if etiquetas:
+        tags = [tag.strip() for tag in etiquetas.split(',') if tag.strip()]
+        contenido_completo += "---\n"
+        contenido_completo += f"tags: {tags}\n"
+        contenido_completo += f"created: {datetime.now().isoformat()}\n"
+        contenido_completo += "---\n\n"
+    
+    # Agregar título como header
+    contenido_completo += f"# {titulo}\n\n"
+    contenido_completo += contenido
+    return contenido_completo
+
 @mcp.tool()
-def crear_nota(titulo: str, contenido: str, carpeta: str = "", etiquetas: str = "") -> str:
+@en_hilo
+def crear_nota(titulo: str, contenido: str, carpeta: str = "", etiquetas: str = "", vault: str = "") -> str:
     """
     Crea una nueva nota en el vault
     
@@ -232,14 +794,14 @@ def crear_nota(titulo: str, contenido: str, carpeta: str = "", etiquetas: str =
         contenido: Contenido de la nota en Markdown
         carpeta: Carpeta donde crear la nota (vacío = raíz)
         etiquetas: Etiquetas separadas por comas (ej: "idea,reflexion,personal")
+        vault: Vault donde crear la nota (vacío = vault por defecto)
     """
     try:
-        vault_path = Path(OBSIDIAN_VAULT_PATH)
+        v = obtener_vault(vault)
+        vault_path = v.ruta
         
         # Preparar nombre de archivo
-        nombre_archivo = titulo.replace('/', '-').replace('\\', '-')
-        if not nombre_archivo.endswith('.md'):
-            nombre_archivo += '.md'
+        nombre_archivo = _nombre_de_nota(titulo)
         
         # Determinar ruta
         if carpeta:
@@ -254,23 +816,12 @@ def crear_nota(titulo: str, contenido: str, carpeta: str = "", etiquetas: str =
             return f"❌ Ya existe una nota con el nombre '{nombre_archivo}'"
         
         # Preparar contenido con metadatos
-        contenido_completo = ""
-        
-        # Agregar frontmatter si hay etiquetas
-        if etiquetas:
-            tags = [tag.strip() for tag in etiquetas.split(',') if tag.strip()]
-            contenido_completo += "---\n"
-            contenido_completo += f"tags: {tags}\n"
-            contenido_completo += f"created: {datetime.now().isoformat()}\n"
-            contenido_completo += "---\n\n"
-        
-        # Agregar título como header
-        contenido_completo += f"# {titulo}\n\n"
-        contenido_completo += contenido
+        contenido_completo = _componer_nota(titulo, contenido, etiquetas)
         
         # Escribir archivo
         with open(nota_path, 'w', encoding='utf-8') as f:
             f.write(contenido_completo)
+        v.nota_escrita(nota_path, contenido_completo)
         
         ruta_relativa = nota_path.relative_to(vault_path)
         return f"✅ Nota creada: {ruta_relativa}\n📄 Título: {titulo}\n📁 Ubicación: {carpeta or 'raíz'}\n🏷️ Etiquetas: {etiquetas or 'ninguna'}"
@@ -279,7 +830,8 @@ def crear_nota(titulo: str, contenido: str, carpeta: str = "", etiquetas: str =
         return f"❌ Error al crear nota: {e}"
 
 @mcp.tool()
-def agregar_a_nota(nombre_archivo: str, contenido: str, al_final: bool = True) -> str:
+@en_hilo
+def agregar_a_nota(nombre_archivo: str, contenido: str, al_final: bool = True, vault: str = "") -> str:
     """
     Agrega contenido a una nota existente
     
@@ -287,26 +839,20 @@ def agregar_a_nota(nombre_archivo: str, contenido: str, al_final: bool = True) -
         nombre_archivo: Nombre del archivo a modificar
         contenido: Contenido a agregar
         al_final: Si agregar al final (True) o al principio (False) de la nota
+        vault: Vault donde está la nota (vacío = vault por defecto)
     """
     try:
-        vault_path = Path(OBSIDIAN_VAULT_PATH)
+        v = obtener_vault(vault)
+        vault_path = v.ruta
         
         # Buscar el archivo
-        nota_path = None
-        if "/" in nombre_archivo:
-            nota_path = vault_path / nombre_archivo
-        else:
-            for archivo in vault_path.rglob("*.md"):
-                if archivo.name == nombre_archivo or archivo.stem == nombre_archivo:
-                    nota_path = archivo
-                    break
+        nota_path = v.buscar_nota(nombre_archivo)
         
-        if not nota_path or not nota_path.exists():
+        if not nota_path:
             return f"❌ No se encontró la nota '{nombre_archivo}'"
         
         # Leer contenido actual
-        with open(nota_path, 'r', encoding='utf-8') as f:
-            contenido_actual = f.read()
+        contenido_actual, _ = v.leer_contenido(nota_path)
         
         # Preparar nuevo contenido
         if al_final:
@@ -325,6 +871,7 @@ def agregar_a_nota(nombre_archivo: str, contenido: str, al_final: bool = True) -
         # Escribir archivo actualizado
         with open(nota_path, 'w', encoding='utf-8') as f:
             f.write(nuevo_contenido)
+        v.nota_escrita(nota_path, nuevo_contenido)
         
         ruta_relativa = nota_path.relative_to(vault_path)
         posicion = "al final" if al_final else "al principio"
@@ -333,62 +880,450 @@ def agregar_a_nota(nombre_archivo: str, contenido: str, al_final: bool = True) -
     except Exception as e:
         return f"❌ Error al agregar contenido: {e}"
 
+# Escritores en paralelo al importar notas y escrituras pendientes por escritor
+ESCRITORES_IMPORTACION = int(os.environ.get("OBSIDIAN_ESCRITORES_IMPORTACION", 8))
+PENDIENTES_POR_ESCRITOR = 4
+
+# Colisiones y entradas no válidas que se detallan en la respuesta
+MAX_DETALLES_IMPORTACION = 20
+
+def _leer_origen(origen: Path):
+    """
+    Recorre las notas de un directorio, un zip o un JSONL sin cargarlas
+    todas: produce (ruta relativa de destino, bytes) o (descripción, None)
+    si una entrada no es válida. Cada línea del JSONL es un objeto con
+    titulo, contenido y, opcionalmente, carpeta y etiquetas (como crear_nota).
+    """
+    if origen.is_dir():
+        # Si el origen es otro vault, se respetan también sus archivos excluidos
+        notas = [(r, e) for r, e in recorrer_archivos(origen, ReglasIgnorar.del_vault(origen)) if e.name.endswith(".md")]
+        for ruta_relativa, entrada in sorted(notas):
+            with open(entrada.path, 'rb') as f:
+                yield Path(ruta_relativa).as_posix(), f.read()
+    elif zipfile.is_zipfile(origen):
+        reglas = ReglasIgnorar(IGNORAR)
+        with zipfile.ZipFile(origen) as archivo_zip:
+            for miembro in archivo_zip.infolist():
+                if miembro.is_dir() or not miembro.filename.endswith(".md") or reglas.excluye(miembro.filename):
+                    continue
+                yield miembro.filename, archivo_zip.read(miembro)
+    else:
+        with open(origen, 'r', encoding='utf-8') as f:
+            for numero, linea in enumerate(f, 1):
+                if not linea.strip():
+                    continue
+                try:
+                    nota = json.loads(linea)
+                    titulo = str(nota["titulo"])
+                    etiquetas = nota.get("etiquetas", "")
+                    if isinstance(etiquetas, list):
+                        etiquetas = ",".join(etiquetas)
+                    contenido = _componer_nota(titulo, str(nota.get("contenido", "")), etiquetas)
+                except (ValueError, KeyError, TypeError) as e:
+                    yield f"línea {numero}: {e}", None
+                    continue
+                carpeta = str(nota.get("carpeta", "")).strip("/")
+                nombre = _nombre_de_nota(titulo)
+                yield f"{carpeta}/{nombre}" if carpeta else nombre, contenido.encode('utf-8')
+
+def _tipo_de_origen(origen: Path) -> str:
+    if origen.is_dir():
+        return "directorio"
+    return "zip" if zipfile.is_zipfile(origen) else "JSONL"
+
+def _escribir_nueva(nota_path: Path, datos: bytes, sobrescribir: bool) -> bool:
+    """Escribe la nota de una vez; sin sobrescribir, False si ya existía"""
+    try:
+        with open(nota_path, 'wb' if sobrescribir else 'xb') as f:
+            f.write(datos)
+        return True
+    except FileExistsError:
+        return False
+
+@mcp.tool()
+@en_hilo
+def importar_notas(origen: str, carpeta: str = "", simulacro: bool = False, sobrescribir: bool = False, vault: str = "") -> str:
+    """
+    Importa en bloque notas desde un directorio, un archivo zip o un JSONL
+    
+    Args:
+        origen: Ruta local del directorio, del .zip o del .jsonl (una nota por línea:
+            {"titulo": ..., "contenido": ..., "carpeta": ..., "etiquetas": ...})
+        carpeta: Carpeta del vault donde dejar las notas importadas (vacío = raíz)
+        simulacro: Si solo informar de lo que se haría y de las colisiones, sin escribir nada
+        sobrescribir: Si reemplazar las notas que ya existan (por defecto se omiten)
+        vault: Vault de destino (vacío = vault por defecto)
+    
+    Las carpetas se crean una sola vez, las notas se escriben con un pool
+    acotado de escritores y el índice y la caché se actualizan al final,
+    en un único lote.
+    """
+    try:
+        v = obtener_vault(vault)
+        origen_path = Path(origen).expanduser()
+        if not origen_path.exists():
+            return f"❌ El origen '{origen}' no existe"
+        
+        destino = (v.ruta / carpeta).resolve() if carpeta else v.ruta.resolve()
+        vault_resuelto = v.ruta.resolve()
+        if destino != vault_resuelto and vault_resuelto not in destino.parents:
+            return f"❌ La carpeta '{carpeta}' queda fuera del vault"
+        
+        # Las notas existentes salen del índice o de un único recorrido, no de un exists() por nota
+        indice = v.indice_listo()
+        existentes = set(indice.notas) if indice is not None else {
+            Path(ruta_relativa).as_posix() for ruta_relativa, entrada in recorrer_archivos(v.ruta, v.reglas_ignorar())
+            if entrada.name.endswith(".md")
+        }
+        
+        inicio = time.perf_counter()
+        vistas: Set[str] = set()
+        carpetas_creadas: Set[Path] = set()
+        colisiones: List[str] = []
+        repetidas: List[str] = []
+        no_validas: List[str] = []
+        escritas: List[Path] = []
+        fallidas: List[str] = []
+        omitidas_al_escribir = 0
+        # Escritura en vuelo -> (nota, ruta relativa)
+        pendientes: Dict = {}
+        
+        def recoger(hechas):
+            nonlocal omitidas_al_escribir
+            for futuro in hechas:
+                nota_path, ruta_relativa = pendientes.pop(futuro)
+                try:
+                    if futuro.result():
+                        escritas.append(nota_path)
+                    else:
+                        omitidas_al_escribir += 1
+                except Exception as e:
+                    fallidas.append(f"{ruta_relativa}: {e}")
+        
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, ESCRITORES_IMPORTACION), thread_name_prefix="importar") as escritores:
+                for ruta_origen, datos in _leer_origen(origen_path):
+                    if datos is None:
+                        no_validas.append(ruta_origen)
+                        continue
+                    # normpath en lugar de resolve(): sin un lstat por componente de cada ruta
+                    ruta_relativa = os.path.relpath(os.path.normpath(os.path.join(destino, ruta_origen)), vault_resuelto)
+                    if ruta_relativa == os.pardir or ruta_relativa.startswith(os.pardir + os.sep):
+                        no_validas.append(f"{ruta_origen}: queda fuera del vault")
+                        continue
+                    ruta_relativa = Path(ruta_relativa).as_posix()
+                    # Bajo v.ruta tal como está configurada (puede ser un enlace simbólico):
+                    # el índice y la caché de notas calculan las rutas relativas a ella
+                    nota_path = v.ruta / ruta_relativa
+                    if ruta_relativa in vistas:
+                        repetidas.append(ruta_relativa)
+                        continue
+                    vistas.add(ruta_relativa)
+                    if ruta_relativa in existentes:
+                        colisiones.append(ruta_relativa)
+                        if not sobrescribir:
+                            continue
+                    if simulacro:
+                        continue
+                    
+                    if nota_path.parent not in carpetas_creadas:
+                        try:
+                            nota_path.parent.mkdir(parents=True, exist_ok=True)
+                        except OSError as e:
+                            fallidas.append(f"{ruta_relativa}: {e}")
+                            continue
+                        carpetas_creadas.add(nota_path.parent)
+                    pendientes[escritores.submit(_escribir_nueva, nota_path, datos, sobrescribir)] = (nota_path, ruta_relativa)
+                    
+                    # Acotar las escrituras en vuelo: el origen se lee al ritmo de los escritores
+                    if len(pendientes) >= ESCRITORES_IMPORTACION * PENDIENTES_POR_ESCRITOR:
+                        hechas, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+                        recoger(hechas)
+        finally:
+            # También si el origen falló a medias: las escrituras que estaban en vuelo
+            # terminaron al cerrar el pool y lo que ya está en disco tiene que aparecer
+            # en el índice, en un único lote para el índice y la caché
+            recoger(wait(pendientes)[0])
+            if escritas:
+                v.notas_escritas(escritas)
+        segundos = time.perf_counter() - inicio
+        
+        tipo = _tipo_de_origen(origen_path)
+        if simulacro:
+            resultado = f"🧪 Simulacro de importación desde {tipo} '{origen}' en '{v.nombre}':\n\n"
+            resultado += f"   📄 Se crearían {len(vistas) - len(colisiones)} notas\n"
+            if sobrescribir:
+                resultado += f"   ♻️ Se sobrescribirían {len(colisiones)} notas existentes\n"
+        else:
+            creadas = len(escritas)
+            resultado = f"📥 Importación desde {tipo} '{origen}' en '{v.nombre}':\n\n"
+            resultado += (f"   ✅ {creadas} notas escritas en {len(carpetas_creadas)} carpetas "
+                          f"({segundos:.2f}s, {creadas / max(segundos, 1e-9):.0f} notas/s)\n")
+            if omitidas_al_escribir:
+                resultado += f"   ⚠️ {omitidas_al_escribir} notas aparecieron durante la importación y se omitieron\n"
+            if fallidas:
+                resultado += f"   ❌ No se pudieron escribir ({len(fallidas)}):\n"
+                resultado += "".join(f"      - {f}\n" for f in fallidas[:MAX_DETALLES_IMPORTACION])
+        
+        if colisiones:
+            accion = "se sobrescriben" if sobrescribir else "se omiten"
+            resultado += f"   ⚠️ Ya existen en el vault ({len(colisiones)}, {accion}):\n"
+            resultado += "".join(f"      - {c}\n" for c in colisiones[:MAX_DETALLES_IMPORTACION])
+            if len(colisiones) > MAX_DETALLES_IMPORTACION:
+                resultado += f"      ... y {len(colisiones) - MAX_DETALLES_IMPORTACION} más\n"
+        if repetidas:
+            resultado += f"   ⚠️ Repetidas en el origen ({len(repetidas)}, se importa la primera):\n"
+            resultado += "".join(f"      - {r}\n" for r in repetidas[:MAX_DETALLES_IMPORTACION])
+        if no_validas:
+            resultado += f"   ❌ Entradas no válidas ({len(no_validas)}):\n"
+            resultado += "".join(f"      - {e}\n" for e in no_validas[:MAX_DETALLES_IMPORTACION])
+        return resultado
+        
+    except Exception as e:
+        return f"❌ Error al importar notas: {e}"
+
+PATRON_ENLACE_DESTINO = re.compile(r'(!?\[\[)([^\]|#]+)([^\]]*\]\])')
+
+def reescribir_enlaces(contenido: str, claves: tuple, nuevo_por_ruta: str, nuevo_por_nombre: Optional[str]) -> tuple:
+    """
+    Cambia el destino de los enlaces [[...]] (y ![[...]]) que apuntan a una
+    nota, conservando alias, encabezado y la extensión si la llevaban.
+    `claves` son las de claves_de_nota; con `nuevo_por_nombre` None los
+    enlaces solo por nombre no se tocan (nombre ambiguo). Devuelve
+    (contenido, enlaces reescritos).
+    """
+    clave_ruta, clave_nombre = claves
+    reescritos = 0
+    
+    def sustituir(coincidencia):
+        nonlocal reescritos
+        destino = coincidencia.group(2).strip()
+        con_extension = destino.lower().endswith(".md")
+        clave = destino_enlace(destino)
+        if "/" in clave:
+            nuevo = nuevo_por_ruta if clave == clave_ruta else None
+        else:
+            nuevo = nuevo_por_nombre if clave == clave_nombre else None
+        if nuevo is None:
+            return coincidencia.group(0)
+        enlace = f"{coincidencia.group(1)}{nuevo}{'.md' if con_extension else ''}{coincidencia.group(3)}"
+        if enlace != coincidencia.group(0):
+            reescritos += 1
+        return enlace
+    
+    return PATRON_ENLACE_DESTINO.sub(sustituir, contenido), reescritos
+
+class CambioDeEnlaces:
+    """Reescritura pendiente de una nota: su contenido original y el nuevo, ya en un temporal"""
+    __slots__ = ('archivo', 'original', 'stats', 'temporal', 'enlaces', 'aplicado')
+    
+    def __init__(self, archivo: Path, original: bytes, stats, temporal: Path, enlaces: int):
+        self.archivo = archivo
+        self.original = original
+        self.stats = stats
+        self.temporal = temporal
+        self.enlaces = enlaces
+        self.aplicado = False
+
+def _escribir_atomico(archivo: Path, datos: bytes) -> Path:
+    """Escribe en un temporal oculto junto al archivo; el reemplazo (os.replace) es atómico"""
+    temporal = archivo.with_name(f".{archivo.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(temporal, 'wb') as f:
+        f.write(datos)
+        f.flush()
+        os.fsync(f.fileno())
+    return temporal
+
+def _preparar_cambio(archivo: Path, claves: tuple, nuevo_por_ruta: str, nuevo_por_nombre: Optional[str]) -> Optional[CambioDeEnlaces]:
+    """
+    Lee una nota que enlaza la renombrada y deja su nuevo contenido en un
+    temporal. None si no hay nada que cambiar (o la nota ya no existe o no
+    es UTF-8, como hace el índice).
+    """
+    try:
+        stats = archivo.stat()
+        with open(archivo, 'rb') as f:
+            original = f.read()
+        contenido, enlaces = reescribir_enlaces(original.decode('utf-8'), claves, nuevo_por_ruta, nuevo_por_nombre)
+    except (FileNotFoundError, UnicodeDecodeError):
+        return None
+    if not enlaces:
+        return None
+    return CambioDeEnlaces(archivo, original, stats, _escribir_atomico(archivo, contenido.encode('utf-8')), enlaces)
+
+def _deshacer_cambios(cambios: List[CambioDeEnlaces]):
+    """Devuelve cada nota ya reescrita a su contenido original y borra los temporales"""
+    for cambio in cambios:
+        try:
+            if cambio.aplicado:
+                os.replace(_escribir_atomico(cambio.archivo, cambio.original), cambio.archivo)
+            else:
+                cambio.temporal.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+@mcp.tool()
+@en_hilo
+def renombrar_nota(nombre_archivo: str, nuevo_nombre: str, vault: str = "") -> str:
+    """
+    Renombra o mueve una nota y actualiza todos los enlaces [[...]] que apuntan a ella
+    
+    Args:
+        nombre_archivo: Nota a renombrar (puede incluir ruta, ej: "Proyectos/Idea.md")
+        nuevo_nombre: Nuevo nombre; con carpeta (ej: "Archivo/Idea vieja") también la mueve
+        vault: Vault donde está la nota (vacío = vault por defecto)
+    
+    Con el índice listo solo se abren las notas que enlazan la renombrada.
+    Todo se hace como una única transacción: los contenidos nuevos se
+    preparan en temporales, cada nota se reemplaza de forma atómica y, si
+    algo falla (o una nota cambió mientras tanto), se deshacen todos los
+    cambios.
+    """
+    try:
+        v = obtener_vault(vault)
+        origen = v.buscar_nota(nombre_archivo)
+        if not origen:
+            return f"❌ No se encontró la nota '{nombre_archivo}'"
+        ruta_origen = origen.relative_to(v.ruta).as_posix()
+        
+        # Sin carpeta, la nota se queda en la suya
+        nuevo = nuevo_nombre.strip().strip("/")
+        if not nuevo.endswith(".md"):
+            nuevo += ".md"
+        if "/" not in nuevo and "/" in ruta_origen:
+            nuevo = f"{ruta_origen.rsplit('/', 1)[0]}/{nuevo}"
+        ruta_destino = os.path.normpath(nuevo)
+        if ruta_destino == os.pardir or ruta_destino.startswith(os.pardir + os.sep) or os.path.isabs(ruta_destino):
+            return f"❌ '{nuevo_nombre}' queda fuera del vault"
+        ruta_destino = Path(ruta_destino).as_posix()
+        destino = v.ruta / ruta_destino
+        if destino.exists():
+            return f"❌ Ya existe una nota en '{ruta_destino}'"
+        
+        # Notas que enlazan la nota: del índice de retroenlaces o, sin él, todo el vault
+        claves = claves_de_nota(ruta_origen)
+        claves_nuevas = claves_de_nota(ruta_destino)
+        indice = v.indice_listo()
+        if indice is not None:
+            rutas, ambiguo = indice.notas_que_enlazan(ruta_origen)
+            candidatas = [v.ruta / r for r in sorted(rutas)]
+            nombre_ocupado = claves_nuevas[1] != claves[1] and indice.notas_por_nombre.get(claves_nuevas[1], 0) > 0
+            fuente = "índice de retroenlaces"
+        else:
+            candidatas = sorted(v.archivos())
+            nombres = Counter(claves_de_nota(a.relative_to(v.ruta).as_posix())[1] for a in candidatas)
+            ambiguo = nombres[claves[1]] > 1
+            nombre_ocupado = claves_nuevas[1] != claves[1] and nombres[claves_nuevas[1]] > 0
+            fuente = _fuente(v)
+        
+        # Los enlaces por nombre siguen siendo por nombre si el nuevo no choca con otra nota
+        nuevo_por_ruta = Path(ruta_destino).with_suffix("").as_posix()
+        nuevo_por_nombre = None if ambiguo else (nuevo_por_ruta if nombre_ocupado else Path(ruta_destino).stem)
+        
+        inicio = time.perf_counter()
+        cambios: List[CambioDeEnlaces] = []
+        try:
+            # 1. Preparar en paralelo los contenidos nuevos en temporales
+            with ThreadPoolExecutor(max_workers=max(1, ESCRITORES_IMPORTACION), thread_name_prefix="renombrar") as escritores:
+                futuros = [escritores.submit(_preparar_cambio, a, claves, nuevo_por_ruta, nuevo_por_nombre) for a in candidatas]
+                errores = []
+                for futuro in futuros:
+                    try:
+                        cambio = futuro.result()
+                    except OSError as e:
+                        errores.append(e)
+                        continue
+                    if cambio is not None:
+                        cambios.append(cambio)
+                if errores:
+                    raise errores[0]
+            
+            # 2. Confirmar: reemplazar cada nota (si nadie la tocó entretanto) y mover la renombrada
+            for cambio in cambios:
+                stats = cambio.archivo.stat()
+                if (stats.st_mtime_ns, stats.st_size) != (cambio.stats.st_mtime_ns, cambio.stats.st_size):
+                    raise RuntimeError(f"'{cambio.archivo.relative_to(v.ruta)}' cambió durante el renombrado")
+                os.replace(cambio.temporal, cambio.archivo)
+                cambio.aplicado = True
+            destino.parent.mkdir(parents=True, exist_ok=True)
+            os.rename(origen, destino)
+        except Exception as e:
+            _deshacer_cambios(cambios)
+            return (f"❌ No se pudo renombrar '{ruta_origen}': {e}\n"
+                    f"↩️ Se deshicieron todos los cambios ({sum(c.aplicado for c in cambios)} notas restauradas)")
+        
+        # La nota renombrada también pudo enlazarse a sí misma
+        actualizadas = [destino if c.archivo == origen else c.archivo for c in cambios]
+        v.notas_escritas([origen, destino] + [a for a in actualizadas if a != destino])
+        segundos = time.perf_counter() - inicio
+        
+        enlaces = sum(c.enlaces for c in cambios)
+        resultado = f"✅ Nota renombrada: {ruta_origen} → {ruta_destino}\n"
+        resultado += f"🔗 {enlaces} enlaces actualizados en {len(cambios)} notas ({len(candidatas)} revisadas, {segundos:.2f}s)\n"
+        if ambiguo:
+            resultado += (f"⚠️ Varias notas se llaman '{Path(ruta_origen).stem}': los enlaces solo por nombre "
+                          f"no se tocaron porque no se sabe a cuál apuntan\n")
+        resultado += f"\n{'⚡' if indice is not None else '🔎'} Fuente: {fuente}\n"
+        return resultado
+        
+    except Exception as e:
+        return f"❌ Error al renombrar nota: {e}"
+
 # ========== HERRAMIENTAS DE ANÁLISIS ==========
 
+def _estadisticas_de_vault(v: Vault, seguimiento: Optional[Seguimiento] = None) -> dict:
+    """Calcula los agregados de estadisticas_vault para un único vault"""
+    indice = v.indice_listo()
+    cubiertas = total = None
+    if indice is not None:
+        estadisticas = indice.estadisticas()
+    else:
+        rutas = [str(archivo) for archivo in v.archivos()]
+        parciales, cubiertas = recorrer_por_fragmentos(
+            fragmento_estadisticas, rutas, str(v.ruta), seguimiento=seguimiento or Seguimiento()
+        )
+        total = len(rutas)
+        estadisticas = combinar_estadisticas(parciales)
+    estadisticas['fuente'] = _fuente(v)
+    # Posición hasta la que se llegó si el recorrido se detuvo antes de terminar
+    estadisticas['siguiente'] = cubiertas if cubiertas is not None and cubiertas < total else None
+    return estadisticas
+
 @mcp.tool()
-def estadisticas_vault() -> str:
+async def estadisticas_vault(vault: str = "", plazo_segundos: float = 0, ctx: Optional[Context] = None) -> str:
     """
     Genera estadísticas completas del vault de Obsidian
+    
+    Args:
+        vault: Vault a analizar (vacío = todos los vaults configurados, combinados)
+        plazo_segundos: Tiempo máximo del recorrido; al agotarse devuelve las estadísticas
+            de las notas revisadas hasta entonces (0 = plazo por defecto del servidor)
     """
     try:
-        vault_path = Path(OBSIDIAN_VAULT_PATH)
+        vaults = vaults_objetivo(vault)
+        seguimiento = crear_seguimiento(plazo_segundos)
+        parciales = await con_progreso(ctx, seguimiento, en_paralelo(_estadisticas_de_vault, vaults, seguimiento))
+        varios = len(vaults) > 1
         
-        # Contadores
-        total_notas = 0
-        total_palabras = 0
-        total_caracteres = 0
+        # Combinar los agregados de cada vault
+        total_notas = sum(p['total_notas'] for p in parciales)
+        total_palabras = sum(p['total_palabras'] for p in parciales)
+        total_caracteres = sum(p['total_caracteres'] for p in parciales)
         carpetas = set()
         etiquetas = set()
         enlaces_internos = set()
-        
-        # Análisis por fecha
         por_fecha = {}
-        
-        for archivo in vault_path.rglob("*.md"):
-            total_notas += 1
-            
-            # Carpeta
-            carpeta_padre = archivo.parent.relative_to(vault_path)
-            if str(carpeta_padre) != '.':
-                carpetas.add(str(carpeta_padre))
-            
-            try:
-                with open(archivo, 'r', encoding='utf-8') as f:
-                    contenido = f.read()
-                
-                # Contar palabras y caracteres
-                palabras = len(contenido.split())
-                total_palabras += palabras
-                total_caracteres += len(contenido)
-                
-                # Buscar etiquetas (#tag)
-                tags_encontrados = re.findall(r'#(\w+)', contenido)
-                etiquetas.update(tags_encontrados)
-                
-                # Buscar enlaces internos [[link]]
-                enlaces_encontrados = re.findall(r'\[\[([^\]]+)\]\]', contenido)
-                enlaces_internos.update(enlaces_encontrados)
-                
-                # Fecha de modificación
-                fecha_mod = datetime.fromtimestamp(archivo.stat().st_mtime).date()
-                fecha_str = fecha_mod.strftime('%Y-%m')
-                por_fecha[fecha_str] = por_fecha.get(fecha_str, 0) + 1
-                
-            except:
-                continue
+        for v, p in zip(vaults, parciales):
+            carpetas.update(_ruta_mostrada(v, c, varios) for c in p['carpetas'])
+            etiquetas.update(p['etiquetas'])
+            enlaces_internos.update(p['enlaces_internos'])
+            for fecha_str, n in p['por_fecha'].items():
+                por_fecha[fecha_str] = por_fecha.get(fecha_str, 0) + n
         
         # Formatear estadísticas
-        resultado = f"📊 **Estadísticas del Vault 'Secundo Selebro'**\n\n"
+        nombres = ", ".join(f"'{v.nombre}'" for v in vaults)
+        titulo = f"Estadísticas de los Vaults {nombres}" if varios else f"Estadísticas del Vault {nombres}"
+        resultado = f"📊 **{titulo}**\n\n"
         
         resultado += f"📚 **Contenido:**\n"
         resultado += f"   • Total de notas: {total_notas:,}\n"
@@ -417,23 +1352,58 @@ def estadisticas_vault() -> str:
         for fecha in sorted(list(por_fecha.keys()))[-6:]:
             resultado += f"   • {fecha}: {por_fecha[fecha]} notas\n"
         
+        pendientes = [(v, p['siguiente']) for v, p in zip(vaults, parciales) if p['siguiente'] is not None]
+        resultado += "\n" + aviso_parcial(seguimiento, pendientes, continuable=False)
+        resultado += _describir_fuentes(vaults, [p['fuente'] for p in parciales])
         return resultado
         
     except Exception as e:
         return f"❌ Error al generar estadísticas: {e}"
 
+def _notas_por_fecha_en_vault(v: Vault, fecha_inicio: date, fecha_fin: date,
+                              seguimiento: Optional[Seguimiento] = None, desde: str = "") -> tuple:
+    """
+    Notas de un vault modificadas entre dos fechas (inclusive). Devuelve
+    (notas, siguiente), con `siguiente` la última nota cubierta si el
+    recorrido se detuvo antes de terminar.
+    """
+    indice = v.indice_listo()
+    if indice is not None:
+        with indice._lock:
+            notas = indice.metadatos.listar()
+        return [nota for nota in notas if nota.ruta > desde and fecha_inicio <= nota.fecha <= fecha_fin], None
+    
+    archivos = notas_tras(v, desde)
+    notas = []
+    for archivo in recorrer_con_plazo(archivos, seguimiento or Seguimiento()):
+        notas.append(FilaNota.desde_archivo(archivo, v.ruta))
+    siguiente = ultima_cubierta(v, archivos, len(notas), desde)
+    return [nota for nota in notas if fecha_inicio <= nota.fecha <= fecha_fin], siguiente
+
+def _notas_por_fecha_cacheado(v: Vault, fecha_inicio: date, fecha_fin: date, usar_cache: bool,
+                              seguimiento: Optional[Seguimiento] = None, desde: str = "") -> tuple:
+    """_notas_por_fecha_en_vault a través de la caché; devuelve (notas, fuente, siguiente)"""
+    clave = ("buscar_notas_por_fecha", fecha_inicio, fecha_fin, desde)
+    (notas, siguiente), desde_cache = v.resultado_cacheado(
+        clave, usar_cache, lambda: _notas_por_fecha_en_vault(v, fecha_inicio, fecha_fin, seguimiento, desde), seguimiento
+    )
+    return notas, "caché de resultados" if desde_cache else _fuente(v), siguiente
+
 @mcp.tool()
-def buscar_notas_por_fecha(fecha_desde: str, fecha_hasta: str = "") -> str:
+async def buscar_notas_por_fecha(fecha_desde: str, fecha_hasta: str = "", vault: str = "", usar_cache: bool = True,
+                                 plazo_segundos: float = 0, continuar: str = "") -> str:
     """
     Busca notas modificadas en un rango de fechas
     
     Args:
         fecha_desde: Fecha de inicio (YYYY-MM-DD)
         fecha_hasta: Fecha de fin (YYYY-MM-DD, opcional, por defecto hoy)
+        vault: Vault donde buscar (vacío = todos los vaults configurados)
+        usar_cache: Si reutilizar el resultado de una búsqueda idéntica reciente
+        plazo_segundos: Tiempo máximo del recorrido (0 = plazo por defecto del servidor)
+        continuar: Cursor de una respuesta parcial anterior para seguir donde se quedó
     """
     try:
-        vault_path = Path(OBSIDIAN_VAULT_PATH)
-        
         # Parsear fechas
         fecha_inicio = datetime.strptime(fecha_desde, '%Y-%m-%d').date()
         if fecha_hasta:
@@ -441,97 +1411,726 @@ def buscar_notas_por_fecha(fecha_desde: str, fecha_hasta: str = "") -> str:
         else:
             fecha_fin = date.today()
         
-        notas_encontradas = []
-        
-        for archivo in vault_path.rglob("*.md"):
-            fecha_mod = datetime.fromtimestamp(archivo.stat().st_mtime).date()
-            
-            if fecha_inicio <= fecha_mod <= fecha_fin:
-                ruta_relativa = archivo.relative_to(vault_path)
-                stats = archivo.stat()
-                
-                notas_encontradas.append({
-                    'nombre': archivo.name,
-                    'ruta': str(ruta_relativa),
-                    'fecha': fecha_mod.strftime('%Y-%m-%d'),
-                    'tamaño': f"{stats.st_size/1024:.1f}KB"
-                })
+        objetivos = vaults_a_recorrer(vault, continuar)
+        vaults = [v for v, _ in objetivos]
+        seguimiento = crear_seguimiento(plazo_segundos)
+        parciales = await en_paralelo_desde(_notas_por_fecha_cacheado, objetivos, fecha_inicio, fecha_fin, usar_cache, seguimiento)
+        notas_encontradas = [(v, n) for v, p in zip(vaults, parciales) for n in p[0]]
+        fuentes = aviso_parcial(seguimiento, [(v, p[2]) for v, p in zip(vaults, parciales) if p[2] is not None])
+        fuentes += _describir_fuentes(vaults, [p[1] for p in parciales])
+        varios = len(vaults) > 1
         
         if not notas_encontradas:
-            return f"📅 No se encontraron notas modificadas entre {fecha_desde} y {fecha_fin}"
+            return f"📅 No se encontraron notas modificadas entre {fecha_desde} y {fecha_fin}\n\n{fuentes}"
         
         # Ordenar por fecha (más recientes primero)
-        notas_encontradas.sort(key=lambda x: x['fecha'], reverse=True)
+        notas_encontradas.sort(key=lambda x: x[1].mtime_ns, reverse=True)
         
         resultado = f"📅 Notas modificadas entre {fecha_desde} y {fecha_fin} ({len(notas_encontradas)} encontradas):\n\n"
         
-        for nota in notas_encontradas:
-            resultado += f"📄 {nota['nombre']} ({nota['tamaño']})\n"
-            resultado += f"   📍 {nota['ruta']} | 📅 {nota['fecha']}\n\n"
+        for v, nota in notas_encontradas:
+            resultado += f"📄 {nota.nombre} ({nota.tamaño / 1024:.1f}KB)\n"
+            resultado += f"   📍 {_ruta_mostrada(v, nota.ruta, varios)} | 📅 {nota.fecha:%Y-%m-%d}\n\n"
         
+        resultado += fuentes
         return resultado
         
+    except CursorNoValido as e:
+        return f"❌ {e}"
     except ValueError:
         return "❌ Formato de fecha inválido. Usa YYYY-MM-DD (ej: 2024-01-15)"
     except Exception as e:
         return f"❌ Error al buscar por fecha: {e}"
 
+def _leer_frontmatter(archivo: Path) -> str:
+    """Lee solo el bloque de frontmatter de una nota, sin cargar el cuerpo"""
+    with open(archivo, 'r', encoding='utf-8') as f:
+        primera = f.readline()
+        if not primera.startswith("---"):
+            return ""
+        lineas = [primera]
+        for linea in f:
+            lineas.append(linea)
+            if linea.startswith("---"):
+                break
+        return "".join(lineas)
+
+def _consultar_en_vault(v: Vault, condiciones: List[tuple], campos: List[str],
+                        seguimiento: Optional[Seguimiento] = None, desde: str = "") -> tuple:
+    """Filas de consultar_notas para un vault; devuelve (filas, fuente, siguiente)"""
+    indice = v.indice_listo()
+    if indice is not None:
+        return [fila for fila in indice.consultar(condiciones, campos) if fila["ruta"] > desde], "índice", None
+    
+    # Índice aún no listo: se lee solo el frontmatter de cada nota
+    filas = []
+    archivos = notas_tras(v, desde)
+    revisadas = 0
+    for archivo in recorrer_con_plazo(archivos, seguimiento or Seguimiento()):
+        revisadas += 1
+        ruta_relativa = str(archivo.relative_to(v.ruta))
+        try:
+            propiedades = propiedades_indexables(_leer_frontmatter(archivo))
+        except (OSError, UnicodeDecodeError):
+            continue
+        valor = lambda campo: campo_de_archivo(campo, ruta_relativa) if campo in CAMPOS_DE_ARCHIVO else propiedades.get(campo)
+        if all(cumple(valor(campo), operador, buscado) for campo, operador, buscado in condiciones):
+            filas.append({campo: valor(campo) for campo in campos})
+    return filas, _fuente(v), ultima_cubierta(v, archivos, revisadas, desde)
+
+@mcp.tool()
+async def consultar_notas(filtros: str = "", ordenar: str = "", campos: str = "", limite: int = 50, vault: str = "",
+                          plazo_segundos: float = 0, continuar: str = "") -> str:
+    """
+    Consulta las notas por sus propiedades del frontmatter (al estilo Dataview)
+    
+    Args:
+        filtros: Condiciones separadas por comas, ej: "status=open, due<2024-06-01, tags=proyecto".
+            Operadores: =, !=, <, <=, >, >= y ~ (contiene). En listas, = busca un elemento
+        ordenar: Campo por el que ordenar; con "-" delante, descendente (ej: "-due")
+        campos: Campos a mostrar separados por comas (por defecto los usados en filtros y orden)
+        limite: Número máximo de notas a mostrar (por defecto: 50)
+        vault: Vault donde consultar (vacío = todos los vaults configurados)
+        plazo_segundos: Tiempo máximo si hay que recorrer el vault (0 = plazo por defecto del servidor)
+        continuar: Cursor de una respuesta parcial anterior para seguir donde se quedó
+    
+    Además de las propiedades indexadas (OBSIDIAN_PROPIEDADES) se pueden
+    usar los campos ruta, nombre y carpeta.
+    """
+    try:
+        condiciones = parsear_filtros(filtros)
+        descendente = ordenar.startswith("-")
+        campo_orden = ordenar.lstrip("-").strip().lower()
+        mostrar = [c.strip().lower() for c in campos.split(",") if c.strip()]
+        if not mostrar:
+            mostrar = list(dict.fromkeys([c for c, _, _ in condiciones] + ([campo_orden] if campo_orden else [])))
+        mostrar = [c for c in mostrar if c != "ruta"]
+        
+        usados = set(mostrar) | {c for c, _, _ in condiciones} | ({campo_orden} if campo_orden else set())
+        no_indexados = sorted(c for c in usados if c not in CAMPOS_DE_ARCHIVO and c not in PROPIEDADES_INDEXADAS)
+        if no_indexados and "*" not in PROPIEDADES_INDEXADAS:
+            return (f"❌ Propiedades no indexadas: {', '.join(no_indexados)}\n"
+                    f"💡 Propiedades indexadas: {', '.join(PROPIEDADES_INDEXADAS)} "
+                    f"(configurables con OBSIDIAN_PROPIEDADES)")
+        
+        objetivos = vaults_a_recorrer(vault, continuar)
+        vaults = [v for v, _ in objetivos]
+        seguimiento = crear_seguimiento(plazo_segundos)
+        columnas = ["ruta"] + mostrar + ([campo_orden] if campo_orden and campo_orden not in mostrar else [])
+        parciales = await en_paralelo_desde(_consultar_en_vault, objetivos, condiciones, columnas, seguimiento)
+        filas = [(v, fila) for v, p in zip(vaults, parciales) for fila in p[0]]
+        fuentes = aviso_parcial(seguimiento, [(v, p[2]) for v, p in zip(vaults, parciales) if p[2] is not None])
+        fuentes += _describir_fuentes(vaults, [p[1] for p in parciales])
+        varios = len(vaults) > 1
+        
+        if not filas:
+            return f"🧮 Ninguna nota cumple '{filtros}'\n\n{fuentes}"
+        
+        filas.sort(key=lambda x: x[1]["ruta"])
+        if campo_orden:
+            # Las notas sin la propiedad van siempre al final
+            con_valor = [f for f in filas if f[1][campo_orden] is not None]
+            sin_valor = [f for f in filas if f[1][campo_orden] is None]
+            con_valor.sort(key=lambda x: clave_orden(x[1][campo_orden]), reverse=descendente)
+            filas = con_valor + sin_valor
+        
+        resultado = f"🧮 Consulta '{filtros or 'todas las notas'}' ({len(filas)} notas):\n\n"
+        for v, fila in filas[:limite]:
+            resultado += f"📄 {_ruta_mostrada(v, fila['ruta'], varios)}\n"
+            detalles = [f"{c}: {valor_mostrado(fila[c])}" for c in mostrar if fila[c] not in (None, "")]
+            if detalles:
+                resultado += f"   {' | '.join(detalles)}\n"
+        
+        if len(filas) > limite:
+            resultado += f"\n... y {len(filas) - limite} notas más\n"
+        
+        resultado += f"\n{fuentes}"
+        return resultado
+        
+    except ValueError as e:
+        return f"❌ {e}"
+    except Exception as e:
+        return f"❌ Error al consultar notas: {e}"
+
+def _grafo_de_vault(v: Vault) -> tuple:
+    """(grafo, fuente, reutilizado): del índice si está listo; si no, recorriendo el vault"""
+    indice = v.indice_listo()
+    if indice is not None:
+        reutilizado = indice._grafo is not None and indice._grafo[0] == indice.version_enlaces
+        return indice.grafo(), "índice", reutilizado
+    
+    retroenlaces: Dict[str, Set[str]] = {}
+    notas = []
+    for archivo in v.archivos():
+        ruta_relativa = archivo.relative_to(v.ruta).as_posix()
+        notas.append(ruta_relativa)
+        try:
+            contenido = archivo.read_text(encoding='utf-8')
+        except (OSError, UnicodeDecodeError):
+            continue
+        for enlace in PATRON_ENLACE.findall(contenido):
+            retroenlaces.setdefault(destino_enlace(enlace), set()).add(ruta_relativa)
+    return GrafoEnlaces.desde_indice(notas, retroenlaces), _fuente(v), False
+
+@mcp.tool()
+@en_hilo
+def analizar_grafo(top: int = 10, vault: str = "") -> str:
+    """
+    Analiza la estructura de enlaces del vault: notas más centrales (PageRank),
+    más enlazadas y más enlazadoras, componentes conexas y notas aisladas
+    
+    Args:
+        top: Cuántas notas mostrar en cada ranking (por defecto: 10)
+        vault: Vault a analizar (vacío = vault por defecto)
+    """
+    try:
+        v = obtener_vault(vault)
+        inicio = time.perf_counter()
+        grafo, fuente, reutilizado = _grafo_de_vault(v)
+        n = len(grafo)
+        if not n:
+            return f"🕸️ El vault '{v.nombre}' no tiene notas"
+        
+        rango = grafo.pagerank()
+        componentes = grafo.componentes()
+        tamaños = Counter(componentes)
+        aisladas = sum(1 for i in range(n) if not grafo.grado_salida(i) and not grafo.grado_entrada(i))
+        segundos = time.perf_counter() - inicio
+        
+        resultado = f"🕸️ Grafo de enlaces de '{v.nombre}': {n} notas, {grafo.num_enlaces} enlaces\n\n"
+        
+        resultado += "🏆 **Notas más centrales (PageRank):**\n"
+        for i in heapq.nlargest(top, range(n), key=rango.__getitem__):
+            resultado += f"   • {grafo.nodos[i]} ({rango[i]:.4f})\n"
+        
+        resultado += "\n📥 **Más enlazadas (enlaces entrantes):**\n"
+        for i in heapq.nlargest(top, range(n), key=grafo.grado_entrada):
+            resultado += f"   • {grafo.nodos[i]}: {grafo.grado_entrada(i)}\n"
+        
+        resultado += "\n📤 **Más enlazadoras (enlaces salientes):**\n"
+        for i in heapq.nlargest(top, range(n), key=grafo.grado_salida):
+            resultado += f"   • {grafo.nodos[i]}: {grafo.grado_salida(i)}\n"
+        
+        mayores = tamaños.most_common(5)
+        resultado += f"\n🧩 **Componentes conexas:** {len(tamaños)} | 🏝️ Notas aisladas: {aisladas}\n"
+        for raiz, tamaño in mayores:
+            resultado += f"   • {tamaño} notas ({tamaño / n:.0%}), p. ej. {grafo.nodos[raiz]}\n"
+        
+        calculo = "numpy" if np is not None else "Python puro"
+        reuso = " | ♻️ grafo reutilizado (enlaces sin cambios)" if reutilizado else ""
+        resultado += f"\n⏱️ {segundos:.2f}s ({calculo}){reuso}\n"
+        icono = "⚡" if fuente == "índice" else "🔎"
+        resultado += f"{icono} Fuente: {fuente}\n"
+        return resultado
+        
+    except Exception as e:
+        return f"❌ Error al analizar el grafo: {e}"
+
+@mcp.tool()
+@en_hilo
+def camino_entre_notas(origen: str, destino: str, solo_salientes: bool = False, vault: str = "") -> str:
+    """
+    Encuentra el camino más corto de enlaces entre dos notas
+    
+    Args:
+        origen: Nota de partida (nombre o ruta)
+        destino: Nota de llegada (nombre o ruta)
+        solo_salientes: Si seguir solo los enlaces en su sentido (por defecto también se
+            recorren al revés, como en la vista de grafo de Obsidian)
+        vault: Vault de las notas (vacío = vault por defecto)
+    """
+    try:
+        v = obtener_vault(vault)
+        notas = []
+        for nombre in (origen, destino):
+            nota_path = v.buscar_nota(nombre)
+            if not nota_path:
+                return f"❌ No se encontró la nota '{nombre}'"
+            notas.append(nota_path.relative_to(v.ruta).as_posix())
+        
+        grafo, fuente, _ = _grafo_de_vault(v)
+        camino = grafo.camino(grafo.posicion[notas[0]], grafo.posicion[notas[1]], solo_salientes)
+        icono = "⚡" if fuente == "índice" else "🔎"
+        if camino is None:
+            sentido = " siguiendo los enlaces en su sentido" if solo_salientes else ""
+            return f"🚫 No hay ningún camino de enlaces de '{notas[0]}' a '{notas[1]}'{sentido}\n\n{icono} Fuente: {fuente}\n"
+        
+        resultado = f"🧭 Camino de {len(camino) - 1} saltos de '{notas[0]}' a '{notas[1]}':\n\n"
+        for anterior, i in zip([None] + camino, camino):
+            if anterior is None:
+                resultado += f"   📍 {grafo.nodos[i]}\n"
+            else:
+                flecha = "→" if i in grafo.salientes(anterior) else "←"
+                resultado += f"   {flecha} {grafo.nodos[i]}\n"
+        resultado += f"\n{icono} Fuente: {fuente}\n"
+        return resultado
+        
+    except Exception as e:
+        return f"❌ Error al buscar el camino: {e}"
+
+def _adjuntos_sin_referencias_en_vault(v: Vault, carpeta: str) -> Optional[tuple]:
+    """(adjuntos sin referencias, total de adjuntos) o None si el índice no está listo"""
+    indice = v.indice_listo()
+    if indice is None:
+        return None
+    prefijo = carpeta.rstrip("/") + "/" if carpeta else ""
+    huerfanos = [r for r in indice.adjuntos_sin_referencias() if r.startswith(prefijo)]
+    return [(r, indice.adjuntos[r]) for r in huerfanos if r in indice.adjuntos], len(indice.adjuntos)
+
+@mcp.tool()
+async def adjuntos_sin_referencias(carpeta: str = "", vault: str = "") -> str:
+    """
+    Encuentra imágenes, PDFs y otros adjuntos que ninguna nota embebe con ![[...]]
+    
+    Args:
+        carpeta: Limitar a los adjuntos de esta carpeta (vacío = todo el vault)
+        vault: Vault donde buscar (vacío = todos los vaults configurados)
+    """
+    try:
+        vaults = vaults_objetivo(vault)
+        parciales = await en_paralelo(_adjuntos_sin_referencias_en_vault, vaults, carpeta)
+        pendientes = [v for v, p in zip(vaults, parciales) if p is None]
+        if pendientes:
+            detalle = ", ".join(f"{v.nombre}: {_fuente(v)}" for v in pendientes)
+            return f"⏳ El índice de adjuntos aún no está listo ({detalle}). Prueba en unos segundos."
+        
+        huerfanos = [(v, ruta, adjunto) for v, p in zip(vaults, parciales) for ruta, adjunto in p[0]]
+        total = sum(p[1] for p in parciales)
+        varios = len(vaults) > 1
+        
+        if not huerfanos:
+            return f"📎 Todos los adjuntos ({total}) están embebidos en alguna nota\n\n⚡ Fuente: índice\n"
+        
+        bytes_totales = sum(a.tamaño for _, _, a in huerfanos)
+        resultado = (f"📎 Adjuntos sin referencias: {len(huerfanos)} de {total} "
+                     f"({bytes_totales / 1024 / 1024:.1f}MB):\n\n")
+        for v, ruta, adjunto in huerfanos:
+            resultado += f"📄 {_ruta_mostrada(v, ruta, varios)} ({adjunto.tipo}, {adjunto.tamaño / 1024:.1f}KB)\n"
+            resultado += f"   🔗 obsidian://adjunto/{v.nombre}/{ruta}\n"
+        
+        resultado += "\n⚡ Fuente: índice\n"
+        return resultado
+        
+    except Exception as e:
+        return f"❌ Error al buscar adjuntos: {e}"
+
+# ========== HERRAMIENTAS DE TAREAS ==========
+
+ICONOS_TAREA = {" ": "⬜", "/": "🔄", "x": "✅", "X": "✅", "-": "🚫"}
+MARCA_POR_ESTADO = {"pendiente": " ", "en curso": "/", "hecha": "x", "cancelada": "-"}
+PATRON_FECHA_HECHA = re.compile(r'[ \t]*✅\ufe0f?[ \t]*\d{4}-\d{2}-\d{2}')
+
+def _tareas_en_vault(v: Vault, filtro: FiltroTareas, seguimiento: Optional[Seguimiento] = None, desde: str = "") -> tuple:
+    """Tareas de un vault que cumplen el filtro; devuelve ([(ruta, tarea)], fuente, siguiente)"""
+    indice = v.indice_listo()
+    if indice is not None:
+        return [(ruta, tarea) for ruta, tarea in indice.buscar_tareas(filtro) if ruta > desde], "índice", None
+    
+    tareas = []
+    archivos = notas_tras(v, desde)
+    revisadas = 0
+    for archivo in recorrer_con_plazo(archivos, seguimiento or Seguimiento()):
+        revisadas += 1
+        ruta_relativa = str(archivo.relative_to(v.ruta))
+        if not filtro.admite_nota(ruta_relativa):
+            continue
+        try:
+            with open(archivo, 'r', encoding='utf-8') as f:
+                contenido = f.read()
+        except (OSError, UnicodeDecodeError):
+            continue
+        tareas.extend((ruta_relativa, tarea) for tarea in extraer_tareas(contenido) if filtro.cumple(tarea))
+    return tareas, _fuente(v), ultima_cubierta(v, archivos, revisadas, desde)
+
+@mcp.tool()
+async def buscar_tareas(estado: str = "abiertas", fecha_desde: str = "", fecha_hasta: str = "", carpeta: str = "",
+                        etiqueta: str = "", limite: int = 50, vault: str = "", plazo_segundos: float = 0,
+                        continuar: str = "") -> str:
+    """
+    Busca las tareas (- [ ] ...) de las notas por estado, fechas, carpeta o etiqueta
+    
+    Args:
+        estado: abiertas, vencidas (abiertas con 📅 ya pasado), hechas, canceladas o todas
+        fecha_desde: Fecha mínima (YYYY-MM-DD) de la tarea: la de cierre (✅) si está hecha;
+            si no, la de vencimiento (📅) o la programada (⏳)
+        fecha_hasta: Fecha máxima (YYYY-MM-DD)
+        carpeta: Solo tareas de notas de esta carpeta
+        etiqueta: Solo tareas con esta etiqueta en su texto (ej: "trabajo")
+        limite: Número máximo de tareas a mostrar (por defecto: 50)
+        vault: Vault donde buscar (vacío = todos los vaults configurados)
+        plazo_segundos: Tiempo máximo si hay que recorrer el vault (0 = plazo por defecto del servidor)
+        continuar: Cursor de una respuesta parcial anterior para seguir donde se quedó
+    """
+    try:
+        try:
+            desde = datetime.strptime(fecha_desde, '%Y-%m-%d').date() if fecha_desde else None
+            hasta = datetime.strptime(fecha_hasta, '%Y-%m-%d').date() if fecha_hasta else None
+        except ValueError:
+            return "❌ Formato de fecha inválido. Usa YYYY-MM-DD (ej: 2024-01-15)"
+        filtro = FiltroTareas(estado, desde, hasta, carpeta, etiqueta)
+        
+        objetivos = vaults_a_recorrer(vault, continuar)
+        vaults = [v for v, _ in objetivos]
+        seguimiento = crear_seguimiento(plazo_segundos)
+        parciales = await en_paralelo_desde(_tareas_en_vault, objetivos, filtro, seguimiento)
+        tareas = [(v, ruta, tarea) for v, p in zip(vaults, parciales) for ruta, tarea in p[0]]
+        fuentes = aviso_parcial(seguimiento, [(v, p[2]) for v, p in zip(vaults, parciales) if p[2] is not None])
+        fuentes += _describir_fuentes(vaults, [p[1] for p in parciales])
+        varios = len(vaults) > 1
+        
+        titulo = "Tareas" if estado == "todas" else f"Tareas {estado}"
+        if not tareas:
+            return f"☑️ No hay {titulo.lower()} con esos filtros\n\n{fuentes}"
+        
+        # Primero las que tienen fecha, de la más antigua a la más reciente
+        tareas.sort(key=lambda x: (x[2].fecha is None, x[2].fecha or date.min, x[1], x[2].linea))
+        
+        resultado = f"☑️ {titulo} ({len(tareas)} encontradas):\n\n"
+        for v, ruta, tarea in tareas[:limite]:
+            resultado += f"{ICONOS_TAREA.get(tarea.marca, f'[{tarea.marca}]')} {tarea.texto}\n"
+            detalles = [f"📍 {_ruta_mostrada(v, ruta, varios)}:{tarea.linea}"]
+            if tarea.vence:
+                vencida = " ⚠️ vencida" if tarea.abierta and tarea.vence < filtro.hoy else ""
+                detalles.append(f"📅 {tarea.vence}{vencida}")
+            if tarea.programada:
+                detalles.append(f"⏳ {tarea.programada}")
+            resultado += f"   {' | '.join(detalles)}\n"
+        
+        if len(tareas) > limite:
+            resultado += f"\n... y {len(tareas) - limite} tareas más\n"
+        
+        resultado += f"\n{fuentes}"
+        return resultado
+        
+    except CursorNoValido as e:
+        return f"❌ {e}"
+    except ValueError as e:
+        return f"❌ {e}"
+    except Exception as e:
+        return f"❌ Error al buscar tareas: {e}"
+
+def _reemplazar_linea(archivo: Path, numero: int, cambiar) -> tuple:
+    """
+    Sustituye la línea `numero` (desde 1) por cambiar(línea): si la línea
+    nueva mide lo mismo se sobrescriben solo sus bytes; si no, la nota se
+    reescribe en un temporal que la reemplaza de forma atómica, para que un
+    corte a medias no la deje truncada. Devuelve (línea anterior, línea nueva,
+    bytes de la nota completa tal como quedó).
+    """
+    temporal = None
+    with open(archivo, 'r+b') as f:
+        desplazamiento = 0
+        actual = 0
+        for actual, datos in enumerate(f, 1):
+            if actual == numero:
+                break
+            desplazamiento += len(datos)
+        else:
+            raise ValueError(f"La nota solo tiene {actual} líneas")
+        
+        fin_de_linea = datos[len(datos.rstrip(b"\r\n")):]
+        anterior = datos[:len(datos) - len(fin_de_linea)].decode('utf-8')
+        nueva = cambiar(anterior)
+        nuevos = nueva.encode('utf-8') + fin_de_linea
+        if len(nuevos) == len(datos):
+            f.seek(desplazamiento)
+            f.write(nuevos)
+            f.seek(0)
+            contenido = f.read()
+        else:
+            resto = f.read()
+            f.seek(0)
+            contenido = f.read(desplazamiento) + nuevos + resto
+            temporal = _escribir_atomico(archivo, contenido)
+    if temporal is not None:
+        try:
+            os.replace(temporal, archivo)
+        except OSError:
+            temporal.unlink(missing_ok=True)
+            raise
+    return anterior, nueva, contenido
+
+def _cambiar_tarea(linea: str, estado: str, texto: str, anotar_fecha: bool) -> str:
+    """La línea de una tarea con su casilla en el nuevo estado (vacío = alternar pendiente/hecha)"""
+    m = PATRON_TAREA.fullmatch(linea)
+    if not m:
+        raise ValueError(f"La línea no es una tarea: {linea.strip()}")
+    if texto and texto.lower() not in m.group(4).lower():
+        raise ValueError(f"La tarea de esa línea ya no contiene '{texto}': {m.group(4)}")
+    
+    if estado:
+        marca = MARCA_POR_ESTADO[estado]
+    else:
+        marca = "x" if m.group(2) not in MARCAS_CERRADAS else " "
+    contenido = m.group(4)
+    if anotar_fecha:
+        contenido = PATRON_FECHA_HECHA.sub("", contenido)
+        if marca == "x":
+            contenido += f" ✅ {date.today().isoformat()}"
+    return m.group(1) + marca + m.group(3) + contenido + linea[m.end(4):]
+
+@mcp.tool()
+@en_hilo
+def alternar_tarea(nombre_archivo: str, linea: int, estado: str = "", texto: str = "",
+                   anotar_fecha: bool = True, vault: str = "") -> str:
+    """
+    Cambia el estado de una tarea reescribiendo solo su línea
+    
+    Args:
+        nombre_archivo: Nota de la tarea
+        linea: Número de línea de la tarea (el que muestra buscar_tareas)
+        estado: Nuevo estado: pendiente, en curso, hecha o cancelada (vacío = alternar entre pendiente y hecha)
+        texto: Parte del texto de la tarea, para comprobar que la línea no ha cambiado
+        anotar_fecha: Si añadir "✅ fecha" al completarla (y quitarla al reabrirla), como el plugin Tasks
+        vault: Vault de la nota (vacío = vault por defecto)
+    """
+    try:
+        if linea < 1:
+            return "❌ Las líneas se numeran desde 1"
+        if estado and estado not in MARCA_POR_ESTADO:
+            return f"❌ Estado '{estado}' no válido. Usa: {', '.join(MARCA_POR_ESTADO)}"
+        
+        v = obtener_vault(vault)
+        nota_path = v.buscar_nota(nombre_archivo)
+        if not nota_path:
+            return f"❌ No se encontró la nota '{nombre_archivo}'"
+        
+        anterior, nueva, contenido = _reemplazar_linea(nota_path, linea, lambda l: _cambiar_tarea(l, estado, texto, anotar_fecha))
+        # Como lo leería leer_nota (open en modo texto): saltos de línea universales
+        v.nota_escrita(nota_path, contenido.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n'))
+        
+        marca = PATRON_TAREA.fullmatch(nueva).group(2)
+        ruta_relativa = nota_path.relative_to(v.ruta)
+        resultado = f"{ICONOS_TAREA[marca]} Tarea {ESTADOS_TAREA[marca]} en {ruta_relativa}:{linea}\n\n"
+        resultado += f"   Antes: {anterior.strip()}\n"
+        resultado += f"   Ahora: {nueva.strip()}\n"
+        return resultado
+        
+    except ValueError as e:
+        return f"❌ {e}"
+    except Exception as e:
+        return f"❌ Error al cambiar la tarea: {e}"
+
 # ========== RECURSOS ==========
 
 @mcp.resource("obsidian://vault_info")
 async def info_vault() -> str:
-    """Información general del vault de Obsidian"""
-    vault_path = Path(OBSIDIAN_VAULT_PATH)
+    """Información general de los vaults de Obsidian configurados"""
+    vaults = []
+    for v in VAULTS.values():
+        vault_path = v.ruta
+        indice = v.indice
+        if indice is not None and indice.listo:
+            notas, adjuntos = len(indice.notas), len(indice.adjuntos)
+        elif vault_path.exists():
+            archivos = [entrada.name for _, entrada in recorrer_archivos(vault_path, v.reglas_ignorar())]
+            notas = sum(1 for nombre in archivos if nombre.endswith(".md"))
+            adjuntos = len(archivos) - notas
+        else:
+            notas = adjuntos = 0
+        vaults.append({
+            "vault_path": str(vault_path),
+            "vault_name": v.nombre,
+            "exists": vault_path.exists(),
+            "total_files": notas + adjuntos,
+            "markdown_files": notas,
+            "attachments": adjuntos,
+            "indexes_loaded": v.indices_cargados(),
+        })
+    
+    # Se mantienen las claves del vault por defecto en el nivel superior
+    info = dict(vaults[0])
+    info["vaults"] = vaults
+    info["last_scan"] = datetime.now().isoformat()
     
+    return json.dumps(info, indent=2, ensure_ascii=False)
+
+@mcp.resource("obsidian://estado_indices")
+async def info_estado_indices() -> str:
+    """Progreso de construcción de los índices de cada vault"""
+    estado = {}
+    for v in VAULTS.values():
+        indice = v.indice
+        estado[v.nombre] = {
+            "estado": indice.estado if indice is not None else "sin cargar",
+            "notas_procesadas": indice.procesadas if indice is not None else 0,
+            "notas_totales": indice.total if indice is not None else 0,
+            "segundos_hasta_listo": indice.duracion if indice is not None else None,
+        }
+    return json.dumps(estado, indent=2, ensure_ascii=False)
+
+@mcp.resource("obsidian://metricas")
+async def info_metricas() -> str:
+    """Métricas del servidor en JSON"""
+    return json.dumps(metricas(), indent=2, ensure_ascii=False)
+
+# Bytes por fragmento al leer adjuntos: nunca se carga un archivo entero en memoria
+TAMAÑO_FRAGMENTO_ADJUNTO = int(os.environ.get("OBSIDIAN_FRAGMENTO_ADJUNTO_KB", 1024)) * 1024
+
+def _ruta_adjunto(vault: str, ruta: str) -> tuple:
+    """Resuelve la ruta de un adjunto sin permitir salir del vault"""
+    v = obtener_vault(vault)
+    ruta = unquote(ruta)
+    archivo = (v.ruta / ruta).resolve()
+    if not archivo.is_relative_to(v.ruta.resolve()) or v.reglas_ignorar().excluye(ruta) or not archivo.is_file():
+        raise ValueError(f"El adjunto '{ruta}' no existe en el vault '{v.nombre}'")
+    return v, archivo, ruta
+
+def _fragmentos_adjunto(tamaño: int) -> int:
+    """Número de fragmentos de un adjunto (uno como mínimo, aunque esté vacío)"""
+    return max(1, -(-tamaño // TAMAÑO_FRAGMENTO_ADJUNTO))
+
+@mcp.resource("obsidian://adjunto/{vault}/{ruta*}", mime_type="application/json")
+def info_adjunto(vault: str, ruta: str) -> str:
+    """Metadatos de un adjunto y cómo leerlo por fragmentos"""
+    v, archivo, ruta = _ruta_adjunto(vault, ruta)
+    stats = archivo.stat()
+    indice = v.indice_listo(refrescar=False)
+    fragmentos = _fragmentos_adjunto(stats.st_size)
     info = {
-        "vault_path": str(vault_path),
-        "vault_name": "Secundo Selebro",
-        "exists": vault_path.exists(),
-        "total_files": len(list(vault_path.rglob("*.*"))) if vault_path.exists() else 0,
-        "markdown_files": len(list(vault_path.rglob("*.md"))) if vault_path.exists() else 0,
-        "last_scan": datetime.now().isoformat()
+        "vault": v.nombre,
+        "ruta": ruta,
+        "tipo": mimetypes.guess_type(archivo.name)[0] or "application/octet-stream",
+        "tamaño": stats.st_size,
+        "modificado": datetime.fromtimestamp(stats.st_mtime).isoformat(),
+        "embebido_en": sorted(indice.notas_que_embeben(ruta)) if indice is not None else None,
+        "tamaño_fragmento": TAMAÑO_FRAGMENTO_ADJUNTO,
+        "fragmentos": fragmentos,
+        "uri_fragmentos": f"obsidian://adjunto_fragmento/{v.nombre}/{{numero}}/{ruta}",
     }
-    
     return json.dumps(info, indent=2, ensure_ascii=False)
 
+@mcp.resource("obsidian://adjunto_fragmento/{vault}/{numero}/{ruta*}", mime_type="application/octet-stream")
+def fragmento_adjunto(vault: str, numero: str, ruta: str) -> bytes:
+    """Un fragmento (de 0 en adelante) del contenido binario de un adjunto"""
+    v, archivo, ruta = _ruta_adjunto(vault, ruta)
+    with open(archivo, "rb") as f:
+        fragmentos = _fragmentos_adjunto(os.fstat(f.fileno()).st_size)
+        try:
+            indice = int(numero)
+        except ValueError:
+            indice = -1
+        if not 0 <= indice < fragmentos:
+            raise ValueError(f"El fragmento '{numero}' del adjunto '{ruta}' no existe en el vault '{v.nombre}' "
+                             f"(hay {fragmentos}, del 0 al {fragmentos - 1})")
+        f.seek(indice * TAMAÑO_FRAGMENTO_ADJUNTO)
+        return f.read(TAMAÑO_FRAGMENTO_ADJUNTO)
+
 # ========== PROMPTS ==========
 
 @mcp.prompt()
 def prompt_asistente_obsidian() -> str:
     """Prompt especializado para gestión de Obsidian"""
-    return """
-    Soy tu asistente especializado para el vault de Obsidian 'Secundo Selebro'.
+    nombres = ", ".join(f"'{nombre}'" for nombre in VAULTS)
+    return f"""
+    Soy tu asistente especializado para tus vaults de Obsidian: {nombres}.
     
     🧠 **CAPACIDADES DISPONIBLES:**
     
     📚 **NAVEGACIÓN Y BÚSQUEDA:**
+    - listar_vaults(): Ve los vaults configurados
+    - estado_indices(): Progreso de los índices de cada vault
+    - metricas_servidor(): Cachés y métricas del servidor
     - listar_notas(): Ve todas las notas del vault organizadas por carpetas
     - leer_nota(nombre): Lee el contenido completo de cualquier nota
+    - fijar_nota(nombre): Mantiene una nota de consulta frecuente siempre en memoria
     - buscar_en_notas(texto): Busca contenido específico en todas las notas
+    - exportar_busqueda(texto, formato): Todas las coincidencias a un archivo JSONL o CSV
+    - buscar_pasajes(consulta, k): Los párrafos más relevantes, sin leer notas completas
     - buscar_notas_por_fecha(): Encuentra notas por rango de fechas
     
     ✍️ **CREACIÓN Y EDICIÓN:**
     - crear_nota(titulo, contenido, carpeta, etiquetas): Crea nuevas notas
     - agregar_a_nota(archivo, contenido): Agrega contenido a notas existentes
+    - importar_notas(origen, simulacro): Importa en bloque desde un directorio, zip o JSONL
+    - renombrar_nota(archivo, nuevo_nombre): Renombra o mueve una nota y actualiza sus enlaces
     
     📊 **ANÁLISIS:**
     - estadisticas_vault(): Estadísticas completas del vault
+    - consultar_notas(filtros, ordenar, campos): Consulta las propiedades del frontmatter
+    - adjuntos_sin_referencias(): Imágenes, PDFs y audios que ninguna nota embebe
+    - analizar_grafo(): Notas centrales, hubs y componentes del grafo de enlaces
+    - camino_entre_notas(origen, destino): Camino más corto de enlaces entre dos notas
+    
+    ☑️ **TAREAS:**
+    - buscar_tareas(estado, fecha_desde, fecha_hasta): Tareas abiertas, vencidas o hechas
+    - alternar_tarea(archivo, linea): Marca una tarea como hecha o pendiente
+    
+    Todas las herramientas aceptan un argumento opcional `vault`. Las búsquedas
+    y estadísticas sin `vault` recorren todos los vaults a la vez.
     
     💡 **SUGERENCIAS DE USO:**
     • "Muéstrame mis notas más recientes"
     • "Busca todas las referencias a 'inteligencia artificial'"
     • "Crea una nota sobre lo que he aprendido hoy"
     • "¿Cuáles son mis temas más frecuentes?"
+    • "¿Qué proyectos abiertos vencen este mes?"
+    • "¿Qué tareas tengo vencidas?"
     • "Lee mi nota sobre meditaciones"
     
     ¿En qué puedo ayudarte con tu vault de Obsidian?
     """
 
+# ========== DESPLIEGUE ==========
+
+# Transporte por defecto: "stdio" (un cliente, ej: Claude Desktop) o "http"
+# (streamable HTTP: un único servidor compartido por varios clientes)
+OBSIDIAN_TRANSPORTE = os.environ.get("OBSIDIAN_TRANSPORTE", "stdio")
+OBSIDIAN_HOST = os.environ.get("OBSIDIAN_HOST", "127.0.0.1")
+OBSIDIAN_PUERTO = int(os.environ.get("OBSIDIAN_PUERTO", 8000))
+
+# Segundos que se espera a las llamadas en curso al apagar el servidor HTTP
+OBSIDIAN_APAGADO_SEGUNDOS = int(os.environ.get("OBSIDIAN_APAGADO_SEGUNDOS", 10))
+
+def detener_trabajo_en_segundo_plano():
+    """Cancela la construcción de índices y detiene el pool de procesos"""
+    for v in VAULTS.values():
+        if v.indice is not None:
+            v.indice.cancelar()
+    cerrar_pool()
+
+async def servir_http(host: str, puerto: int, hilos: int):
+    """
+    Sirve el vault por streamable HTTP. Las herramientas que tocan disco se
+    ejecutan en un pool de `hilos` hilos; al recibir SIGINT/SIGTERM se deja
+    de aceptar conexiones y se espera a las llamadas en curso antes de salir.
+    """
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="obsidian"))
+    instalar_limites_por_cliente()
+    try:
+        await mcp.run_http_async(
+            transport="streamable-http",
+            host=host,
+            port=puerto,
+            uvicorn_config={"timeout_graceful_shutdown": OBSIDIAN_APAGADO_SEGUNDOS},
+        )
+    finally:
+        detener_trabajo_en_segundo_plano()
+
 if __name__ == "__main__":
-    # Verificar que el vault existe
-    if not Path(OBSIDIAN_VAULT_PATH).exists():
-        print(f"❌ Error: No se encontró el vault en {OBSIDIAN_VAULT_PATH}")
-        exit(1)
+    parser = argparse.ArgumentParser(description="Servidor MCP para Obsidian")
+    parser.add_argument("--transporte", choices=["stdio", "http"], default=OBSIDIAN_TRANSPORTE)
+    parser.add_argument("--host", default=OBSIDIAN_HOST)
+    parser.add_argument("--puerto", type=int, default=OBSIDIAN_PUERTO)
+    parser.add_argument("--hilos", type=int, default=OBSIDIAN_HILOS, help="Llamadas a herramientas ejecutándose en paralelo")
+    args = parser.parse_args()
+    if "OBSIDIAN_MAX_LLAMADAS_EN_CURSO" not in os.environ:
+        admision.max_en_curso = args.hilos
+    
+    # Verificar que los vaults existen
+    for v in VAULTS.values():
+        if not v.ruta.exists():
+            print(f"❌ Error: No se encontró el vault '{v.nombre}' en {v.ruta}", file=sys.stderr)
+            exit(1)
+    
+    # stdout es el canal del protocolo MCP: los mensajes van a stderr
+    for v in VAULTS.values():
+        print(f"🧠 Iniciando servidor MCP para Obsidian vault '{v.nombre}': {v.ruta}", file=sys.stderr)
     
-    print(f"🧠 Iniciando servidor MCP para Obsidian vault: {OBSIDIAN_VAULT_PATH}")
-    mcp.run()
+    # Los índices se construyen en segundo plano; el servidor responde desde ya
+    iniciar_indexado()
+    if args.transporte == "http":
+        print(f"🌐 Escuchando en http://{args.host}:{args.puerto}/mcp/ con {args.hilos} hilos", file=sys.stderr)
+        asyncio.run(servir_http(args.host, args.puerto, args.hilos))
+    else:
+        mcp.run()
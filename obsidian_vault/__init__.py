@@ -0,0 +1,23 @@
+"""
+Infraestructura del servidor MCP de Obsidian: vaults, índices, segmentos en
+disco, grafo de enlaces, pool de procesos y middleware de concurrencia.
+
+Las herramientas MCP se definen en obsidian_mcp_server.py; este paquete no
+reexporta nada para que los procesos del pool solo importen lo que usan.
+
+- cache: cachés de resultados y de notas
+- exclusiones: OBSIDIAN_IGNORAR, filtros de Obsidian y recorrido del vault
+- propiedades: frontmatter y filtros sobre propiedades
+- segmentos: índice de términos en memoria o en segmentos en disco
+- sintaxis: patrones de etiquetas, enlaces y embebidos
+- explorador: listados de carpetas y estado de los archivos
+- metadatos: tabla de notas y adjuntos
+- fragmentos: fragmentos de notas y ranking BM25
+- tareas: tareas "- [ ]" de las notas
+- grafo: grafo de enlaces, PageRank y componentes
+- indice: índice de un vault
+- vaults: vaults configurados
+- progreso: progreso, plazos, cancelación y cursores
+- paralelo: reparto de recorridos entre procesos
+- concurrencia: hilos, límites por cliente y control de admisión
+"""
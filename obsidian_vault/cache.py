@@ -0,0 +1,185 @@
+"""
+Cachés en memoria: resultados de búsquedas recientes y contenido de notas
+"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+# Límites de la caché de resultados de búsqueda de cada vault
+MAX_ENTRADAS_CACHE_RESULTADOS = int(os.environ.get("OBSIDIAN_CACHE_RESULTADOS_ENTRADAS", 256))
+MAX_BYTES_CACHE_RESULTADOS = int(float(os.environ.get("OBSIDIAN_CACHE_RESULTADOS_MB", 16)) * 1024 * 1024)
+
+def _tamaño_aproximado(valor) -> int:
+    """Estimación barata de la memoria que ocupa un resultado"""
+    if isinstance(valor, str):
+        return 50 + len(valor)
+    if isinstance(valor, (list, tuple, set)):
+        return 60 + sum(_tamaño_aproximado(v) for v in valor)
+    if isinstance(valor, dict):
+        return 100 + sum(_tamaño_aproximado(v) for v in valor.values())
+    if isinstance(valor, Path):
+        return 100 + len(str(valor))
+    if hasattr(type(valor), "__slots__"):
+        return 16 + 8 * len(type(valor).__slots__)
+    return 32
+
+class CacheResultados:
+    """
+    Caché LRU de resultados de búsqueda, acotada por número de entradas y
+    por tamaño aproximado en bytes.
+    """
+    
+    def __init__(self, max_entradas: int, max_bytes: int):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self._datos: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._datos)
+    
+    def obtener(self, clave: tuple):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                self.fallos += 1
+                return None
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[0]
+    
+    def guardar(self, clave: tuple, valor):
+        tamaño = _tamaño_aproximado(valor)
+        if tamaño > self.max_bytes:
+            return
+        with self._lock:
+            anterior = self._datos.pop(clave, None)
+            if anterior is not None:
+                self.bytes -= anterior[1]
+            self._datos[clave] = (valor, tamaño)
+            self.bytes += tamaño
+            while len(self._datos) > self.max_entradas or self.bytes > self.max_bytes:
+                _, (_, tamaño_viejo) = self._datos.popitem(last=False)
+                self.bytes -= tamaño_viejo
+    
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+            self.bytes = 0
+    
+    def tasa_aciertos(self) -> float:
+        consultas = self.aciertos + self.fallos
+        return self.aciertos / consultas if consultas else 0.0
+
+# Memoria máxima de la caché de contenido de notas de cada vault
+MAX_BYTES_CACHE_NOTAS = int(float(os.environ.get("OBSIDIAN_CACHE_NOTAS_MB", 32)) * 1024 * 1024)
+
+# Notas que nunca salen de la caché de contenido (rutas o nombres, separados
+# por comas; ej: "Inicio.md, MOC Proyectos"). También con fijar_nota()
+NOTAS_FIJADAS = [n.strip() for n in os.environ.get("OBSIDIAN_NOTAS_FIJADAS", "").split(",") if n.strip()]
+
+class CacheNotas:
+    """
+    Caché LRU del contenido ya decodificado de las notas, acotada por
+    bytes. Cada acierto se valida con el mtime y el tamaño actuales del
+    archivo, así que nunca devuelve una versión vieja. Las notas fijadas
+    cuentan para el límite pero no se desalojan nunca.
+    """
+    
+    def __init__(self, max_bytes: int, fijadas=()):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.caducadas = 0
+        # Ruta relativa -> (contenido, tamaño del archivo, mtime_ns, bytes en memoria)
+        self._lru: "OrderedDict[str, tuple]" = OrderedDict()
+        self._fijadas: Dict[str, tuple] = {}
+        # Rutas relativas o nombres (con o sin .md) de las notas fijadas
+        self._claves_fijadas: Set[str] = set(fijadas)
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._lru) + len(self._fijadas)
+    
+    @property
+    def num_fijadas(self) -> int:
+        return len(self._fijadas)
+    
+    def fijada(self, clave: str) -> bool:
+        nombre = os.path.basename(clave)
+        return (clave in self._claves_fijadas or nombre in self._claves_fijadas
+                or os.path.splitext(nombre)[0] in self._claves_fijadas)
+    
+    def obtener(self, clave: str, stats: os.stat_result) -> Optional[str]:
+        with self._lock:
+            entrada = self._fijadas.get(clave)
+            if entrada is None:
+                entrada = self._lru.get(clave)
+            if entrada is None:
+                self.fallos += 1
+                return None
+            if entrada[1] != stats.st_size or entrada[2] != stats.st_mtime_ns:
+                # La nota cambió por fuera del servidor desde que se guardó
+                self._quitar(clave)
+                self.caducadas += 1
+                self.fallos += 1
+                return None
+            if clave in self._lru:
+                self._lru.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[0]
+    
+    def guardar(self, clave: str, contenido: str, stats: os.stat_result):
+        coste = sys.getsizeof(contenido)
+        fijada = self.fijada(clave)
+        if coste > self.max_bytes and not fijada:
+            return
+        with self._lock:
+            self._quitar(clave)
+            (self._fijadas if fijada else self._lru)[clave] = (contenido, stats.st_size, stats.st_mtime_ns, coste)
+            self.bytes += coste
+            while self.bytes > self.max_bytes and self._lru:
+                _, (_, _, _, coste_viejo) = self._lru.popitem(last=False)
+                self.bytes -= coste_viejo
+    
+    def quitar(self, clave: str):
+        with self._lock:
+            self._quitar(clave)
+    
+    def _quitar(self, clave: str):
+        entrada = self._lru.pop(clave, None) or self._fijadas.pop(clave, None)
+        if entrada is not None:
+            self.bytes -= entrada[3]
+    
+    def fijar(self, clave: str, fijar: bool = True):
+        """Fija una nota (o la suelta); si ya estaba en la caché, cambia de sitio"""
+        with self._lock:
+            if fijar:
+                self._claves_fijadas.add(clave)
+                entrada = self._lru.pop(clave, None)
+                if entrada is not None:
+                    self._fijadas[clave] = entrada
+            else:
+                self._claves_fijadas.discard(clave)
+                entrada = self._fijadas.pop(clave, None)
+                if entrada is not None:
+                    self._lru[clave] = entrada
+    
+    def limpiar(self):
+        """Vacía la caché; las notas siguen fijadas y se vuelven a guardar al leerlas"""
+        with self._lock:
+            self._lru.clear()
+            self._fijadas.clear()
+            self.bytes = 0
+    
+    def tasa_aciertos(self) -> float:
+        consultas = self.aciertos + self.fallos
+        return self.aciertos / consultas if consultas else 0.0
@@ -0,0 +1,252 @@
+"""
+Concurrencia del servidor: herramientas en hilos, límites por cliente y
+control de admisión
+"""
+
+import asyncio
+import functools
+import heapq
+import json
+import os
+import time
+from typing import Dict, List
+
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+from mcp import McpError
+from mcp.types import ErrorData
+
+from obsidian_vault.vaults import VAULTS
+
+# Hilos que ejecutan en paralelo las herramientas que leen o escriben en disco
+OBSIDIAN_HILOS = int(os.environ.get("OBSIDIAN_HILOS", 16))
+
+# Límites por cliente en el modo HTTP (0 = sin límite): llamadas en curso a la
+# vez y llamadas por segundo. Por stdio hay un único cliente y no se aplican
+MAX_LLAMADAS_SIMULTANEAS_POR_CLIENTE = int(os.environ.get("OBSIDIAN_MAX_LLAMADAS_SIMULTANEAS", 4))
+MAX_LLAMADAS_POR_SEGUNDO_POR_CLIENTE = float(os.environ.get("OBSIDIAN_MAX_LLAMADAS_POR_SEGUNDO", 20))
+
+def en_hilo(funcion):
+    """
+    Convierte una herramienta síncrona en asíncrona ejecutándola en el pool
+    de hilos, para que una lectura de disco no bloquee al resto de clientes.
+    """
+    @functools.wraps(funcion)
+    async def envoltura(*args, **kwargs):
+        return await asyncio.to_thread(funcion, *args, **kwargs)
+    return envoltura
+
+class LimitePorCliente(Middleware):
+    """
+    Limita las llamadas a herramientas de cada cliente: cuántas puede tener
+    en curso a la vez y cuántas puede hacer por segundo (cubeta de fichas).
+    """
+    
+    def __init__(self, max_simultaneas: int, max_por_segundo: float):
+        self.max_simultaneas = max_simultaneas
+        self.max_por_segundo = max_por_segundo
+        self._en_curso: Dict[str, int] = {}
+        self._cubetas: Dict[str, List[float]] = {}
+    
+    @staticmethod
+    def _cliente(context: MiddlewareContext) -> str:
+        ctx = context.fastmcp_context
+        if ctx is None:
+            return "local"
+        # Por HTTP cada cliente tiene su sesión; por stdio o en memoria, su objeto de sesión
+        return ctx.session_id or ctx.client_id or f"sesion-{id(ctx.session)}"
+    
+    def _consumir_ficha(self, cliente: str) -> bool:
+        ahora = time.monotonic()
+        fichas, ultima = self._cubetas.get(cliente, (self.max_por_segundo, ahora))
+        fichas = min(self.max_por_segundo, fichas + (ahora - ultima) * self.max_por_segundo)
+        if fichas < 1:
+            self._cubetas[cliente] = [fichas, ahora]
+            return False
+        self._cubetas[cliente] = [fichas - 1, ahora]
+        
+        # No acumular cubetas de clientes que ya se fueron
+        if len(self._cubetas) > 1000:
+            for otro in [c for c, (_, t) in self._cubetas.items() if ahora - t > 60]:
+                del self._cubetas[otro]
+        return True
+    
+    async def on_call_tool(self, context: MiddlewareContext, call_next):
+        cliente = self._cliente(context)
+        
+        if self.max_por_segundo > 0 and not self._consumir_ficha(cliente):
+            raise McpError(ErrorData(code=-32000, message=f"Demasiadas llamadas: máximo {self.max_por_segundo:g} por segundo por cliente"))
+        
+        en_curso = self._en_curso.get(cliente, 0)
+        if self.max_simultaneas > 0 and en_curso >= self.max_simultaneas:
+            raise McpError(ErrorData(code=-32000, message=f"Demasiadas llamadas en curso: máximo {self.max_simultaneas} por cliente"))
+        
+        self._en_curso[cliente] = en_curso + 1
+        try:
+            return await call_next(context)
+        finally:
+            self._en_curso[cliente] -= 1
+            if not self._en_curso[cliente]:
+                del self._en_curso[cliente]
+
+# Control de admisión (0 = sin límite): recorridos completos del vault a la vez,
+# llamadas en curso en total y segundos máximos de espera en la cola
+MAX_RECORRIDOS_SIMULTANEOS = int(os.environ.get("OBSIDIAN_MAX_RECORRIDOS", 2))
+MAX_LLAMADAS_EN_CURSO = int(os.environ.get("OBSIDIAN_MAX_LLAMADAS_EN_CURSO", OBSIDIAN_HILOS))
+ESPERA_MAXIMA_SEGUNDOS = float(os.environ.get("OBSIDIAN_ESPERA_MAXIMA_SEGUNDOS", 30))
+
+# Herramientas que pueden recorrer el vault entero o escribir en bloque; el resto son consultas ligeras
+HERRAMIENTAS_DE_RECORRIDO = {
+    "listar_notas", "buscar_en_notas", "estadisticas_vault", "buscar_notas_por_fecha",
+    "consultar_notas", "adjuntos_sin_referencias", "buscar_pasajes", "importar_notas",
+    "analizar_grafo", "camino_entre_notas", "buscar_tareas", "exportar_busqueda",
+}
+
+# Recorridos que escriben (notas o archivos): cuentan como recorridos en la cola, pero
+# nunca comparten el resultado de una llamada idéntica en curso, porque cada una escribe
+HERRAMIENTAS_QUE_ESCRIBEN = {"importar_notas", "exportar_busqueda"}
+
+# Orden de la cola: las consultas ligeras pasan antes que los recorridos
+PRIORIDAD_POR_CLASE = {"ligera": 0, "recorrido": 1}
+
+def clase_de_herramienta(nombre: str) -> str:
+    return "recorrido" if nombre in HERRAMIENTAS_DE_RECORRIDO else "ligera"
+
+class ControlDeAdmision(Middleware):
+    """
+    Controla cuántas llamadas se ejecutan a la vez en todo el servidor: los
+    recorridos del vault tienen su propio límite para no competir por el
+    disco, las consultas ligeras tienen prioridad en la cola y ninguna llamada
+    espera más de `espera_maxima` segundos. Los recorridos idénticos que llegan
+    mientras otro está en curso comparten su resultado en lugar de repetirlo.
+    """
+    
+    def __init__(self, max_recorridos: int, max_en_curso: int, espera_maxima: float):
+        self.max_recorridos = max_recorridos
+        self.max_en_curso = max_en_curso
+        self.espera_maxima = espera_maxima
+        self._activas = {clase: 0 for clase in PRIORIDAD_POR_CLASE}
+        self._cola: List[tuple] = []
+        self._llegadas = 0
+        self._en_vuelo: Dict[tuple, asyncio.Future] = {}
+        self.admitidas = 0
+        self.rechazadas = 0
+        self.compartidas = 0
+        self.max_en_cola = 0
+        self.segundos_en_cola = 0.0
+    
+    def _hay_hueco(self, clase: str) -> bool:
+        if self.max_en_curso > 0 and sum(self._activas.values()) >= self.max_en_curso:
+            return False
+        return not (clase == "recorrido" and 0 < self.max_recorridos <= self._activas["recorrido"])
+    
+    def _despertar(self):
+        # La cola está ordenada por prioridad: si la primera no cabe, las de detrás tampoco
+        while self._cola:
+            _, _, clase, futuro = self._cola[0]
+            if futuro.done():
+                heapq.heappop(self._cola)
+            elif self._hay_hueco(clase):
+                heapq.heappop(self._cola)
+                self._activas[clase] += 1
+                futuro.set_result(None)
+            else:
+                break
+    
+    def en_cola(self, clase: str) -> int:
+        return sum(1 for _, _, c, futuro in self._cola if c == clase and not futuro.done())
+    
+    async def _entrar(self, clase: str):
+        futuro = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._cola, (PRIORIDAD_POR_CLASE[clase], self._llegadas, clase, futuro))
+        self._llegadas += 1
+        self._despertar()
+        if futuro.done():
+            return
+        
+        self.max_en_cola = max(self.max_en_cola, self.en_cola("ligera") + self.en_cola("recorrido"))
+        inicio = time.monotonic()
+        try:
+            await asyncio.wait_for(futuro, self.espera_maxima if self.espera_maxima > 0 else None)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            # Pudo recibir el hueco justo al vencer la espera: devolverlo
+            if futuro.done() and not futuro.cancelled():
+                self._salir(clase)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.rechazadas += 1
+            raise McpError(ErrorData(code=-32000, message=(
+                f"Servidor ocupado: la llamada esperó {self.espera_maxima:g}s en cola "
+                f"({self._activas['recorrido']} recorridos y {self._activas['ligera']} consultas en curso)"
+            )))
+        finally:
+            self.segundos_en_cola += time.monotonic() - inicio
+    
+    def _salir(self, clase: str):
+        self._activas[clase] -= 1
+        self._despertar()
+    
+    async def _admitir(self, clase: str, context: MiddlewareContext, call_next):
+        await self._entrar(clase)
+        self.admitidas += 1
+        try:
+            return await call_next(context)
+        finally:
+            self._salir(clase)
+    
+    async def _compartir(self, clave: tuple, ejecutar):
+        """Ejecuta `ejecutar` o se une a una ejecución idéntica que ya está en curso"""
+        futuro = self._en_vuelo.get(clave)
+        if futuro is not None:
+            self.compartidas += 1
+            try:
+                return await asyncio.shield(futuro)
+            except asyncio.CancelledError:
+                # Si el cliente que la lanzó la canceló, esta llamada sigue por su cuenta
+                if futuro.cancelled():
+                    return await self._compartir(clave, ejecutar)
+                raise
+        
+        futuro = asyncio.get_running_loop().create_future()
+        # Marcar el error como leído aunque nadie más espere este recorrido
+        futuro.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._en_vuelo[clave] = futuro
+        try:
+            resultado = await ejecutar()
+        except asyncio.CancelledError:
+            futuro.cancel()
+            raise
+        except BaseException as e:
+            futuro.set_exception(e)
+            raise
+        else:
+            futuro.set_result(resultado)
+            return resultado
+        finally:
+            if self._en_vuelo.get(clave) is futuro:
+                del self._en_vuelo[clave]
+    
+    async def on_call_tool(self, context: MiddlewareContext, call_next):
+        nombre = context.message.name
+        argumentos = context.message.arguments or {}
+        clase = clase_de_herramienta(nombre)
+        ejecutar = functools.partial(self._admitir, clase, context, call_next)
+        
+        # usar_cache=False pide un recorrido nuevo: no se une a uno ya empezado
+        if clase != "recorrido" or nombre in HERRAMIENTAS_QUE_ESCRIBEN or not argumentos.get("usar_cache", True):
+            return await ejecutar()
+        # La generación de cada vault en la clave: tras una escritura no se comparte un recorrido anterior
+        clave = (nombre, json.dumps(argumentos, sort_keys=True, default=str),
+                 tuple(v.generacion for v in VAULTS.values()))
+        return await self._compartir(clave, ejecutar)
+    
+    def metricas(self) -> dict:
+        return {
+            "recorridos": {"en_curso": self._activas["recorrido"], "en_cola": self.en_cola("recorrido"), "limite": self.max_recorridos},
+            "ligeras": {"en_curso": self._activas["ligera"], "en_cola": self.en_cola("ligera")},
+            "limite_en_curso": self.max_en_curso,
+            "admitidas": self.admitidas,
+            "compartidas": self.compartidas,
+            "rechazadas_por_espera": self.rechazadas,
+            "max_en_cola": self.max_en_cola,
+            "espera_media_ms": round(self.segundos_en_cola / max(1, self.admitidas + self.rechazadas) * 1000, 1),
+        }
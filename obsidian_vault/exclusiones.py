@@ -0,0 +1,162 @@
+"""
+Reglas de exclusión (OBSIDIAN_IGNORAR y los filtros de Obsidian) y recorrido
+del vault sin entrar en lo excluido
+"""
+
+import json
+import os
+import re
+import sys
+from pathlib import Path
+from typing import List
+
+# Patrones al estilo .gitignore que no se recorren nunca, separados por comas.
+# Se suman a los "Archivos excluidos" de Obsidian (.obsidian/app.json). Por
+# defecto se excluye todo lo oculto: .obsidian, .trash, .git...
+# (ej: OBSIDIAN_IGNORAR=".*, Adjuntos/, *.tmp, !.github/")
+IGNORAR = [p.strip() for p in os.environ.get("OBSIDIAN_IGNORAR", ".*").split(",") if p.strip()]
+
+def _glob_a_regex(patron: str) -> str:
+    """Traduce un patrón de .gitignore (sin ! ni / final) a una regex sobre la ruta relativa"""
+    anclado = "/" in patron
+    patron = patron.lstrip("/")
+    partes = []
+    i = 0
+    while i < len(patron):
+        c = patron[i]
+        if patron.startswith("**/", i):
+            partes.append("(?:.*/)?")
+            i += 3
+            continue
+        if patron.startswith("**", i):
+            partes.append(".*")
+            i += 2
+            continue
+        if c == "*":
+            partes.append("[^/]*")
+        elif c == "?":
+            partes.append("[^/]")
+        elif c == "[" and "]" in patron[i + 2:]:
+            fin = patron.index("]", i + 2)
+            clase = patron[i + 1:fin]
+            partes.append("[" + ("^" + clase[1:] if clase.startswith("!") else clase) + "]")
+            i = fin
+        elif c == "\\" and i + 1 < len(patron):
+            i += 1
+            partes.append(re.escape(patron[i]))
+        else:
+            partes.append(re.escape(c))
+        i += 1
+    # Sin "/" en medio, el patrón vale a cualquier profundidad (como en git)
+    return ("" if anclado else "(?:.*/)?") + "".join(partes)
+
+class ReglasIgnorar:
+    """
+    Reglas de exclusión compiladas una sola vez. Sin negaciones ("!") todas
+    las reglas se unen en una única expresión regular por tipo de entrada;
+    con negaciones se evalúan en orden y gana la última que coincide, como
+    en .gitignore. Se aplican al recorrer: en una carpeta excluida no se
+    llega a entrar.
+    """
+    
+    def __init__(self, patrones: List[str], filtros_obsidian: List[str] = ()):
+        self.patrones = list(patrones) + list(filtros_obsidian)
+        # (regex, negada, solo carpetas) en orden
+        self._reglas = []
+        for patron in patrones:
+            negada = patron.startswith("!")
+            patron = patron[1:] if negada else patron
+            solo_carpetas = patron.endswith("/")
+            self._reglas.append((_glob_a_regex(patron.rstrip("/")), negada, solo_carpetas))
+        for filtro in filtros_obsidian:
+            # Obsidian acepta /regex/ o la ruta de una carpeta o de una nota
+            if len(filtro) > 2 and filtro.startswith("/") and filtro.endswith("/"):
+                try:
+                    re.compile(filtro[1:-1])
+                except re.error as e:
+                    print(f"⚠️ Filtro de exclusión de Obsidian no válido, se ignora: {filtro} ({e})", file=sys.stderr)
+                    continue
+                self._reglas.append((f".*(?:{filtro[1:-1]}).*", False, False))
+            else:
+                # La ruta exacta, la nota con .md o lo que hay dentro de la carpeta
+                # ("Archivo" no excluye "Archivados/" ni "Archivo2.md")
+                ruta = filtro.strip("/")
+                self._reglas.append((re.escape(ruta) + r"(?:\.md|/.*)?", False, False))
+        
+        self._en_orden = [(re.compile(r), negada, solo) for r, negada, solo in self._reglas]
+        self._con_negaciones = any(negada for _, negada, _ in self._reglas)
+        nada = "(?!)"
+        self._archivos = re.compile("|".join(f"(?:{r})" for r, _, solo in self._reglas if not solo) or nada)
+        self._carpetas = re.compile("|".join(f"(?:{r})" for r, _, _ in self._reglas) or nada)
+    
+    @classmethod
+    def del_vault(cls, ruta: Path) -> "ReglasIgnorar":
+        """Las reglas de OBSIDIAN_IGNORAR más los archivos excluidos en la configuración del vault"""
+        filtros = []
+        try:
+            with open(ruta / ".obsidian" / "app.json", 'r', encoding='utf-8') as f:
+                filtros = [str(p) for p in json.load(f).get("userIgnoreFilters", []) if p]
+        except (OSError, ValueError, AttributeError):
+            pass
+        return cls(IGNORAR, filtros)
+    
+    def ignora(self, ruta_relativa: str, es_carpeta: bool) -> bool:
+        """Si una entrada (ruta relativa al vault) está excluida"""
+        if os.sep != "/":
+            ruta_relativa = ruta_relativa.replace(os.sep, "/")
+        if not self._con_negaciones:
+            return (self._carpetas if es_carpeta else self._archivos).fullmatch(ruta_relativa) is not None
+        ignorada = False
+        for regex, negada, solo_carpetas in self._en_orden:
+            if (es_carpeta or not solo_carpetas) and regex.fullmatch(ruta_relativa):
+                ignorada = not negada
+        return ignorada
+    
+    def excluye(self, ruta_relativa: str, es_carpeta: bool = False) -> bool:
+        """Si una entrada queda fuera del recorrido, por sí misma o por alguna de sus carpetas"""
+        partes = Path(ruta_relativa).parts
+        return (any(self.ignora(os.path.join(*partes[:i]), True) for i in range(1, len(partes)))
+                or self.ignora(ruta_relativa, es_carpeta))
+
+def listar_carpeta(raiz: Path, relativa: str, reglas: ReglasIgnorar) -> tuple:
+    """
+    (subcarpetas, archivos) de una carpeta del vault sin lo excluido por las
+    reglas: nombres de subcarpetas y os.DirEntry de archivos
+    """
+    subcarpetas = []
+    archivos = []
+    with os.scandir(os.path.join(raiz, relativa)) as entradas:
+        for entrada in entradas:
+            try:
+                es_carpeta = entrada.is_dir(follow_symlinks=False)
+                if reglas.ignora(os.path.join(relativa, entrada.name), es_carpeta):
+                    continue
+                if es_carpeta:
+                    subcarpetas.append(entrada.name)
+                elif entrada.is_file():
+                    archivos.append(entrada)
+            except OSError:
+                continue
+    return subcarpetas, archivos
+
+def recorrer_archivos(raiz: Path, reglas: ReglasIgnorar, carpeta: str = "", recursivo: bool = True):
+    """
+    Recorre los archivos de un vault (o de una de sus carpetas) como pares
+    (ruta relativa, os.DirEntry), sin entrar nunca en las carpetas
+    excluidas. Es el recorrido que comparten el índice, las herramientas y
+    los recursos.
+    """
+    carpeta = os.path.normpath(carpeta.strip("/")) if carpeta.strip("/") else ""
+    if carpeta and reglas.excluye(carpeta, es_carpeta=True):
+        return
+    pendientes = [carpeta]
+    while pendientes:
+        relativa = pendientes.pop()
+        try:
+            subcarpetas, archivos = listar_carpeta(raiz, relativa, reglas)
+        except OSError:
+            continue
+        if recursivo:
+            pendientes.extend(os.path.join(relativa, s) for s in subcarpetas)
+        for entrada in archivos:
+            yield os.path.join(relativa, entrada.name), entrada
@@ -0,0 +1,133 @@
+"""
+Detección de los cambios hechos en el vault por fuera del servidor
+"""
+
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from obsidian_vault.exclusiones import listar_carpeta, ReglasIgnorar
+
+# Como mucho cada cuántos segundos se comprueba si el vault cambió por fuera del servidor
+OBSIDIAN_REFRESCO_SEGUNDOS = float(os.environ.get("OBSIDIAN_REFRESCO_SEGUNDOS", 2))
+
+# Cómo detecta el refresco los cambios hechos por fuera del servidor:
+# "notas" hace stat de cada archivo del vault; "carpetas" solo vuelve a
+# listar las carpetas cuyo mtime cambió (para montajes de red o FUSE donde
+# recorrer el vault es caro) y hace una pasada completa cada
+# OBSIDIAN_REFRESCO_COMPLETO_SEGUNDOS para ver las notas editadas en su sitio
+MODO_REFRESCO = os.environ.get("OBSIDIAN_MODO_REFRESCO", "notas")
+OBSIDIAN_REFRESCO_COMPLETO_SEGUNDOS = float(os.environ.get("OBSIDIAN_REFRESCO_COMPLETO_SEGUNDOS", 300))
+
+# Resolución del mtime de carpeta en la que no se confía (hasta 2s en
+# algunos sistemas de archivos de red)
+MARGEN_MTIME_CARPETA_NS = 2_000_000_000
+
+class EstadoArchivo:
+    """Tamaño y mtime de un archivo, con los mismos nombres que os.stat_result"""
+    __slots__ = ('st_size', 'st_mtime_ns')
+    
+    def __init__(self, st_size: int, st_mtime_ns: int):
+        self.st_size = st_size
+        self.st_mtime_ns = st_mtime_ns
+
+class ListadoCarpeta:
+    """Lo que había en una carpeta la última vez que se listó"""
+    __slots__ = ('mtime_ns', 'subcarpetas', 'archivos')
+    
+    def __init__(self, mtime_ns: int, subcarpetas: tuple, archivos: Dict[str, tuple]):
+        self.mtime_ns = mtime_ns
+        self.subcarpetas = subcarpetas
+        # Nombre -> (tamaño, mtime_ns)
+        self.archivos = archivos
+
+class ExploradorVault:
+    """
+    Recorre el vault con os.scandir recordando el mtime y el listado de cada
+    carpeta, y devuelve solo lo que cambió desde la exploración anterior.
+    
+    En una exploración podada, una carpeta cuyo mtime no cambió no se
+    vuelve a listar ni se hace stat de sus archivos: detectar cambios cuesta
+    un stat por carpeta. El mtime de una carpeta cambia al crear, borrar o
+    renombrar algo dentro, pero no al editar un archivo en su sitio; para
+    ver esas ediciones hace falta una exploración completa de vez en cuando.
+    """
+    
+    def __init__(self, raiz: Path, reglas: ReglasIgnorar):
+        self.raiz = raiz
+        self.reglas = reglas
+        self.carpetas: Dict[str, ListadoCarpeta] = {}
+        self.ultima_completa = 0.0
+        # Coste de la última exploración
+        self.stats = 0
+        self.listadas = 0
+        self.duracion = 0.0
+    
+    def estado(self, ruta_relativa: str) -> Optional[EstadoArchivo]:
+        """Tamaño y mtime de un archivo según la última exploración"""
+        carpeta, nombre = os.path.split(ruta_relativa)
+        listado = self.carpetas.get(carpeta)
+        valores = listado.archivos.get(nombre) if listado is not None else None
+        return EstadoArchivo(*valores) if valores is not None else None
+    
+    def explorar(self, completo: bool = True) -> tuple:
+        """
+        (archivos nuevos o cambiados, archivos borrados) desde la exploración
+        anterior, como rutas relativas. La primera exploración devuelve todos
+        los archivos como nuevos.
+        """
+        inicio = time.perf_counter()
+        self.stats = self.listadas = 0
+        cambiados: List[str] = []
+        borrados: List[str] = []
+        vistas = set()
+        pendientes = [""]
+        while pendientes:
+            relativa = pendientes.pop()
+            anterior = self.carpetas.get(relativa)
+            try:
+                mtime_ns = os.stat(os.path.join(self.raiz, relativa)).st_mtime_ns
+                self.stats += 1
+                if not completo and anterior is not None and anterior.mtime_ns == mtime_ns:
+                    listado = anterior
+                else:
+                    listado = self._listar(relativa, mtime_ns)
+            except OSError:
+                # La carpeta ya no existe: sus archivos se dan por borrados al final
+                continue
+            vistas.add(relativa)
+            pendientes.extend(os.path.join(relativa, s) for s in listado.subcarpetas)
+            if listado is anterior:
+                continue
+            
+            previos = anterior.archivos if anterior is not None else {}
+            for nombre, valores in listado.archivos.items():
+                if previos.get(nombre) != valores:
+                    cambiados.append(os.path.join(relativa, nombre))
+            borrados.extend(os.path.join(relativa, n) for n in previos if n not in listado.archivos)
+            self.carpetas[relativa] = listado
+        
+        for relativa in [c for c in self.carpetas if c not in vistas]:
+            borrados.extend(os.path.join(relativa, n) for n in self.carpetas.pop(relativa).archivos)
+        if completo:
+            self.ultima_completa = time.monotonic()
+        self.duracion = time.perf_counter() - inicio
+        return cambiados, borrados
+    
+    def _listar(self, relativa: str, mtime_ns: int) -> ListadoCarpeta:
+        subcarpetas, entradas = listar_carpeta(self.raiz, relativa, self.reglas)
+        archivos = {}
+        for entrada in entradas:
+            try:
+                stats = entrada.stat()
+            except OSError:
+                continue
+            self.stats += 1
+            archivos[entrada.name] = (stats.st_size, stats.st_mtime_ns)
+        self.listadas += 1
+        # Con un mtime tan reciente, otro cambio dentro del mismo tic del
+        # sistema de archivos no lo movería: se vuelve a listar la próxima vez
+        if time.time_ns() - mtime_ns < MARGEN_MTIME_CARPETA_NS:
+            mtime_ns = -1
+        return ListadoCarpeta(mtime_ns, tuple(subcarpetas), archivos)
@@ -0,0 +1,160 @@
+"""
+Fragmentos de notas (encabezados y párrafos) y su puntuación BM25
+para buscar pasajes
+"""
+
+import heapq
+import math
+import os
+import re
+from array import array
+from collections import Counter
+from typing import Dict, List, Optional
+
+from obsidian_vault.sintaxis import PATRON_TERMINO
+
+# Palabras a partir de las cuales un fragmento se corta en el siguiente
+# párrafo (o línea, si pasa del doble); los encabezados siempre empiezan
+# un fragmento nuevo
+PALABRAS_POR_FRAGMENTO = int(os.environ.get("OBSIDIAN_PALABRAS_POR_FRAGMENTO", 120))
+
+# Parámetros de BM25 para puntuar pasajes
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+PATRON_ENCABEZADO = re.compile(rb'#{1,6}\s')
+
+def trocear_nota(datos: bytes, max_palabras: int = PALABRAS_POR_FRAGMENTO) -> List[tuple]:
+    """
+    Divide una nota en fragmentos por encabezados y párrafos, sin el
+    frontmatter. Devuelve (desplazamiento, longitud en bytes, primera línea,
+    última línea, {término: frecuencia}) de cada fragmento.
+    """
+    lineas = datos.splitlines(keepends=True)
+    primera = 0
+    if lineas and lineas[0].strip() == b'---':
+        for i in range(1, len(lineas)):
+            if lineas[i].strip() == b'---':
+                primera = i + 1
+                break
+    
+    fragmentos = []
+    actual = None  # [desplazamiento, fin, primera línea, última línea, palabras]
+    fin_de_parrafo = False
+    desplazamiento = sum(len(linea) for linea in lineas[:primera])
+    for numero in range(primera + 1, len(lineas) + 1):
+        linea = lineas[numero - 1]
+        inicio = desplazamiento
+        desplazamiento += len(linea)
+        texto = linea.strip()
+        if not texto:
+            fin_de_parrafo = True
+            continue
+        # Un párrafo muy largo se corta también entre líneas
+        limite = max_palabras if fin_de_parrafo else 2 * max_palabras
+        if actual is not None and (PATRON_ENCABEZADO.match(texto) or actual[4] >= limite):
+            fragmentos.append(actual)
+            actual = None
+        fin_de_parrafo = False
+        if actual is None:
+            actual = [inicio, desplazamiento, numero, numero, 0]
+        actual[1] = desplazamiento
+        actual[3] = numero
+        actual[4] += len(texto.split())
+    if actual is not None:
+        fragmentos.append(actual)
+    
+    resultado = []
+    for inicio, fin, linea_inicio, linea_fin, _ in fragmentos:
+        frecuencias = Counter(PATRON_TERMINO.findall(datos[inicio:fin].decode('utf-8', errors='replace').lower()))
+        resultado.append((inicio, fin - inicio, linea_inicio, linea_fin, frecuencias))
+    return resultado
+
+class AlmacenFragmentos:
+    """
+    Fragmentos de las notas con su posición en el archivo y la frecuencia
+    de cada término, para puntuar pasajes con BM25 sin abrir las notas.
+    Las posiciones van en columnas (arrays) y los huecos de los fragmentos
+    quitados se reutilizan; solo se leen del disco los pasajes devueltos.
+    """
+    
+    def __init__(self):
+        self.desplazamiento = array('Q')
+        self.longitud = array('I')
+        self.linea_inicio = array('I')
+        self.linea_fin = array('I')
+        self.num_terminos = array('I')
+        self.nota: List[Optional[str]] = []
+        self.por_nota: Dict[str, List[tuple]] = {}
+        # Término -> {fragmento: frecuencia}
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.total_terminos = 0
+        self._libres: List[int] = []
+    
+    def __len__(self) -> int:
+        return len(self.nota) - len(self._libres)
+    
+    def poner(self, ruta_relativa: str, fragmentos: List[tuple]):
+        self.quitar(ruta_relativa)
+        propios = []
+        for desplazamiento, longitud, linea_inicio, linea_fin, frecuencias in fragmentos:
+            columnas = (desplazamiento, longitud, linea_inicio, linea_fin, sum(frecuencias.values()))
+            if self._libres:
+                id_fragmento = self._libres.pop()
+                self.nota[id_fragmento] = ruta_relativa
+                for columna, valor in zip(self._columnas(), columnas):
+                    columna[id_fragmento] = valor
+            else:
+                id_fragmento = len(self.nota)
+                self.nota.append(ruta_relativa)
+                for columna, valor in zip(self._columnas(), columnas):
+                    columna.append(valor)
+            self.total_terminos += columnas[4]
+            for termino, frecuencia in frecuencias.items():
+                self.postings.setdefault(termino, {})[id_fragmento] = frecuencia
+            propios.append((id_fragmento, tuple(frecuencias)))
+        if propios:
+            self.por_nota[ruta_relativa] = propios
+    
+    def quitar(self, ruta_relativa: str):
+        for id_fragmento, terminos in self.por_nota.pop(ruta_relativa, ()):
+            for termino in terminos:
+                fragmentos = self.postings.get(termino)
+                if fragmentos is not None:
+                    fragmentos.pop(id_fragmento, None)
+                    if not fragmentos:
+                        del self.postings[termino]
+            self.total_terminos -= self.num_terminos[id_fragmento]
+            self.nota[id_fragmento] = None
+            self._libres.append(id_fragmento)
+    
+    def _columnas(self) -> tuple:
+        return (self.desplazamiento, self.longitud, self.linea_inicio, self.linea_fin, self.num_terminos)
+    
+    def mejores(self, consulta: str, k: int, carpeta: str = "") -> List[tuple]:
+        """Los k fragmentos con mayor puntuación BM25: [(puntuación, id del fragmento)]"""
+        terminos = set(PATRON_TERMINO.findall(consulta.lower()))
+        total = len(self)
+        if not terminos or not total:
+            return []
+        media = self.total_terminos / total
+        prefijo = carpeta.rstrip("/") + "/" if carpeta else ""
+        
+        puntuaciones: Dict[int, float] = {}
+        for termino in terminos:
+            fragmentos = self.postings.get(termino)
+            if not fragmentos:
+                continue
+            idf = math.log(1 + (total - len(fragmentos) + 0.5) / (len(fragmentos) + 0.5))
+            for id_fragmento, frecuencia in fragmentos.items():
+                normalizacion = BM25_K1 * (1 - BM25_B + BM25_B * self.num_terminos[id_fragmento] / media)
+                puntuaciones[id_fragmento] = (puntuaciones.get(id_fragmento, 0.0)
+                                              + idf * frecuencia * (BM25_K1 + 1) / (frecuencia + normalizacion))
+        if prefijo:
+            puntuaciones = {i: p for i, p in puntuaciones.items() if self.nota[i].startswith(prefijo)}
+        return heapq.nlargest(k, ((p, i) for i, p in puntuaciones.items()))
+    
+    def fragmento(self, id_fragmento: int) -> tuple:
+        """(ruta de la nota, desplazamiento, longitud, primera línea, última línea)"""
+        return (self.nota[id_fragmento], self.desplazamiento[id_fragmento], self.longitud[id_fragmento],
+                self.linea_inicio[id_fragmento], self.linea_fin[id_fragmento])
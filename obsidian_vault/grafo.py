@@ -0,0 +1,259 @@
+"""
+Grafo de enlaces entre notas en formato CSR: PageRank, componentes y caminos
+"""
+
+import itertools
+from array import array
+from typing import Dict, List, Optional, Set
+
+# numpy es opcional: vectoriza el análisis del grafo de enlaces en vaults grandes
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from obsidian_vault.sintaxis import claves_de_nota
+
+# PageRank: factor de amortiguación, iteraciones máximas y tolerancia (norma L1)
+PAGERANK_AMORTIGUACION = 0.85
+PAGERANK_MAX_ITERACIONES = 100
+PAGERANK_TOLERANCIA = 1e-6
+
+class GrafoEnlaces:
+    """
+    Grafo dirigido de los enlaces [[...]] entre notas, en formato CSR
+    (`inicio[i]:inicio[i+1]` son las posiciones en `destinos` de los
+    enlaces salientes del nodo i) con su traspuesto para los entrantes.
+    PageRank y componentes se calculan la primera vez que se piden; el
+    índice conserva el grafo hasta que cambia la estructura de enlaces.
+    Con numpy instalado los cálculos se vectorizan; si no, se hacen en
+    Python puro.
+    """
+    
+    def __init__(self, nodos: List[str], salientes: List[List[int]]):
+        self.nodos = nodos
+        self.posicion = {nodo: i for i, nodo in enumerate(nodos)}
+        self.inicio, self.destinos = self._csr(salientes)
+        self.inicio_entrantes, self.origenes = self._traspuesto()
+        self._pagerank: Optional[list] = None
+        self._componentes: Optional[list] = None
+    
+    @staticmethod
+    def _csr(listas: List[List[int]]) -> tuple:
+        inicio = array('Q', [0])
+        planos = array('I')
+        for lista in listas:
+            planos.extend(lista)
+            inicio.append(len(planos))
+        return inicio, planos
+    
+    def _traspuesto(self) -> tuple:
+        """CSR de los enlaces entrantes de cada nodo"""
+        n = len(self.nodos)
+        if np is not None:
+            destinos = np.frombuffer(self.destinos, dtype=np.uint32)
+            orden = np.argsort(destinos, kind='stable')
+            origenes = np.repeat(np.arange(n, dtype=np.uint32), np.diff(np.frombuffer(self.inicio, dtype=np.uint64)).astype(np.int64))
+            inicio = np.zeros(n + 1, dtype=np.uint64)
+            np.cumsum(np.bincount(destinos, minlength=n), out=inicio[1:])
+            return array('Q', inicio.tobytes()), array('I', origenes[orden].tobytes())
+        
+        entrantes: List[List[int]] = [[] for _ in range(n)]
+        for i in range(n):
+            for j in self.destinos[self.inicio[i]:self.inicio[i + 1]]:
+                entrantes[j].append(i)
+        return self._csr(entrantes)
+    
+    @classmethod
+    def desde_indice(cls, notas: List[str], retroenlaces: Dict[str, Set[str]]) -> "GrafoEnlaces":
+        """
+        Construye el grafo desde los retroenlaces del índice: cada destino
+        distinto se resuelve a una nota una sola vez. Un nombre repetido en
+        varias carpetas se resuelve, como Obsidian, a la ruta más corta.
+        """
+        nodos = sorted(notas)
+        resolver: Dict[str, int] = {}
+        por_nombre: Dict[str, int] = {}
+        for i, nodo in enumerate(nodos):
+            clave_ruta, clave_nombre = claves_de_nota(nodo)
+            resolver[clave_ruta] = i
+            actual = por_nombre.get(clave_nombre)
+            if actual is None or len(nodo) < len(nodos[actual]):
+                por_nombre[clave_nombre] = i
+        for clave_nombre, i in por_nombre.items():
+            resolver.setdefault(clave_nombre, i)
+        
+        posicion = {nodo: i for i, nodo in enumerate(nodos)}
+        salientes: List[List[int]] = [[] for _ in nodos]
+        for destino, origenes in retroenlaces.items():
+            j = resolver.get(destino)
+            if j is None:
+                continue
+            for origen in origenes:
+                i = posicion.get(origen)
+                if i is not None and i != j:
+                    salientes[i].append(j)
+        # Dos enlaces distintos ([[A]] y [[Carpeta/A]]) pueden llevar a la misma nota
+        return cls(nodos, [sorted(set(destinos)) for destinos in salientes])
+    
+    def __len__(self) -> int:
+        return len(self.nodos)
+    
+    @property
+    def num_enlaces(self) -> int:
+        return len(self.destinos)
+    
+    def grado_salida(self, i: int) -> int:
+        return self.inicio[i + 1] - self.inicio[i]
+    
+    def grado_entrada(self, i: int) -> int:
+        return self.inicio_entrantes[i + 1] - self.inicio_entrantes[i]
+    
+    def salientes(self, i: int) -> array:
+        return self.destinos[self.inicio[i]:self.inicio[i + 1]]
+    
+    def entrantes(self, i: int) -> array:
+        return self.origenes[self.inicio_entrantes[i]:self.inicio_entrantes[i + 1]]
+    
+    def pagerank(self) -> list:
+        """
+        PageRank por iteración de potencias. La puntuación de las notas sin
+        enlaces salientes se reparte entre todas.
+        """
+        if self._pagerank is None:
+            self._pagerank = self._pagerank_numpy() if np is not None else self._pagerank_python()
+        return self._pagerank
+    
+    def _pagerank_numpy(self) -> list:
+        n = len(self.nodos)
+        if not n:
+            return []
+        d = PAGERANK_AMORTIGUACION
+        salida = np.diff(np.frombuffer(self.inicio, dtype=np.uint64)).astype(np.float64)
+        origenes = np.repeat(np.arange(n), salida.astype(np.int64))
+        destinos = np.frombuffer(self.destinos, dtype=np.uint32)
+        colgantes = salida == 0
+        inverso_salida = np.divide(1.0, salida, out=np.zeros(n), where=~colgantes)
+        rango = np.full(n, 1.0 / n)
+        for _ in range(PAGERANK_MAX_ITERACIONES):
+            aportes = (rango * inverso_salida)[origenes]
+            nuevo = d * np.bincount(destinos, weights=aportes, minlength=n)
+            nuevo += (1 - d + d * rango[colgantes].sum()) / n
+            if np.abs(nuevo - rango).sum() < PAGERANK_TOLERANCIA:
+                rango = nuevo
+                break
+            rango = nuevo
+        return rango.tolist()
+    
+    def _pagerank_python(self) -> list:
+        n = len(self.nodos)
+        if not n:
+            return []
+        d = PAGERANK_AMORTIGUACION
+        inicio, destinos = self.inicio, self.destinos
+        salida = [inicio[i + 1] - inicio[i] for i in range(n)]
+        rango = [1.0 / n] * n
+        for _ in range(PAGERANK_MAX_ITERACIONES):
+            colgante = sum(r for r, s in zip(rango, salida) if not s)
+            base = (1 - d + d * colgante) / n
+            nuevo = [base] * n
+            for i in range(n):
+                if salida[i]:
+                    aporte = d * rango[i] / salida[i]
+                    for j in destinos[inicio[i]:inicio[i + 1]]:
+                        nuevo[j] += aporte
+            diferencia = sum(abs(a - b) for a, b in zip(nuevo, rango))
+            rango = nuevo
+            if diferencia < PAGERANK_TOLERANCIA:
+                break
+        return rango
+    
+    def componentes(self) -> list:
+        """Componente (débilmente) conexa de cada nodo, identificada por uno de sus nodos"""
+        if self._componentes is None:
+            self._componentes = self._componentes_numpy() if np is not None else self._componentes_python()
+        return self._componentes
+    
+    def _componentes_numpy(self) -> list:
+        # Propagación de la etiqueta mínima con saltos de puntero: pocas pasadas vectorizadas
+        n = len(self.nodos)
+        salida = np.diff(np.frombuffer(self.inicio, dtype=np.uint64)).astype(np.int64)
+        origenes = np.repeat(np.arange(n), salida)
+        destinos = np.frombuffer(self.destinos, dtype=np.uint32).astype(np.int64)
+        etiqueta = np.arange(n)
+        while True:
+            anterior = etiqueta.copy()
+            minimo = np.minimum(etiqueta[origenes], etiqueta[destinos])
+            np.minimum.at(etiqueta, etiqueta[origenes], minimo)
+            np.minimum.at(etiqueta, etiqueta[destinos], minimo)
+            etiqueta = etiqueta[etiqueta]
+            if np.array_equal(etiqueta, anterior):
+                return etiqueta.tolist()
+    
+    def _componentes_python(self) -> list:
+        padre = list(range(len(self.nodos)))
+        
+        def raiz(i: int) -> int:
+            while padre[i] != i:
+                padre[i] = padre[padre[i]]
+                i = padre[i]
+            return i
+        
+        inicio, destinos = self.inicio, self.destinos
+        for i in range(len(self.nodos)):
+            for j in destinos[inicio[i]:inicio[i + 1]]:
+                a, b = raiz(i), raiz(j)
+                if a != b:
+                    padre[max(a, b)] = min(a, b)
+        return [raiz(i) for i in range(len(self.nodos))]
+    
+    def camino(self, origen: int, destino: int, solo_salientes: bool = False) -> Optional[List[int]]:
+        """
+        Camino más corto (en saltos) o None si no hay. Búsqueda en anchura
+        desde los dos extremos, ampliando cada vez la frontera más pequeña:
+        visita una fracción del grafo en lugar de todo.
+        """
+        # Nodo -> (nodo por el que se llegó, distancia) desde cada extremo
+        ida = {origen: (None, 0)}
+        vuelta = {destino: (None, 0)}
+        frontera_ida, frontera_vuelta = [origen], [destino]
+        encuentro = origen if origen == destino else None
+        while encuentro is None and frontera_ida and frontera_vuelta:
+            hacia_delante = len(frontera_ida) <= len(frontera_vuelta)
+            frontera, vistos, otros = (frontera_ida, ida, vuelta) if hacia_delante else (frontera_vuelta, vuelta, ida)
+            mejor = None
+            nueva = []
+            for i in frontera:
+                distancia = vistos[i][1] + 1
+                if solo_salientes:
+                    vecinos = self.salientes(i) if hacia_delante else self.entrantes(i)
+                else:
+                    vecinos = itertools.chain(self.salientes(i), self.entrantes(i))
+                for j in vecinos:
+                    if j in vistos:
+                        continue
+                    vistos[j] = (i, distancia)
+                    nueva.append(j)
+                    # Se termina la capa antes de elegir: el primer encuentro no tiene por qué ser el más corto
+                    if j in otros and (mejor is None or distancia + otros[j][1] < mejor[0]):
+                        mejor = (distancia + otros[j][1], j)
+            if hacia_delante:
+                frontera_ida = nueva
+            else:
+                frontera_vuelta = nueva
+            if mejor is not None:
+                encuentro = mejor[1]
+        if encuentro is None:
+            return None
+        
+        camino = []
+        nodo = encuentro
+        while nodo is not None:
+            camino.append(nodo)
+            nodo = ida[nodo][0]
+        camino.reverse()
+        nodo = vuelta[encuentro][0]
+        while nodo is not None:
+            camino.append(nodo)
+            nodo = vuelta[nodo][0]
+        return camino
@@ -0,0 +1,431 @@
+"""
+Índice de un vault construido en segundo plano y mantenido al día
+"""
+
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from obsidian_vault.exclusiones import ReglasIgnorar
+from obsidian_vault.propiedades import (
+    CAMPOS_DE_ARCHIVO, campo_de_archivo, ColumnaPropiedad, cumple, propiedades_indexables,
+)
+from obsidian_vault.segmentos import crear_indice_terminos
+from obsidian_vault.sintaxis import (
+    PATRON_EMBEBIDO, PATRON_ENLACE, PATRON_ETIQUETA, PATRON_TERMINO, claves_de_nota, destino_enlace,
+)
+from obsidian_vault.explorador import (
+    MODO_REFRESCO, OBSIDIAN_REFRESCO_COMPLETO_SEGUNDOS, OBSIDIAN_REFRESCO_SEGUNDOS, ExploradorVault,
+)
+from obsidian_vault.metadatos import Adjunto, AlmacenMetadatos
+from obsidian_vault.fragmentos import AlmacenFragmentos, trocear_nota
+from obsidian_vault.tareas import extraer_tareas, FiltroTareas, Tarea
+from obsidian_vault.grafo import GrafoEnlaces
+
+class EntradaNota:
+    """
+    Lo que el índice recuerda del contenido de una nota (tamaño, mtime y
+    recuentos viven en el AlmacenMetadatos del índice)
+    """
+    __slots__ = ('etiquetas', 'enlaces', 'embebidos', 'terminos', 'propiedades')
+    
+    def __init__(self, contenido: str, terminos: Optional[frozenset] = None):
+        self.etiquetas = tuple(PATRON_ETIQUETA.findall(contenido))
+        self.enlaces = tuple(PATRON_ENLACE.findall(contenido))
+        self.embebidos = tuple({e.strip().lower() for e in PATRON_EMBEBIDO.findall(contenido)})
+        self.terminos = terminos if terminos is not None else frozenset(PATRON_TERMINO.findall(contenido.lower()))
+        self.propiedades = propiedades_indexables(contenido)
+
+class IndiceVault:
+    """
+    Índice en memoria de un vault: nombres, etiquetas, enlaces y contenido.
+    
+    Se construye en un hilo en segundo plano para no retrasar el arranque
+    del servidor. Mientras no está listo, las herramientas recorren el vault
+    como siempre. Una vez listo se mantiene al día con las escrituras del
+    servidor y comprobando mtime/tamaño de las notas cada
+    OBSIDIAN_REFRESCO_SEGUNDOS como mucho.
+    """
+    
+    def __init__(self, ruta: Path, al_cambiar=None, reglas: Optional[ReglasIgnorar] = None):
+        self.ruta = ruta
+        self.al_cambiar = al_cambiar
+        self.reglas = reglas if reglas is not None else ReglasIgnorar.del_vault(ruta)
+        self.estado = "pendiente"
+        self.total = 0
+        self.procesadas = 0
+        self.duracion: Optional[float] = None
+        self.error: Optional[str] = None
+        self._inicio = time.monotonic()
+        self._cancelado = False
+        self._ultimo_refresco = 0.0
+        self._lock = threading.RLock()
+        # Un solo refresco a la vez: el explorador guarda el estado del recorrido anterior
+        self._refrescando = threading.Lock()
+        self.explorador = ExploradorVault(ruta, self.reglas)
+        
+        self.notas: Dict[str, EntradaNota] = {}
+        self.nombres: Dict[str, str] = {}
+        self.etiquetas: Dict[str, Set[str]] = {}
+        self.terminos = crear_indice_terminos(ruta)
+        self.propiedades: Dict[str, ColumnaPropiedad] = {}
+        self.metadatos = AlmacenMetadatos()
+        self.fragmentos = AlmacenFragmentos()
+        self.adjuntos: Dict[str, Adjunto] = {}
+        # Destino embebido (en minúsculas, nombre o ruta) -> notas que lo embeben
+        self.embebidos: Dict[str, Set[str]] = {}
+        # Destino de un enlace [[...]] (destino_enlace) -> notas que lo enlazan
+        self.retroenlaces: Dict[str, Set[str]] = {}
+        # Nombre de nota en minúsculas -> cuántas notas lo llevan (para enlaces ambiguos)
+        self.notas_por_nombre: Dict[str, int] = {}
+        # Avanza cuando cambian las notas o sus enlaces; el grafo se conserva mientras no cambie
+        self.version_enlaces = 0
+        self._grafo: Optional[tuple] = None
+        # Solo las notas con alguna tarea -> sus tareas, en orden de línea
+        self.tareas: Dict[str, List[Tarea]] = {}
+        self.total_tareas = 0
+    
+    @property
+    def listo(self) -> bool:
+        return self.estado == "listo"
+    
+    def progreso(self) -> str:
+        if self.listo:
+            return f"listo ({len(self.notas)} notas en {self.duracion:.1f}s)"
+        if self.estado == "error":
+            return f"error: {self.error}"
+        porcentaje = 100 * self.procesadas / self.total if self.total else 0
+        return f"{self.estado} {porcentaje:.0f}% ({self.procesadas}/{self.total} notas)"
+    
+    def iniciar(self):
+        """Lanza la construcción en un hilo en segundo plano"""
+        threading.Thread(target=self.construir, name=f"indice-{self.ruta.name}", daemon=True).start()
+    
+    def cancelar(self):
+        self._cancelado = True
+        self.terminos.cerrar()
+    
+    def construir(self):
+        """Indexa todas las notas del vault, actualizando el progreso"""
+        self.estado = "construyendo"
+        try:
+            with self._refrescando:
+                archivos, _ = self.explorador.explorar()
+            notas = [r for r in archivos if r.endswith(".md")]
+            self.total = len(notas)
+            for ruta_relativa in notas:
+                if self._cancelado:
+                    self.estado = "cancelado"
+                    return
+                self._indexar_archivo(self.ruta / ruta_relativa)
+                self.procesadas += 1
+            for ruta_relativa in archivos:
+                if not ruta_relativa.endswith(".md"):
+                    self._poner_adjunto(ruta_relativa)
+            self.terminos.volcar(forzar=True)
+            self.duracion = time.monotonic() - self._inicio
+            self._ultimo_refresco = time.monotonic()
+            self.estado = "listo"
+        except Exception as e:
+            self.error = str(e)
+            self.estado = "error"
+    
+    def _indexar_archivo(self, archivo: Path) -> bool:
+        """
+        (Re)indexa una nota; si ya no existe, la quita del índice. Devuelve
+        False si el contenido no cambió (solo se tocó el mtime) y no hubo
+        que volver a analizarla.
+        """
+        ruta_relativa = str(archivo.relative_to(self.ruta))
+        try:
+            # stat antes de leer: si la nota cambia mientras se lee, el
+            # siguiente refresco verá un mtime distinto y la volverá a indexar
+            stats = archivo.stat()
+            with open(archivo, 'rb') as f:
+                datos = f.read()
+            huella = int.from_bytes(hashlib.blake2b(datos, digest_size=8).digest(), "little")
+            if self.metadatos.mismo_contenido(ruta_relativa, huella):
+                with self._lock:
+                    self.metadatos.actualizar_stats(ruta_relativa, stats)
+                return False
+            contenido = datos.decode('utf-8')
+            fragmentos = trocear_nota(datos)
+            # Los fragmentos ya contaron los términos del cuerpo: fuera de
+            # ellos solo quedan el frontmatter y líneas en blanco
+            cabecera = datos[:fragmentos[0][0]] if fragmentos else datos
+            terminos = frozenset(PATRON_TERMINO.findall(cabecera.decode('utf-8').lower())).union(*(f[4] for f in fragmentos))
+            entrada = EntradaNota(contenido, terminos)
+            tareas = extraer_tareas(contenido)
+        except FileNotFoundError:
+            with self._lock:
+                if ruta_relativa in self.notas:
+                    self.version_enlaces += 1
+                self._desindexar(ruta_relativa)
+            return True
+        except (OSError, UnicodeDecodeError):
+            return False
+        
+        with self._lock:
+            anterior = self.notas.get(ruta_relativa)
+            if anterior is None or set(anterior.enlaces) != set(entrada.enlaces):
+                self.version_enlaces += 1
+            self._desindexar(ruta_relativa)
+            self.notas[ruta_relativa] = entrada
+            self.metadatos.poner(ruta_relativa, stats, len(contenido.split()), len(contenido), huella)
+            self.fragmentos.poner(ruta_relativa, fragmentos)
+            if tareas:
+                self.tareas[ruta_relativa] = tareas
+                self.total_tareas += len(tareas)
+            self.nombres.setdefault(archivo.name, ruta_relativa)
+            self.nombres.setdefault(archivo.stem, ruta_relativa)
+            for etiqueta in entrada.etiquetas:
+                self.etiquetas.setdefault(etiqueta, set()).add(ruta_relativa)
+            for destino in entrada.embebidos:
+                self.embebidos.setdefault(destino, set()).add(ruta_relativa)
+            for destino in {destino_enlace(e) for e in entrada.enlaces}:
+                self.retroenlaces.setdefault(destino, set()).add(ruta_relativa)
+            nombre = claves_de_nota(ruta_relativa)[1]
+            self.notas_por_nombre[nombre] = self.notas_por_nombre.get(nombre, 0) + 1
+            self.terminos.añadir(ruta_relativa, entrada.terminos)
+            if not self.terminos.guarda_terminos:
+                entrada.terminos = frozenset()
+            for propiedad, valor in entrada.propiedades.items():
+                self.propiedades.setdefault(propiedad, ColumnaPropiedad()).añadir(ruta_relativa, valor)
+        return True
+    
+    def _desindexar(self, ruta_relativa: str):
+        entrada = self.notas.pop(ruta_relativa, None)
+        if entrada is None:
+            return
+        self.metadatos.quitar(ruta_relativa)
+        self.fragmentos.quitar(ruta_relativa)
+        self.total_tareas -= len(self.tareas.pop(ruta_relativa, ()))
+        for destino in entrada.embebidos:
+            rutas = self.embebidos.get(destino)
+            if rutas is not None:
+                rutas.discard(ruta_relativa)
+                if not rutas:
+                    del self.embebidos[destino]
+        for destino in {destino_enlace(e) for e in entrada.enlaces}:
+            rutas = self.retroenlaces.get(destino)
+            if rutas is not None:
+                rutas.discard(ruta_relativa)
+                if not rutas:
+                    del self.retroenlaces[destino]
+        nombre = claves_de_nota(ruta_relativa)[1]
+        if self.notas_por_nombre.get(nombre, 0) > 1:
+            self.notas_por_nombre[nombre] -= 1
+        else:
+            self.notas_por_nombre.pop(nombre, None)
+        for etiqueta in entrada.etiquetas:
+            rutas = self.etiquetas.get(etiqueta)
+            if rutas is not None:
+                rutas.discard(ruta_relativa)
+                if not rutas:
+                    del self.etiquetas[etiqueta]
+        self.terminos.quitar(ruta_relativa, entrada.terminos)
+        for propiedad in entrada.propiedades:
+            columna = self.propiedades.get(propiedad)
+            if columna is not None:
+                columna.quitar(ruta_relativa)
+                if not columna.valores:
+                    del self.propiedades[propiedad]
+        # Solo el nombre y el nombre sin extensión de esta nota pueden apuntar a ella
+        nombre = os.path.basename(ruta_relativa)
+        for clave in (nombre, os.path.splitext(nombre)[0]):
+            if self.nombres.get(clave) == ruta_relativa:
+                del self.nombres[clave]
+    
+    def _poner_adjunto(self, ruta_relativa: str):
+        stats = self.explorador.estado(ruta_relativa)
+        if stats is not None:
+            with self._lock:
+                self.adjuntos[ruta_relativa] = Adjunto(os.path.basename(ruta_relativa), stats)
+    
+    def actualizar_nota(self, archivo: Path):
+        """Refleja en el índice una nota escrita por el servidor"""
+        self._indexar_archivo(archivo)
+    
+    def actualizar_notas(self, archivos: List[Path]):
+        """Refleja en el índice un lote de notas escritas por el servidor"""
+        for archivo in archivos:
+            self._indexar_archivo(archivo)
+        self.terminos.volcar()
+    
+    def refrescar(self, forzar: bool = False) -> int:
+        """
+        Detecta cambios hechos por fuera del servidor comparando mtime y
+        tamaño de cada nota (o solo de las carpetas que cambiaron, en el modo
+        "carpetas"). Devuelve el número de notas reindexadas o eliminadas.
+        """
+        if not forzar and time.monotonic() - self._ultimo_refresco < OBSIDIAN_REFRESCO_SEGUNDOS:
+            return 0
+        # Si otro hilo ya está refrescando, su resultado vale también para este
+        if not self._refrescando.acquire(blocking=False):
+            return 0
+        try:
+            completo = (forzar or MODO_REFRESCO != "carpetas"
+                        or time.monotonic() - self.explorador.ultima_completa >= OBSIDIAN_REFRESCO_COMPLETO_SEGUNDOS)
+            cambiados, borrados = self.explorador.explorar(completo)
+        finally:
+            self._refrescando.release()
+        
+        cambios = 0
+        for ruta_relativa in cambiados:
+            if ruta_relativa.endswith(".md"):
+                # Sincronizadores y checkouts de git tocan el mtime sin cambiar
+                # nada: en ese caso solo se calcula la huella del contenido
+                stats = self.explorador.estado(ruta_relativa)
+                if (stats is None or not self.metadatos.vigente(ruta_relativa, stats)) \
+                        and self._indexar_archivo(self.ruta / ruta_relativa):
+                    cambios += 1
+            else:
+                self._poner_adjunto(ruta_relativa)
+                cambios += 1
+        
+        with self._lock:
+            for ruta_relativa in borrados:
+                if ruta_relativa in self.notas:
+                    self._desindexar(ruta_relativa)
+                    self.version_enlaces += 1
+                    cambios += 1
+                elif self.adjuntos.pop(ruta_relativa, None) is not None:
+                    cambios += 1
+        self.terminos.volcar()
+        self._ultimo_refresco = time.monotonic()
+        if cambios and self.al_cambiar is not None:
+            self.al_cambiar()
+        return cambios
+    
+    def notas_que_embeben(self, ruta_adjunto: str) -> Set[str]:
+        """Notas que embeben un adjunto, por su ruta o solo por su nombre"""
+        with self._lock:
+            return (self.embebidos.get(ruta_adjunto.lower(), set())
+                    | self.embebidos.get(os.path.basename(ruta_adjunto).lower(), set()))
+    
+    def notas_que_enlazan(self, ruta_relativa: str) -> tuple:
+        """
+        (notas que enlazan la nota por su ruta o por su nombre, si el nombre
+        es ambiguo porque lo llevan varias notas)
+        """
+        clave_ruta, clave_nombre = claves_de_nota(ruta_relativa)
+        with self._lock:
+            rutas = set(self.retroenlaces.get(clave_ruta, ()))
+            ambiguo = self.notas_por_nombre.get(clave_nombre, 0) > 1
+            if not ambiguo:
+                rutas |= self.retroenlaces.get(clave_nombre, set())
+            return rutas, ambiguo
+    
+    def grafo(self) -> "GrafoEnlaces":
+        """Grafo de enlaces entre notas; se reconstruye solo si cambió la estructura de enlaces"""
+        with self._lock:
+            version = self.version_enlaces
+            if self._grafo is not None and self._grafo[0] == version:
+                return self._grafo[1]
+            notas = list(self.notas)
+            retroenlaces = {destino: set(rutas) for destino, rutas in self.retroenlaces.items()}
+        # Se construye fuera del lock para no frenar al resto de herramientas
+        grafo = GrafoEnlaces.desde_indice(notas, retroenlaces)
+        with self._lock:
+            if self.version_enlaces == version:
+                self._grafo = (version, grafo)
+        return grafo
+    
+    def adjuntos_sin_referencias(self) -> List[str]:
+        with self._lock:
+            return sorted(r for r in self.adjuntos if not self.notas_que_embeben(r))
+    
+    def buscar_nombre(self, nombre_archivo: str) -> Optional[Path]:
+        ruta_relativa = self.nombres.get(nombre_archivo)
+        return self.ruta / ruta_relativa if ruta_relativa else None
+    
+    def candidatos(self, texto_lower: str, carpeta: str = "") -> Optional[List[str]]:
+        """
+        Notas que pueden contener el texto (superconjunto de las que lo
+        contienen), o None si el texto no tiene términos indexables.
+        """
+        terminos_consulta = PATRON_TERMINO.findall(texto_lower)
+        if not terminos_consulta:
+            return None
+        
+        with self._lock:
+            resultado: Optional[Set[str]] = None
+            for termino_consulta in terminos_consulta:
+                # Una palabra de la consulta puede ser parte de un término (ej: "medit")
+                rutas = self.terminos.buscar(termino_consulta)
+                resultado = rutas if resultado is None else resultado & rutas
+                if not resultado:
+                    return []
+        
+        prefijo = carpeta.rstrip("/") + "/" if carpeta else ""
+        return sorted(r for r in resultado if r.startswith(prefijo))
+    
+    def pasajes(self, consulta: str, k: int, carpeta: str = "") -> tuple:
+        """
+        ([(puntuación, ruta, desplazamiento, longitud, primera línea, última
+        línea)], fragmentos indexados) de los k mejores fragmentos
+        """
+        with self._lock:
+            mejores = self.fragmentos.mejores(consulta, k, carpeta)
+            return [(p,) + self.fragmentos.fragmento(i) for p, i in mejores], len(self.fragmentos)
+    
+    def buscar_tareas(self, filtro: FiltroTareas) -> List[tuple]:
+        """[(ruta, tarea)] de las tareas que cumplen el filtro, sin abrir ninguna nota"""
+        with self._lock:
+            return [(ruta_relativa, tarea) for ruta_relativa, tareas in self.tareas.items()
+                    if filtro.admite_nota(ruta_relativa) for tarea in tareas if filtro.cumple(tarea)]
+    
+    def consultar(self, condiciones: List[tuple], campos: List[str]) -> List[dict]:
+        """
+        Notas que cumplen todas las condiciones, con los campos pedidos,
+        respondiendo solo con las columnas de propiedades. Las igualdades
+        se resuelven con el índice inverso; el resto filtra los candidatos.
+        """
+        with self._lock:
+            candidatas: Optional[Set[str]] = None
+            for campo, operador, valor in condiciones:
+                if operador == "=" and campo in self.propiedades:
+                    rutas = self.propiedades[campo].iguales(valor)
+                    candidatas = set(rutas) if candidatas is None else candidatas & rutas
+            if candidatas is None:
+                candidatas = set(self.notas)
+            
+            filas = []
+            for ruta_relativa in candidatas:
+                if all(cumple(self._valor(campo, ruta_relativa), operador, valor)
+                       for campo, operador, valor in condiciones):
+                    filas.append({campo: self._valor(campo, ruta_relativa) for campo in campos})
+            return filas
+    
+    def _valor(self, campo: str, ruta_relativa: str):
+        if campo in CAMPOS_DE_ARCHIVO:
+            return campo_de_archivo(campo, ruta_relativa)
+        columna = self.propiedades.get(campo)
+        return columna.valores.get(ruta_relativa) if columna else None
+    
+    def estadisticas(self) -> dict:
+        """Agregados de estadisticas_vault calculados sin abrir ninguna nota"""
+        with self._lock:
+            metadatos = self.metadatos
+            enlaces_internos = set()
+            for entrada in self.notas.values():
+                enlaces_internos.update(entrada.enlaces)
+            por_fecha = {}
+            for fila in metadatos.filas.values():
+                fecha_str = datetime.fromtimestamp(metadatos.mtime_ns[fila] / 1e9).strftime('%Y-%m')
+                por_fecha[fecha_str] = por_fecha.get(fecha_str, 0) + 1
+            ids_carpetas = {metadatos.carpeta[fila] for fila in metadatos.filas.values()}
+            
+            return {
+                'total_notas': len(self.notas),
+                'total_palabras': sum(metadatos.palabras),
+                'total_caracteres': sum(metadatos.caracteres),
+                'carpetas': {metadatos.carpetas[i] for i in ids_carpetas if metadatos.carpetas[i]},
+                'etiquetas': set(self.etiquetas),
+                'enlaces_internos': enlaces_internos,
+                'por_fecha': por_fecha,
+            }
@@ -0,0 +1,150 @@
+"""
+Metadatos de notas y adjuntos en columnas compactas
+"""
+
+import mimetypes
+import os
+import sys
+from array import array
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+class Adjunto:
+    """Un archivo del vault que no es una nota (imagen, PDF, audio...)"""
+    __slots__ = ('tipo', 'tamaño', 'mtime_ns')
+    
+    def __init__(self, nombre: str, stats: os.stat_result):
+        self.tipo = sys.intern(mimetypes.guess_type(nombre)[0] or "application/octet-stream")
+        self.tamaño = stats.st_size
+        self.mtime_ns = stats.st_mtime_ns
+
+class FilaNota:
+    """Metadatos de una nota listos para mostrar (se crean solo al renderizar)"""
+    __slots__ = ('ruta', 'carpeta', 'tamaño', 'mtime_ns', 'palabras')
+    
+    def __init__(self, ruta: str, carpeta: str, tamaño: int, mtime_ns: int, palabras: Optional[int] = None):
+        self.ruta = ruta
+        self.carpeta = carpeta
+        self.tamaño = tamaño
+        self.mtime_ns = mtime_ns
+        self.palabras = palabras
+    
+    @property
+    def nombre(self) -> str:
+        return os.path.basename(self.ruta)
+    
+    @property
+    def fecha(self) -> date:
+        return datetime.fromtimestamp(self.mtime_ns / 1e9).date()
+    
+    @classmethod
+    def desde_archivo(cls, archivo: Path, vault_path: Path) -> "FilaNota":
+        stats = archivo.stat()
+        ruta_relativa = str(archivo.relative_to(vault_path))
+        return cls(ruta_relativa, os.path.dirname(ruta_relativa), stats.st_size, stats.st_mtime_ns)
+
+class AlmacenMetadatos:
+    """
+    Metadatos de las notas en columnas compactas, para vaults de millones
+    de notas: cada nota ocupa una fila de arrays de enteros (tamaño, mtime,
+    palabras, caracteres) más un identificador de carpeta; los nombres de
+    carpeta se guardan una sola vez. Las filas de notas borradas se
+    reutilizan.
+    """
+    
+    def __init__(self):
+        self.carpetas: List[str] = []
+        self._id_carpeta: Dict[str, int] = {}
+        self.filas: Dict[str, int] = {}
+        self.rutas: List[Optional[str]] = []
+        self.carpeta = array('I')
+        self.tamaño = array('q')
+        self.mtime_ns = array('q')
+        self.palabras = array('I')
+        self.caracteres = array('Q')
+        self.huella = array('Q')
+        self._libres: List[int] = []
+    
+    def __len__(self) -> int:
+        return len(self.filas)
+    
+    def _carpeta_id(self, carpeta: str) -> int:
+        id_carpeta = self._id_carpeta.get(carpeta)
+        if id_carpeta is None:
+            id_carpeta = len(self.carpetas)
+            self.carpetas.append(sys.intern(carpeta))
+            self._id_carpeta[self.carpetas[-1]] = id_carpeta
+        return id_carpeta
+    
+    def poner(self, ruta_relativa: str, stats: os.stat_result, palabras: int, caracteres: int, huella: int):
+        fila = self.filas.get(ruta_relativa)
+        id_carpeta = self._carpeta_id(os.path.dirname(ruta_relativa))
+        if fila is None:
+            if self._libres:
+                fila = self._libres.pop()
+                self.rutas[fila] = ruta_relativa
+            else:
+                fila = len(self.rutas)
+                self.rutas.append(ruta_relativa)
+                for columna in (self.carpeta, self.tamaño, self.mtime_ns, self.palabras, self.caracteres, self.huella):
+                    columna.append(0)
+            self.filas[ruta_relativa] = fila
+        self.carpeta[fila] = id_carpeta
+        self.tamaño[fila] = stats.st_size
+        self.mtime_ns[fila] = stats.st_mtime_ns
+        self.palabras[fila] = palabras
+        self.caracteres[fila] = caracteres
+        self.huella[fila] = huella
+    
+    def quitar(self, ruta_relativa: str):
+        fila = self.filas.pop(ruta_relativa, None)
+        if fila is not None:
+            # Las filas libres cuentan cero en las sumas de columnas
+            self.rutas[fila] = None
+            self.palabras[fila] = 0
+            self.caracteres[fila] = 0
+            self._libres.append(fila)
+    
+    def vigente(self, ruta_relativa: str, stats: os.stat_result) -> bool:
+        """Si la nota no cambió (mismo mtime y tamaño) desde que se indexó"""
+        fila = self.filas.get(ruta_relativa)
+        return fila is not None and self.mtime_ns[fila] == stats.st_mtime_ns and self.tamaño[fila] == stats.st_size
+    
+    def mismo_contenido(self, ruta_relativa: str, huella: int) -> bool:
+        fila = self.filas.get(ruta_relativa)
+        return fila is not None and self.huella[fila] == huella
+    
+    def actualizar_stats(self, ruta_relativa: str, stats: os.stat_result):
+        """Nota tocada sin cambiar su contenido: solo se apuntan el nuevo mtime y tamaño"""
+        fila = self.filas[ruta_relativa]
+        self.tamaño[fila] = stats.st_size
+        self.mtime_ns[fila] = stats.st_mtime_ns
+    
+    def fila(self, ruta_relativa: str) -> FilaNota:
+        i = self.filas[ruta_relativa]
+        return FilaNota(ruta_relativa, self.carpetas[self.carpeta[i]], self.tamaño[i], self.mtime_ns[i], self.palabras[i])
+    
+    def listar(self, carpeta: str = "", incluir_subcarpetas: bool = True) -> List[FilaNota]:
+        """Notas de una carpeta (vacío = todo el vault), filtrando por carpeta interna"""
+        carpeta = carpeta.strip("/")
+        if carpeta and not incluir_subcarpetas:
+            ids = {self._id_carpeta.get(carpeta)}
+        elif carpeta:
+            ids = {i for i, c in enumerate(self.carpetas) if c == carpeta or c.startswith(carpeta + "/")}
+        elif not incluir_subcarpetas:
+            ids = {self._id_carpeta.get("")}
+        else:
+            ids = None
+        return [self.fila(ruta) for ruta, i in self.filas.items() if ids is None or self.carpeta[i] in ids]
+    
+    def bytes_por_nota(self) -> float:
+        """Memoria residente del almacén dividida entre las notas que contiene"""
+        if not self.filas:
+            return 0.0
+        total = sum(sys.getsizeof(c) for c in (self.carpeta, self.tamaño, self.mtime_ns, self.palabras, self.caracteres, self.huella))
+        total += sys.getsizeof(self.filas) + sys.getsizeof(self.rutas) + sys.getsizeof(self._libres)
+        total += sys.getsizeof(self._id_carpeta) + sum(sys.getsizeof(c) for c in self.carpetas)
+        # Las cadenas de las rutas las comparte todo el índice; se cuentan aquí una vez
+        total += sum(sys.getsizeof(r) for r in self.filas)
+        return total / len(self.filas)
@@ -0,0 +1,223 @@
+"""
+Reparto de los recorridos del vault entre un pool de procesos
+"""
+
+import atexit
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from typing import List, Optional
+
+from obsidian_vault.progreso import NOTAS_POR_TANDA, Seguimiento
+
+# Procesos para repartir búsquedas y estadísticas (0 o 1 = todo en este proceso)
+OBSIDIAN_PROCESOS = int(os.environ.get("OBSIDIAN_PROCESOS", 0))
+
+# Por debajo de este número de notas no compensa repartir el trabajo
+MIN_NOTAS_PARALELO = 200
+
+# Fragmentos por proceso: más de uno reparte mejor la carga si hay notas grandes
+FRAGMENTOS_POR_PROCESO = 4
+
+# Segundos entre comprobaciones de cancelación y plazo mientras trabaja el pool
+INTERVALO_COMPROBACION_POOL = 0.1
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def _calentar_proceso(_) -> int:
+    return os.getpid()
+
+def obtener_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Devuelve el pool de procesos, creándolo la primera vez.
+    
+    El pool se mantiene vivo entre llamadas para que el coste de arrancar
+    los procesos se pague una sola vez.
+    """
+    global _pool
+    if OBSIDIAN_PROCESOS <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=OBSIDIAN_PROCESOS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            # Arrancar ya todos los procesos en lugar de en la primera búsqueda
+            list(_pool.map(_calentar_proceso, range(OBSIDIAN_PROCESOS)))
+    return _pool
+
+def cerrar_pool():
+    """Detiene los procesos del pool (si existe)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+def configurar_procesos(procesos: int):
+    """Cambia el número de procesos; el pool se recrea en el siguiente uso"""
+    global OBSIDIAN_PROCESOS
+    cerrar_pool()
+    OBSIDIAN_PROCESOS = procesos
+
+atexit.register(cerrar_pool)
+
+def ejecutar_por_fragmentos(funcion, rutas: List[str], *args) -> list:
+    """
+    Aplica funcion(fragmento, *args) a la lista de rutas y devuelve los
+    resultados parciales en orden.
+    
+    Con OBSIDIAN_PROCESOS > 1 y suficientes notas, la lista se divide en
+    fragmentos que se procesan en el pool; cada proceso lee sus archivos y
+    devuelve solo resultados compactos, nunca el contenido de las notas.
+    """
+    pool = obtener_pool() if len(rutas) >= MIN_NOTAS_PARALELO else None
+    if pool is None:
+        return [funcion(rutas, *args)]
+    
+    num_fragmentos = OBSIDIAN_PROCESOS * FRAGMENTOS_POR_PROCESO
+    tamaño = max(1, -(-len(rutas) // num_fragmentos))
+    futuros = [pool.submit(funcion, rutas[i:i + tamaño], *args) for i in range(0, len(rutas), tamaño)]
+    return [futuro.result() for futuro in futuros]
+
+def recorrer_por_fragmentos(funcion, rutas: List[str], *args, seguimiento: "Seguimiento") -> tuple:
+    """
+    Como ejecutar_por_fragmentos, pero informando del avance tras cada
+    fragmento (o cada NOTAS_POR_TANDA notas en este proceso) y parando en
+    cuanto la llamada se cancela o se agota su plazo.
+    
+    Devuelve (parciales, cubiertas): los resultados de las primeras
+    `cubiertas` rutas, sin huecos, para poder continuar desde ahí.
+    """
+    seguimiento.sumar_total(len(rutas))
+    pool = obtener_pool() if len(rutas) >= MIN_NOTAS_PARALELO else None
+    if pool is None:
+        parciales = []
+        cubiertas = 0
+        while cubiertas < len(rutas) and not seguimiento.detenido:
+            tanda = rutas[cubiertas:cubiertas + NOTAS_POR_TANDA]
+            parciales.append(funcion(tanda, *args))
+            cubiertas += len(tanda)
+            seguimiento.avanzar(len(tanda), parciales[-1])
+        return parciales, cubiertas
+    
+    tamaño = max(1, -(-len(rutas) // (OBSIDIAN_PROCESOS * FRAGMENTOS_POR_PROCESO)))
+    futuros = {pool.submit(funcion, rutas[i:i + tamaño], *args): i for i in range(0, len(rutas), tamaño)}
+    hechos = {}
+    en_curso = set(futuros)
+    # Sin esperar a que acabe un fragmento para ver si la llamada se canceló o se agotó el plazo
+    while en_curso and not seguimiento.detenido:
+        restantes = seguimiento.segundos_restantes()
+        espera = INTERVALO_COMPROBACION_POOL if restantes is None else min(INTERVALO_COMPROBACION_POOL, restantes)
+        terminados, en_curso = wait(en_curso, timeout=espera, return_when=FIRST_COMPLETED)
+        for futuro in terminados:
+            i = futuros[futuro]
+            hechos[i] = futuro.result()
+            seguimiento.avanzar(len(rutas[i:i + tamaño]), hechos[i])
+    # Los fragmentos que aún no empezaron no llegan a ejecutarse; los que están en
+    # marcha terminan en su proceso y su resultado se descarta
+    for pendiente in en_curso:
+        pendiente.cancel()
+    
+    # Solo cuenta lo que se cubrió sin huecos desde el principio
+    parciales = []
+    cubiertas = 0
+    while cubiertas in hechos:
+        parciales.append(hechos[cubiertas])
+        cubiertas = min(len(rutas), cubiertas + tamaño)
+    return parciales, cubiertas
+
+def fragmento_buscar(rutas: List[str], vault_ruta: str, texto_lower: str) -> List[tuple]:
+    """Busca texto en un fragmento de notas: [(ruta_relativa, línea, coincidencia)]"""
+    coincidencias = []
+    for ruta in rutas:
+        try:
+            with open(ruta, 'r', encoding='utf-8') as f:
+                contenido = f.read()
+        except:
+            continue
+        
+        ruta_relativa = os.path.relpath(ruta, vault_ruta)
+        for num_linea, linea in enumerate(contenido.split('\n'), 1):
+            if texto_lower in linea.lower():
+                linea = linea.strip()
+                coincidencias.append((ruta_relativa, num_linea, linea[:100] + "..." if len(linea) > 100 else linea))
+    return coincidencias
+
+def fragmento_estadisticas(rutas: List[str], vault_ruta: str) -> dict:
+    """Agregados de estadisticas_vault para un fragmento de notas"""
+    # Contadores
+    total_palabras = 0
+    total_caracteres = 0
+    carpetas = set()
+    etiquetas = set()
+    enlaces_internos = set()
+    
+    # Análisis por fecha
+    por_fecha = {}
+    
+    for ruta in rutas:
+        # Carpeta
+        carpeta_padre = os.path.relpath(os.path.dirname(ruta), vault_ruta)
+        if carpeta_padre != '.':
+            carpetas.add(carpeta_padre)
+        
+        try:
+            with open(ruta, 'r', encoding='utf-8') as f:
+                contenido = f.read()
+            
+            # Contar palabras y caracteres
+            palabras = len(contenido.split())
+            total_palabras += palabras
+            total_caracteres += len(contenido)
+            
+            # Buscar etiquetas (#tag)
+            tags_encontrados = re.findall(r'#(\w+)', contenido)
+            etiquetas.update(tags_encontrados)
+            
+            # Buscar enlaces internos [[link]]
+            enlaces_encontrados = re.findall(r'\[\[([^\]]+)\]\]', contenido)
+            enlaces_internos.update(enlaces_encontrados)
+            
+            # Fecha de modificación
+            fecha_mod = datetime.fromtimestamp(os.stat(ruta).st_mtime).date()
+            fecha_str = fecha_mod.strftime('%Y-%m')
+            por_fecha[fecha_str] = por_fecha.get(fecha_str, 0) + 1
+            
+        except:
+            continue
+    
+    return {
+        'total_notas': len(rutas),
+        'total_palabras': total_palabras,
+        'total_caracteres': total_caracteres,
+        'carpetas': carpetas,
+        'etiquetas': etiquetas,
+        'enlaces_internos': enlaces_internos,
+        'por_fecha': por_fecha,
+    }
+
+def combinar_estadisticas(parciales: List[dict]) -> dict:
+    """Suma los agregados parciales de fragmento_estadisticas"""
+    total = {
+        'total_notas': 0,
+        'total_palabras': 0,
+        'total_caracteres': 0,
+        'carpetas': set(),
+        'etiquetas': set(),
+        'enlaces_internos': set(),
+        'por_fecha': {},
+    }
+    for parcial in parciales:
+        for clave in ('total_notas', 'total_palabras', 'total_caracteres'):
+            total[clave] += parcial[clave]
+        for clave in ('carpetas', 'etiquetas', 'enlaces_internos'):
+            total[clave].update(parcial[clave])
+        for fecha_str, n in parcial['por_fecha'].items():
+            total['por_fecha'][fecha_str] = total['por_fecha'].get(fecha_str, 0) + n
+    return total
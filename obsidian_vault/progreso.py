@@ -0,0 +1,185 @@
+"""
+Progreso, plazos y cancelación de los recorridos largos, y cursores para
+continuar una respuesta parcial
+"""
+
+import asyncio
+import bisect
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import quote, unquote
+
+from fastmcp import Context
+
+from obsidian_vault.vaults import obtener_vault, Vault, vaults_objetivo
+
+# Notas por tanda al recorrer el vault en este proceso: entre tandas se
+# informa del avance y se comprueba si la llamada se canceló
+NOTAS_POR_TANDA = 64
+
+# Cada cuánto se envía una notificación de progreso como mucho
+INTERVALO_PROGRESO_SEGUNDOS = 0.25
+
+# Primeras coincidencias que se adelantan al cliente antes de la respuesta final
+MAX_PARCIALES_EMITIDOS = 10
+
+# Plazo por defecto (segundos) de las herramientas que recorren el vault (0 = sin plazo)
+OBSIDIAN_PLAZO_SEGUNDOS = float(os.environ.get("OBSIDIAN_PLAZO_SEGUNDOS", 0))
+
+class Seguimiento:
+    """
+    Avance de un recorrido largo, compartido entre la herramienta async y
+    los hilos que recorren los vaults. Los fragmentos que devuelven listas
+    de coincidencias las publican como resultados parciales.
+    
+    Con `plazo` (segundos), los recorridos se detienen al agotarlo y
+    devuelven lo que llevan; los bucles lo comprueban con `detenido`, que
+    solo cuesta una lectura del reloj.
+    """
+    
+    def __init__(self, plazo: float = 0):
+        self.total = 0
+        self.hechos = 0
+        self.cancelado = False
+        self.plazo = plazo
+        self.limite = time.monotonic() + plazo if plazo > 0 else None
+        self.agotado = False
+        self.parciales: list = []
+        self.al_encontrar = None
+        self._lock = threading.Lock()
+    
+    @property
+    def detenido(self) -> bool:
+        if self.limite is not None and not self.agotado and time.monotonic() >= self.limite:
+            self.agotado = True
+        return self.cancelado or self.agotado
+    
+    def segundos_restantes(self) -> Optional[float]:
+        return max(0.0, self.limite - time.monotonic()) if self.limite is not None else None
+    
+    def sumar_total(self, notas: int):
+        with self._lock:
+            self.total += notas
+    
+    def avanzar(self, notas: int, parcial=None):
+        with self._lock:
+            self.hechos += notas
+            nuevos = isinstance(parcial, list) and parcial and len(self.parciales) < MAX_PARCIALES_EMITIDOS
+            if nuevos:
+                self.parciales.extend(parcial[:MAX_PARCIALES_EMITIDOS - len(self.parciales)])
+        if nuevos and self.al_encontrar is not None:
+            self.al_encontrar()
+    
+    def cancelar(self):
+        self.cancelado = True
+
+async def con_progreso(ctx: Optional[Context], seguimiento: Seguimiento, corrutina, describir_parcial=None):
+    """
+    Espera a `corrutina` enviando al cliente notificaciones de progreso
+    (notas procesadas / total) y, con `describir_parcial`, las primeras
+    coincidencias en cuanto aparecen. Si el cliente cancela la llamada, el
+    recorrido se detiene en la siguiente tanda.
+    """
+    loop = asyncio.get_running_loop()
+    novedad = asyncio.Event()
+    seguimiento.al_encontrar = lambda: loop.call_soon_threadsafe(novedad.set)
+    tarea = asyncio.ensure_future(corrutina)
+    emitidos = 0
+    try:
+        while True:
+            espera = asyncio.ensure_future(novedad.wait())
+            await asyncio.wait({tarea, espera}, timeout=INTERVALO_PROGRESO_SEGUNDOS, return_when=asyncio.FIRST_COMPLETED)
+            espera.cancel()
+            novedad.clear()
+            if ctx is not None:
+                if describir_parcial is not None:
+                    for parcial in seguimiento.parciales[emitidos:]:
+                        await ctx.info(describir_parcial(parcial))
+                        emitidos += 1
+                if seguimiento.total:
+                    await ctx.report_progress(seguimiento.hechos, seguimiento.total)
+            if tarea.done():
+                return tarea.result()
+    except asyncio.CancelledError:
+        seguimiento.cancelar()
+        tarea.cancel()
+        raise
+
+def recorrer_con_plazo(elementos: list, seguimiento: Seguimiento):
+    """Recorre los elementos hasta que la llamada se cancele o agote su plazo"""
+    seguimiento.sumar_total(len(elementos))
+    for elemento in elementos:
+        if seguimiento.detenido:
+            return
+        yield elemento
+        seguimiento.avanzar(1)
+
+def crear_seguimiento(plazo_segundos: float = 0) -> Seguimiento:
+    """Seguimiento con el plazo de la llamada o, si es 0, el del servidor"""
+    return Seguimiento(plazo_segundos if plazo_segundos > 0 else OBSIDIAN_PLAZO_SEGUNDOS)
+
+class CursorNoValido(ValueError):
+    pass
+
+def leer_cursor(continuar: str) -> Dict[str, str]:
+    """
+    'uno@Diario%2F2024-01-01.md,dos@' -> {'uno': 'Diario/2024-01-01.md', 'dos': ''}:
+    la última nota que cubrió la respuesta parcial en cada vault ('' = ninguna)
+    """
+    posiciones = {}
+    for parte in continuar.split(","):
+        if not parte.strip():
+            continue
+        nombre, separador, ultima = parte.strip().rpartition("@")
+        ultima = unquote(ultima)
+        if not separador or not nombre or (ultima and not ultima.endswith(".md")):
+            raise CursorNoValido(f"Cursor no válido: '{parte}' (usa el valor de 'continuar' de la respuesta parcial)")
+        posiciones[nombre] = ultima
+    return posiciones
+
+def vaults_a_recorrer(vault: str, continuar: str) -> List[tuple]:
+    """[(vault, última nota cubierta)]; con cursor, solo los vaults que quedaron a medias"""
+    posiciones = leer_cursor(continuar)
+    if not posiciones:
+        return [(v, "") for v in vaults_objetivo(vault)]
+    return [(obtener_vault(nombre), ultima) for nombre, ultima in posiciones.items()]
+
+def rutas_tras(rutas: List[str], ultima: str) -> List[str]:
+    """
+    Las rutas relativas (ordenadas) posteriores a la última nota cubierta.
+    
+    El cursor guarda una ruta y no una posición, así que se puede continuar
+    aunque entre llamadas se creen o borren notas o la lista cambie de origen
+    (del recorrido del vault a los candidatos del índice, o al revés).
+    """
+    return rutas[bisect.bisect_right(rutas, ultima):] if ultima else rutas
+
+def notas_tras(v: "Vault", ultima: str, carpeta: str = "", recursivo: bool = True) -> List[Path]:
+    """Notas del vault ordenadas por ruta relativa, a partir de la siguiente a `ultima`"""
+    por_ruta = {str(archivo.relative_to(v.ruta)): archivo for archivo in v.archivos(carpeta, recursivo=recursivo)}
+    return [por_ruta[ruta] for ruta in rutas_tras(sorted(por_ruta), ultima)]
+
+def ultima_cubierta(v: "Vault", archivos: List[Path], cubiertas: int, ultima: str) -> Optional[str]:
+    """Cursor de un vault tras cubrir las primeras `cubiertas` notas, o None si se cubrieron todas"""
+    if cubiertas >= len(archivos):
+        return None
+    return str(archivos[cubiertas - 1].relative_to(v.ruta)) if cubiertas else ultima
+
+def aviso_parcial(seguimiento: Seguimiento, pendientes: List[tuple], continuable: bool = True) -> str:
+    """
+    Explica que la respuesta es parcial, cuánto se cubrió y cómo seguir.
+    `pendientes` es [(vault, última nota cubierta)].
+    """
+    if not pendientes:
+        return ""
+    motivo = "la llamada se canceló" if seguimiento.cancelado else f"se agotó el plazo de {seguimiento.plazo:g}s"
+    aviso = f"⚠️ Resultado parcial: {motivo} tras revisar {seguimiento.hechos} de {seguimiento.total} notas.\n"
+    if continuable:
+        cursor = ",".join(f"{v.nombre}@{quote(ultima, safe='/')}" for v, ultima in pendientes)
+        aviso += f"▶️ Para continuar, repite la llamada con continuar=\"{cursor}\"\n"
+    else:
+        aviso += "▶️ Repite la llamada con un plazo_segundos mayor o cuando el índice esté listo (estado_indices)\n"
+    return aviso
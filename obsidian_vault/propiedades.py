@@ -0,0 +1,194 @@
+"""
+Propiedades del frontmatter: lectura, tipado, columnas indexadas y filtros
+al estilo Dataview
+"""
+
+import os
+import re
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Set
+
+# Propiedades del frontmatter que se indexan ("*" = todas)
+PROPIEDADES_INDEXADAS = [
+    p.strip().lower()
+    for p in os.environ.get("OBSIDIAN_PROPIEDADES", "status,project,due,tags,created,type,priority,aliases,area").split(",")
+    if p.strip()
+]
+
+PATRON_FECHA = re.compile(r'\d{4}-\d{2}-\d{2}$')
+PATRON_FECHA_HORA = re.compile(r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}')
+PATRON_NUMERO = re.compile(r'-?\d+(\.\d+)?$')
+
+def _tipar_valor(texto: str):
+    """Convierte un valor de YAML simple a bool, número, fecha o texto"""
+    texto = texto.strip()
+    if len(texto) >= 2 and texto[0] == texto[-1] and texto[0] in "'\"":
+        return texto[1:-1]
+    minusculas = texto.lower()
+    if minusculas in ("true", "yes"):
+        return True
+    if minusculas in ("false", "no"):
+        return False
+    if PATRON_NUMERO.match(texto):
+        return float(texto) if "." in texto else int(texto)
+    try:
+        if PATRON_FECHA.match(texto):
+            return date.fromisoformat(texto)
+        if PATRON_FECHA_HORA.match(texto):
+            return datetime.fromisoformat(texto)
+    except ValueError:
+        pass
+    return texto
+
+def _tipar_lista(texto: str) -> tuple:
+    """'[a, "b"]' -> ('a', 'b')"""
+    return tuple(_tipar_valor(v) for v in texto.strip()[1:-1].split(",") if v.strip())
+
+def parsear_frontmatter(contenido: str) -> Dict[str, object]:
+    """
+    Lee el frontmatter YAML de una nota (subconjunto habitual en Obsidian:
+    `clave: valor`, listas `[a, b]` y listas con guiones). Las claves se
+    devuelven en minúsculas.
+    """
+    if not contenido.startswith("---"):
+        return {}
+    fin = contenido.find("\n---", 3)
+    if fin == -1:
+        return {}
+    
+    propiedades: Dict[str, object] = {}
+    clave_lista = None
+    for linea in contenido[3:fin].split("\n"):
+        if not linea.strip() or linea.lstrip().startswith("#"):
+            continue
+        if clave_lista and linea.lstrip().startswith("- "):
+            propiedades[clave_lista] += (_tipar_valor(linea.lstrip()[2:]),)
+            continue
+        clave, separador, valor = linea.partition(":")
+        if not separador or linea[0].isspace():
+            continue
+        clave = clave.strip().lower()
+        valor = valor.strip()
+        clave_lista = None
+        if not valor:
+            # Lista con guiones en las líneas siguientes
+            propiedades[clave] = ()
+            clave_lista = clave
+        elif valor.startswith("[") and valor.endswith("]"):
+            propiedades[clave] = _tipar_lista(valor)
+        else:
+            propiedades[clave] = _tipar_valor(valor)
+    return propiedades
+
+def propiedades_indexables(contenido: str) -> Dict[str, object]:
+    propiedades = parsear_frontmatter(contenido)
+    if "*" in PROPIEDADES_INDEXADAS:
+        return propiedades
+    return {k: v for k, v in propiedades.items() if k in PROPIEDADES_INDEXADAS}
+
+def clave_orden(valor) -> tuple:
+    """Clave para ordenar y comparar valores de tipos distintos"""
+    if valor is None:
+        return (9, "")
+    if isinstance(valor, bool):
+        return (0, valor)
+    if isinstance(valor, (int, float)):
+        return (1, valor)
+    if isinstance(valor, datetime):
+        return (2, valor)
+    if isinstance(valor, date):
+        return (2, datetime(valor.year, valor.month, valor.day))
+    if isinstance(valor, tuple):
+        return (4, tuple(str(v).lower() for v in valor))
+    return (3, str(valor).lower())
+
+def valor_mostrado(valor) -> str:
+    if isinstance(valor, tuple):
+        return ", ".join(str(v) for v in valor)
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor)
+
+class ColumnaPropiedad:
+    """
+    Índice columnar de una propiedad: valor tipado por nota, más un índice
+    inverso valor -> notas para los filtros de igualdad. En las listas
+    (ej: tags) cada elemento se indexa por separado.
+    """
+    
+    def __init__(self):
+        self.valores: Dict[str, object] = {}
+        self.por_valor: Dict[object, Set[str]] = {}
+    
+    @staticmethod
+    def _claves(valor) -> tuple:
+        elementos = valor if isinstance(valor, tuple) else (valor,)
+        return tuple(clave_orden(e) for e in elementos)
+    
+    def añadir(self, ruta: str, valor):
+        self.valores[ruta] = valor
+        for clave in self._claves(valor):
+            self.por_valor.setdefault(clave, set()).add(ruta)
+    
+    def quitar(self, ruta: str):
+        valor = self.valores.pop(ruta, None)
+        if valor is None:
+            return
+        for clave in self._claves(valor):
+            rutas = self.por_valor.get(clave)
+            if rutas is not None:
+                rutas.discard(ruta)
+                if not rutas:
+                    del self.por_valor[clave]
+    
+    def iguales(self, valor) -> Set[str]:
+        return self.por_valor.get(clave_orden(valor), set())
+
+# Operadores de consultar_notas, de más largo a más corto para el parseo
+OPERADORES = {
+    "!=": lambda a, b: not _coincide(a, b),
+    ">=": lambda a, b: clave_orden(a) >= clave_orden(b),
+    "<=": lambda a, b: clave_orden(a) <= clave_orden(b),
+    "=": lambda a, b: _coincide(a, b),
+    ">": lambda a, b: clave_orden(a) > clave_orden(b),
+    "<": lambda a, b: clave_orden(a) < clave_orden(b),
+    "~": lambda a, b: str(b).lower() in valor_mostrado(a).lower(),
+}
+
+def _coincide(valor, buscado) -> bool:
+    """Igualdad; en las listas basta con que un elemento coincida"""
+    elementos = valor if isinstance(valor, tuple) else (valor,)
+    return any(clave_orden(e) == clave_orden(buscado) for e in elementos)
+
+def cumple(valor, operador: str, buscado) -> bool:
+    """Una nota sin la propiedad solo cumple los filtros '!='"""
+    if valor is None:
+        return operador == "!="
+    return OPERADORES[operador](valor, buscado)
+
+# Campos que no salen del frontmatter sino de la ruta de la nota
+CAMPOS_DE_ARCHIVO = ("ruta", "nombre", "carpeta")
+
+def campo_de_archivo(campo: str, ruta_relativa: str) -> str:
+    if campo == "nombre":
+        return Path(ruta_relativa).stem
+    if campo == "carpeta":
+        return os.path.dirname(ruta_relativa)
+    return ruta_relativa
+
+def parsear_filtros(filtros: str) -> List[tuple]:
+    """'status=open, due<2024-06-01' -> [('status', '=', 'open'), ('due', '<', date(...))]"""
+    condiciones = []
+    for parte in re.split(r",|\s+and\s+", filtros, flags=re.IGNORECASE):
+        parte = parte.strip()
+        if not parte:
+            continue
+        for operador in OPERADORES:
+            campo, separador, valor = parte.partition(operador)
+            if separador:
+                condiciones.append((campo.strip().lower(), operador, _tipar_valor(valor)))
+                break
+        else:
+            raise ValueError(f"Filtro no válido: '{parte}' (usa campo=valor, !=, <, <=, >, >= o ~)")
+    return condiciones
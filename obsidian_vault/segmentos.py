@@ -0,0 +1,436 @@
+"""
+Índice de términos: entero en RAM o en segmentos inmutables en disco,
+mapeados en memoria y fusionados en segundo plano (al estilo LSM)
+"""
+
+import bisect
+import hashlib
+import heapq
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, List, Set
+
+# Directorio para guardar el índice de términos en segmentos en disco
+# (vacío = índice de términos completo en RAM)
+OBSIDIAN_INDICE_EN_DISCO = os.environ.get("OBSIDIAN_INDICE_EN_DISCO", "")
+
+# Notas que acumula el segmento en memoria antes de volcarse a disco
+NOTAS_POR_SEGMENTO = int(os.environ.get("OBSIDIAN_NOTAS_POR_SEGMENTO", 2000))
+
+# Segundos como mucho que una nota cambiada espera en memoria antes del volcado
+OBSIDIAN_VOLCADO_SEGUNDOS = float(os.environ.get("OBSIDIAN_VOLCADO_SEGUNDOS", 30))
+
+# Con más segmentos que estos se fusionan en segundo plano
+MAX_SEGMENTOS = int(os.environ.get("OBSIDIAN_MAX_SEGMENTOS", 8))
+
+# magia, notas, términos, desplazamientos de: rutas, índice de rutas, términos, índice de términos, entradas
+CABECERA_SEGMENTO = struct.Struct('<8sIIQQQQQ')
+MAGIA_SEGMENTO = b"OBSSEG01"
+
+# Por término: desplazamiento y longitud de su lista de notas, y número de notas
+ENTRADA_TERMINO = struct.Struct('<QII')
+
+def _codificar_postings(ids: List[int], salida: bytearray):
+    """Añade a `salida` los ids (ordenados) como diferencias en varint"""
+    anterior = 0
+    for id_nota in ids:
+        delta = id_nota - anterior
+        anterior = id_nota
+        while delta >= 0x80:
+            salida.append((delta & 0x7F) | 0x80)
+            delta >>= 7
+        salida.append(delta)
+
+def _decodificar_postings(datos) -> List[int]:
+    ids = []
+    actual = valor = desplazamiento = 0
+    for byte in datos:
+        valor |= (byte & 0x7F) << desplazamiento
+        if byte & 0x80:
+            desplazamiento += 7
+        else:
+            actual += valor
+            ids.append(actual)
+            valor = desplazamiento = 0
+    return ids
+
+def _alinear(f):
+    """Rellena el archivo hasta múltiplo de 8 para poder ver los arrays como 'Q'"""
+    f.write(b"\0" * (-f.tell() % 8))
+
+def escribir_segmento(ruta: Path, rutas_notas: List[str], terminos):
+    """
+    Escribe un segmento inmutable. `terminos` es un iterable de
+    (término, ids ordenados) en orden de término; las listas de notas se
+    escriben a medida que llegan, así que solo el diccionario de términos
+    se acumula en memoria.
+    """
+    temporal = ruta.with_suffix(".tmp")
+    with open(temporal, "wb") as f:
+        f.write(b"\0" * CABECERA_SEGMENTO.size)
+        
+        bloque_terminos = bytearray(b"\n")
+        inicios_terminos = array('Q')
+        entradas = bytearray()
+        postings = bytearray()
+        for termino, ids in terminos:
+            inicios_terminos.append(len(bloque_terminos))
+            bloque_terminos += termino.encode("utf-8") + b"\n"
+            postings.clear()
+            _codificar_postings(ids, postings)
+            entradas += ENTRADA_TERMINO.pack(f.tell(), len(postings), len(ids))
+            f.write(postings)
+        inicios_terminos.append(len(bloque_terminos))
+        
+        inicio_rutas = f.tell()
+        inicios_rutas = array('Q')
+        for ruta_nota in rutas_notas:
+            inicios_rutas.append(f.tell() - inicio_rutas)
+            f.write(ruta_nota.encode("utf-8"))
+        inicios_rutas.append(f.tell() - inicio_rutas)
+        _alinear(f)
+        indice_rutas = f.tell()
+        f.write(inicios_rutas.tobytes())
+        
+        inicio_bloque = f.tell()
+        f.write(bloque_terminos)
+        _alinear(f)
+        indice_terminos = f.tell()
+        f.write(inicios_terminos.tobytes())
+        inicio_entradas = f.tell()
+        f.write(entradas)
+        
+        f.seek(0)
+        f.write(CABECERA_SEGMENTO.pack(
+            MAGIA_SEGMENTO, len(rutas_notas), len(inicios_terminos) - 1,
+            inicio_rutas, indice_rutas, inicio_bloque, indice_terminos, inicio_entradas,
+        ))
+    os.replace(temporal, ruta)
+
+class SegmentoEnDisco:
+    """
+    Segmento inmutable del índice de términos, mapeado en memoria.
+    
+    Guarda las rutas de sus notas, el diccionario de términos ordenado
+    (un bloque de texto separado por saltos de línea, donde las búsquedas
+    por subcadena son un `find` sobre el mmap) y las listas de notas de
+    cada término codificadas como diferencias en varint. Las consultas leen
+    directamente del mmap sin copiar el segmento a memoria.
+    """
+    
+    def __init__(self, id_segmento: int, ruta: Path):
+        self.id = id_segmento
+        self.ruta = ruta
+        with open(ruta, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._vista = memoryview(self._mm)
+        (magia, self.num_notas, self.num_terminos, self._inicio_rutas, indice_rutas,
+         self._inicio_bloque, indice_terminos, self._inicio_entradas) = CABECERA_SEGMENTO.unpack_from(self._mm)
+        if magia != MAGIA_SEGMENTO:
+            raise ValueError(f"{ruta} no es un segmento del índice")
+        self._inicios_rutas = self._vista[indice_rutas:indice_rutas + 8 * (self.num_notas + 1)].cast('Q')
+        self._inicios_terminos = self._vista[indice_terminos:indice_terminos + 8 * (self.num_terminos + 1)].cast('Q')
+        self._fin_bloque = self._inicio_bloque + self._inicios_terminos[-1]
+        # Notas del segmento que siguen vigentes (1) o fueron reemplazadas o borradas (0)
+        self.vivas = bytearray(b"\1" * self.num_notas)
+        self.muertas = 0
+    
+    @property
+    def bytes(self) -> int:
+        return len(self._mm)
+    
+    def ruta_nota(self, id_nota: int) -> str:
+        inicio = self._inicio_rutas + self._inicios_rutas[id_nota]
+        fin = self._inicio_rutas + self._inicios_rutas[id_nota + 1]
+        return str(self._vista[inicio:fin], "utf-8")
+    
+    def marcar_muerta(self, id_nota: int):
+        if self.vivas[id_nota]:
+            self.vivas[id_nota] = 0
+            self.muertas += 1
+    
+    def termino(self, i: int) -> str:
+        inicio = self._inicio_bloque + self._inicios_terminos[i]
+        fin = self._inicio_bloque + self._inicios_terminos[i + 1] - 1
+        return str(self._vista[inicio:fin], "utf-8")
+    
+    def postings(self, i: int) -> List[int]:
+        desplazamiento, longitud, _ = ENTRADA_TERMINO.unpack_from(self._mm, self._inicio_entradas + i * ENTRADA_TERMINO.size)
+        return _decodificar_postings(self._vista[desplazamiento:desplazamiento + longitud])
+    
+    def buscar(self, subcadena: str) -> Set[int]:
+        """Ids de las notas vivas con algún término que contiene la subcadena"""
+        aguja = subcadena.encode("utf-8")
+        ids: Set[int] = set()
+        posicion = self._mm.find(aguja, self._inicio_bloque, self._fin_bloque)
+        while posicion != -1:
+            i = bisect.bisect_right(self._inicios_terminos, posicion - self._inicio_bloque) - 1
+            ids.update(self.postings(i))
+            # Saltar al siguiente término: cada término cuenta una sola vez
+            posicion = self._mm.find(aguja, self._inicio_bloque + self._inicios_terminos[i + 1], self._fin_bloque)
+        return {i for i in ids if self.vivas[i]}
+    
+    def terminos(self):
+        """(término, ids) de todo el segmento, en orden de término"""
+        for i in range(self.num_terminos):
+            yield self.termino(i), self.postings(i)
+    
+    def cerrar(self):
+        self._inicios_rutas.release()
+        self._inicios_terminos.release()
+        self._vista.release()
+        self._mm.close()
+
+class TerminosEnMemoria:
+    """Índice invertido término -> notas, entero en RAM (modo por defecto)"""
+    
+    # Las entradas del índice conservan sus términos para poder desindexarlas
+    guarda_terminos = True
+    
+    def __init__(self):
+        self.postings: Dict[str, Set[str]] = {}
+    
+    def __len__(self) -> int:
+        return len(self.postings)
+    
+    def añadir(self, ruta_relativa: str, terminos: frozenset):
+        for termino in terminos:
+            self.postings.setdefault(termino, set()).add(ruta_relativa)
+    
+    def quitar(self, ruta_relativa: str, terminos: frozenset):
+        for termino in terminos:
+            rutas = self.postings.get(termino)
+            if rutas is not None:
+                rutas.discard(ruta_relativa)
+                if not rutas:
+                    del self.postings[termino]
+    
+    def buscar(self, subcadena: str) -> Set[str]:
+        """Notas con algún término que contiene la subcadena (ej: "medit")"""
+        rutas = set()
+        for termino, rutas_termino in self.postings.items():
+            if subcadena in termino:
+                rutas |= rutas_termino
+        return rutas
+    
+    def volcar(self, forzar: bool = False):
+        pass
+    
+    def describir(self) -> str:
+        return f"{len(self.postings)} términos"
+    
+    def cerrar(self):
+        pass
+
+def _proceso_vivo(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _borrar_directorios_huerfanos(directorio: Path):
+    """Borra los directorios de segmentos ("<pid>-...") de procesos que ya no existen"""
+    for entrada in directorio.iterdir():
+        pid = entrada.name.partition("-")[0]
+        if entrada.is_dir() and pid.isdigit() and not _proceso_vivo(int(pid)):
+            shutil.rmtree(entrada, ignore_errors=True)
+
+class TerminosSegmentados:
+    """
+    Índice de términos al estilo LSM para vaults que no caben en RAM.
+    
+    Las notas nuevas o cambiadas van a un segmento pequeño en memoria que
+    se vuelca a un SegmentoEnDisco al llegar a NOTAS_POR_SEGMENTO notas o
+    tras OBSIDIAN_VOLCADO_SEGUNDOS. Cuando hay más de MAX_SEGMENTOS, un hilo
+    los fusiona en uno solo descartando las notas borradas o reemplazadas.
+    En RAM solo quedan el segmento en memoria y, por nota, en qué segmento
+    está su versión vigente.
+    """
+    
+    guarda_terminos = False
+    
+    def __init__(self, directorio_vault: Path):
+        directorio_vault.mkdir(parents=True, exist_ok=True)
+        _borrar_directorios_huerfanos(directorio_vault)
+        # Cada instancia escribe en su propio subdirectorio: otro servidor sobre el
+        # mismo vault (o un índice anterior de este proceso) tiene sus segmentos mapeados
+        self.directorio = Path(tempfile.mkdtemp(prefix=f"{os.getpid()}-", dir=directorio_vault))
+        
+        self.memoria: Dict[str, Set[str]] = {}
+        self.terminos_memoria: Dict[str, frozenset] = {}
+        self.segmentos: Dict[int, SegmentoEnDisco] = {}
+        # Ruta -> (id de segmento << 32) | id de la nota dentro del segmento
+        self.vigentes: Dict[str, int] = {}
+        self._siguiente_id = 1
+        self._ultimo_volcado = time.monotonic()
+        self._fusionando = False
+        self._cerrado = False
+        self._lock = threading.RLock()
+    
+    def __len__(self) -> int:
+        return len(self.memoria) + sum(s.num_terminos for s in self.segmentos.values())
+    
+    def _retirar(self, ruta_relativa: str):
+        """Deja sin efecto la versión anterior de una nota, esté donde esté"""
+        terminos = self.terminos_memoria.pop(ruta_relativa, None)
+        if terminos is not None:
+            for termino in terminos:
+                rutas = self.memoria.get(termino)
+                if rutas is not None:
+                    rutas.discard(ruta_relativa)
+                    if not rutas:
+                        del self.memoria[termino]
+        vigente = self.vigentes.pop(ruta_relativa, None)
+        if vigente is not None:
+            segmento = self.segmentos.get(vigente >> 32)
+            if segmento is not None:
+                segmento.marcar_muerta(vigente & 0xFFFFFFFF)
+    
+    def añadir(self, ruta_relativa: str, terminos: frozenset):
+        with self._lock:
+            self._retirar(ruta_relativa)
+            self.terminos_memoria[ruta_relativa] = terminos
+            for termino in terminos:
+                self.memoria.setdefault(termino, set()).add(ruta_relativa)
+            if len(self.terminos_memoria) >= NOTAS_POR_SEGMENTO:
+                self.volcar(forzar=True)
+    
+    def quitar(self, ruta_relativa: str, terminos: frozenset):
+        with self._lock:
+            self._retirar(ruta_relativa)
+    
+    def buscar(self, subcadena: str) -> Set[str]:
+        with self._lock:
+            rutas = set()
+            for termino, rutas_termino in self.memoria.items():
+                if subcadena in termino:
+                    rutas |= rutas_termino
+            segmentos = list(self.segmentos.values())
+        for segmento in segmentos:
+            rutas.update(segmento.ruta_nota(i) for i in segmento.buscar(subcadena))
+        return rutas
+    
+    def _nuevo_archivo(self) -> tuple:
+        id_segmento = self._siguiente_id
+        self._siguiente_id += 1
+        return id_segmento, self.directorio / f"{id_segmento:08d}.seg"
+    
+    def volcar(self, forzar: bool = False):
+        """Escribe el segmento en memoria a disco si está lleno o lleva tiempo esperando"""
+        with self._lock:
+            if self._cerrado or not self.terminos_memoria:
+                return
+            if not forzar and time.monotonic() - self._ultimo_volcado < OBSIDIAN_VOLCADO_SEGUNDOS:
+                return
+            rutas_notas = sorted(self.terminos_memoria)
+            ids = {ruta: i for i, ruta in enumerate(rutas_notas)}
+            terminos = ((t, sorted(ids[r] for r in self.memoria[t])) for t in sorted(self.memoria))
+            id_segmento, archivo = self._nuevo_archivo()
+            escribir_segmento(archivo, rutas_notas, terminos)
+            self.segmentos[id_segmento] = SegmentoEnDisco(id_segmento, archivo)
+            for ruta, i in ids.items():
+                self.vigentes[ruta] = (id_segmento << 32) | i
+            self.memoria = {}
+            self.terminos_memoria = {}
+            self._ultimo_volcado = time.monotonic()
+            
+            if len(self.segmentos) > MAX_SEGMENTOS and not self._fusionando:
+                self._fusionando = True
+                threading.Thread(target=self.fusionar, name=f"fusion-{self.directorio.name}", daemon=True).start()
+    
+    def fusionar(self):
+        """Fusiona los segmentos actuales en uno, sin las notas muertas"""
+        try:
+            with self._lock:
+                origen = list(self.segmentos.values())
+                # Qué notas de cada segmento pasan al nuevo y con qué id
+                vivas = sorted(
+                    (s.ruta_nota(i), s.id, i)
+                    for s in origen for i in range(s.num_notas) if s.vivas[i]
+                )
+                nuevos_ids = {(id_segmento, i): nuevo for nuevo, (_, id_segmento, i) in enumerate(vivas)}
+                id_segmento, archivo = self._nuevo_archivo()
+            
+            def terminos_de(segmento):
+                for termino, ids in segmento.terminos():
+                    yield termino, segmento.id, ids
+            
+            def terminos_fusionados():
+                fuentes = [terminos_de(s) for s in origen]
+                termino_actual, ids_actuales = None, []
+                for termino, id_origen, ids in heapq.merge(*fuentes, key=lambda x: x[0]):
+                    if termino != termino_actual:
+                        if ids_actuales:
+                            yield termino_actual, sorted(ids_actuales)
+                        termino_actual, ids_actuales = termino, []
+                    ids_actuales.extend(nuevos_ids[(id_origen, i)] for i in ids if (id_origen, i) in nuevos_ids)
+                if ids_actuales:
+                    yield termino_actual, sorted(ids_actuales)
+            
+            # La escritura no bloquea las consultas ni las escrituras
+            escribir_segmento(archivo, [ruta for ruta, _, _ in vivas], terminos_fusionados())
+            fusionado = SegmentoEnDisco(id_segmento, archivo)
+            
+            with self._lock:
+                if self._cerrado:
+                    fusionado.cerrar()
+                    archivo.unlink()
+                    self._borrar_directorio()
+                    return
+                for nuevo, (ruta, id_origen, i) in enumerate(vivas):
+                    # Lo que murió mientras se escribía el segmento fusionado, sigue muerto
+                    if self.vigentes.get(ruta) == (id_origen << 32) | i:
+                        self.vigentes[ruta] = (id_segmento << 32) | nuevo
+                    else:
+                        fusionado.marcar_muerta(nuevo)
+                for segmento in origen:
+                    del self.segmentos[segmento.id]
+                    # Las consultas en curso pueden seguir usando el mmap; el
+                    # archivo desaparece del disco cuando deja de estar mapeado
+                    segmento.ruta.unlink()
+                self.segmentos[id_segmento] = fusionado
+        finally:
+            self._fusionando = False
+    
+    def describir(self) -> str:
+        with self._lock:
+            en_disco = sum(s.bytes for s in self.segmentos.values())
+            return (f"{len(self.segmentos)} segmentos en disco ({en_disco / 1024 / 1024:.1f}MB) + "
+                    f"{len(self.terminos_memoria)} notas en memoria")
+    
+    def _borrar_directorio(self):
+        try:
+            self.directorio.rmdir()
+        except OSError:
+            # Aún hay una fusión escribiendo: la borra ella al terminar
+            pass
+    
+    def cerrar(self):
+        with self._lock:
+            self._cerrado = True
+            for segmento in self.segmentos.values():
+                try:
+                    segmento.cerrar()
+                except BufferError:
+                    # Una consulta en curso aún lee del mmap; se libera cuando termine
+                    pass
+                segmento.ruta.unlink(missing_ok=True)
+            self.segmentos = {}
+            self._borrar_directorio()
+
+def crear_indice_terminos(ruta_vault: Path):
+    """Índice de términos en RAM o en segmentos en disco según OBSIDIAN_INDICE_EN_DISCO"""
+    if not OBSIDIAN_INDICE_EN_DISCO:
+        return TerminosEnMemoria()
+    huella = hashlib.blake2b(str(ruta_vault.resolve()).encode("utf-8"), digest_size=4).hexdigest()
+    return TerminosSegmentados(Path(OBSIDIAN_INDICE_EN_DISCO).expanduser() / f"{ruta_vault.name}-{huella}")
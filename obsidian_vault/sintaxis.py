@@ -0,0 +1,23 @@
+"""
+Patrones de la sintaxis de Obsidian que se indexan: etiquetas, enlaces,
+embebidos y términos
+"""
+
+import re
+from pathlib import Path
+
+PATRON_ETIQUETA = re.compile(r'#(\w+)')
+PATRON_ENLACE = re.compile(r'\[\[([^\]]+)\]\]')
+PATRON_TERMINO = re.compile(r'\w+')
+# ![[imagen.png]], ![[doc.pdf#page=3]], ![[imagen.png|300]] -> destino sin sufijos
+PATRON_EMBEBIDO = re.compile(r'!\[\[([^\]|#^]+)')
+
+def destino_enlace(enlace: str) -> str:
+    """Nota a la que apunta un enlace [[...]], sin alias, encabezado ni .md y en minúsculas"""
+    destino = enlace.split("|", 1)[0].split("#", 1)[0].strip().lower()
+    return destino[:-3] if destino.endswith(".md") else destino
+
+def claves_de_nota(ruta_relativa: str) -> tuple:
+    """(clave por ruta, clave por nombre) con las que los enlaces pueden apuntar a una nota"""
+    ruta = Path(ruta_relativa).with_suffix("").as_posix().lower()
+    return ruta, ruta.rsplit("/", 1)[-1]
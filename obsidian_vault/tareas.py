@@ -0,0 +1,117 @@
+"""
+Tareas (- [ ] ...) de las notas, con sus fechas y estados al estilo
+del plugin Tasks
+"""
+
+import re
+from datetime import date
+from typing import List, Optional
+
+from obsidian_vault.sintaxis import PATRON_ETIQUETA
+
+# - [ ] tarea, * [x] tarea, 1. [ ] tarea (también dentro de citas "> ")
+PATRON_TAREA = re.compile(r'^([ \t>]*(?:[-*+]|\d+[.)])[ \t]+\[)(.)(\][ \t]+)(.*?)[ \t\r]*$', re.M)
+# Fechas al estilo del plugin Tasks: 📅 vencimiento, ⏳ programada, ✅ hecha
+PATRON_FECHA_TAREA = re.compile(r'(📅|⏳|✅)\ufe0f?[ \t]*(\d{4}-\d{2}-\d{2})')
+PATRON_VALLA_CODIGO = re.compile(r'^[ \t>]*(?:```|~~~)', re.M)
+# Comprobación rápida: la mayoría de notas no tienen ninguna casilla "[.] "
+PATRON_CASILLA = re.compile(r'\[[^\[\]\n]\][ \t]')
+
+# Marca de la casilla -> estado; cualquier otra marca cuenta como abierta
+ESTADOS_TAREA = {" ": "pendiente", "/": "en curso", "x": "hecha", "X": "hecha", "-": "cancelada"}
+MARCAS_CERRADAS = "xX-"
+
+class Tarea:
+    """Una casilla de tarea de una nota con sus etiquetas y fechas"""
+    __slots__ = ('linea', 'marca', 'texto', 'etiquetas', 'vence', 'programada', 'hecha')
+    
+    def __init__(self, linea: int, marca: str, texto: str):
+        self.linea = linea
+        self.marca = marca
+        self.texto = texto
+        self.etiquetas = tuple({e.lower() for e in PATRON_ETIQUETA.findall(texto)})
+        fechas = {}
+        for emoji, valor in PATRON_FECHA_TAREA.findall(texto):
+            try:
+                fechas[emoji] = date.fromisoformat(valor)
+            except ValueError:
+                pass
+        self.vence = fechas.get("📅")
+        self.programada = fechas.get("⏳")
+        self.hecha = fechas.get("✅")
+    
+    @property
+    def abierta(self) -> bool:
+        return self.marca not in MARCAS_CERRADAS
+    
+    @property
+    def estado(self) -> str:
+        return ESTADOS_TAREA.get(self.marca, f"[{self.marca}]")
+    
+    @property
+    def fecha(self) -> Optional[date]:
+        """Fecha por la que se filtra: la de cierre (✅) si está hecha; si no, vencimiento o programada"""
+        if not self.abierta and self.hecha:
+            return self.hecha
+        return self.vence or self.programada
+
+def extraer_tareas(contenido: str) -> List[Tarea]:
+    """Tareas de una nota, sin contar el frontmatter ni los bloques de código"""
+    if not PATRON_CASILLA.search(contenido):
+        return []
+    excluidos = []
+    if contenido.startswith("---"):
+        fin = contenido.find("\n---", 3)
+        if fin != -1:
+            excluidos.append((0, fin + 4))
+    if "```" in contenido or "~~~" in contenido:
+        vallas = [m.start() for m in PATRON_VALLA_CODIGO.finditer(contenido)]
+        # Un bloque sin cerrar llega hasta el final de la nota
+        excluidos.extend(zip(vallas[::2], vallas[1::2] + [len(contenido)]))
+    
+    tareas = []
+    linea, posicion = 1, 0
+    for m in PATRON_TAREA.finditer(contenido):
+        if any(inicio <= m.start() < fin for inicio, fin in excluidos):
+            continue
+        linea += contenido.count("\n", posicion, m.start())
+        posicion = m.start()
+        tareas.append(Tarea(linea, m.group(2), m.group(4)))
+    return tareas
+
+class FiltroTareas:
+    """Condiciones de buscar_tareas, comunes al índice y al recorrido del vault"""
+    __slots__ = ('estado', 'desde', 'hasta', 'prefijo', 'etiqueta', 'hoy')
+    
+    ESTADOS = ("abiertas", "vencidas", "hechas", "canceladas", "todas")
+    
+    def __init__(self, estado: str = "abiertas", desde: Optional[date] = None, hasta: Optional[date] = None,
+                 carpeta: str = "", etiqueta: str = ""):
+        if estado not in self.ESTADOS:
+            raise ValueError(f"Estado '{estado}' no válido. Usa: {', '.join(self.ESTADOS)}")
+        self.estado = estado
+        self.desde = desde
+        self.hasta = hasta
+        self.prefijo = carpeta.rstrip("/") + "/" if carpeta else ""
+        self.etiqueta = etiqueta.lstrip("#").lower()
+        self.hoy = date.today()
+    
+    def admite_nota(self, ruta_relativa: str) -> bool:
+        return ruta_relativa.startswith(self.prefijo)
+    
+    def cumple(self, tarea: Tarea) -> bool:
+        if self.estado == "abiertas" and not tarea.abierta:
+            return False
+        if self.estado == "vencidas" and not (tarea.abierta and tarea.vence and tarea.vence < self.hoy):
+            return False
+        if self.estado == "hechas" and tarea.marca not in "xX":
+            return False
+        if self.estado == "canceladas" and tarea.marca != "-":
+            return False
+        if self.etiqueta and self.etiqueta not in tarea.etiquetas:
+            return False
+        if self.desde or self.hasta:
+            fecha = tarea.fecha
+            if fecha is None or (self.desde and fecha < self.desde) or (self.hasta and fecha > self.hasta):
+                return False
+        return True
@@ -0,0 +1,244 @@
+"""
+Vaults servidos por el proceso, cada uno con sus cachés e índices
+"""
+
+import asyncio
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from obsidian_vault.cache import (
+    MAX_BYTES_CACHE_NOTAS, MAX_BYTES_CACHE_RESULTADOS, MAX_ENTRADAS_CACHE_RESULTADOS, NOTAS_FIJADAS, CacheNotas,
+    CacheResultados,
+)
+from obsidian_vault.exclusiones import recorrer_archivos, ReglasIgnorar
+from obsidian_vault.indice import IndiceVault
+
+# Segundos sin uso tras los que se liberan los índices en memoria de un vault
+VAULT_INACTIVO_SEGUNDOS = int(os.environ.get("OBSIDIAN_VAULT_INACTIVO_SEGUNDOS", 15 * 60))
+
+class VaultDesconocido(Exception):
+    """Se pidió un vault que no está configurado"""
+
+class Vault:
+    """
+    Un vault de Obsidian con sus propias cachés e índices.
+    
+    El índice se construye en segundo plano la primera vez que se usa el
+    vault y se puede liberar cuando el vault lleva tiempo sin usarse.
+    """
+    
+    def __init__(self, nombre: str, ruta: str):
+        self.nombre = nombre
+        self.ruta = Path(ruta).expanduser()
+        self.ultimo_uso = time.monotonic()
+        self._lock = threading.Lock()
+        self.indice: Optional["IndiceVault"] = None
+        # (mtime de .obsidian/app.json, reglas compiladas)
+        self._reglas: Optional[tuple] = None
+        
+        # Avanza con cada cambio detectado en el vault; forma parte de la
+        # clave de la caché de resultados para no servir nunca datos viejos
+        self.generacion = 0
+        self.cache = CacheResultados(MAX_ENTRADAS_CACHE_RESULTADOS, MAX_BYTES_CACHE_RESULTADOS)
+        # Contenido de las notas leídas; no depende de la generación porque
+        # cada acierto se valida con el mtime y el tamaño del archivo
+        self.cache_notas = CacheNotas(MAX_BYTES_CACHE_NOTAS, NOTAS_FIJADAS)
+    
+    def tocar(self):
+        """Marca el vault como usado ahora"""
+        self.ultimo_uso = time.monotonic()
+    
+    def inactivo_desde(self) -> float:
+        """Segundos transcurridos desde el último uso"""
+        return time.monotonic() - self.ultimo_uso
+    
+    def indices_cargados(self) -> bool:
+        return self.indice is not None
+    
+    def liberar_indices(self):
+        """Libera los índices en memoria; se reconstruyen al volver a usarse"""
+        with self._lock:
+            if self.indice is not None:
+                self.indice.cancelar()
+            self.indice = None
+            self.cache.limpiar()
+            self.cache_notas.limpiar()
+    
+    def reglas_ignorar(self) -> ReglasIgnorar:
+        """Reglas de exclusión del vault; se vuelven a compilar si cambia .obsidian/app.json"""
+        try:
+            mtime_ns = (self.ruta / ".obsidian" / "app.json").stat().st_mtime_ns
+        except OSError:
+            mtime_ns = None
+        reglas = self._reglas
+        if reglas is None or reglas[0] != mtime_ns:
+            reglas = self._reglas = (mtime_ns, ReglasIgnorar.del_vault(self.ruta))
+        return reglas[1]
+    
+    def archivos(self, carpeta: str = "", extension: str = ".md", recursivo: bool = True) -> List[Path]:
+        """Archivos del vault o de una carpeta (por defecto, las notas) sin los excluidos"""
+        return [Path(entrada.path) for _, entrada in recorrer_archivos(self.ruta, self.reglas_ignorar(), carpeta, recursivo)
+                if entrada.name.endswith(extension)]
+    
+    def asegurar_indice(self) -> Optional["IndiceVault"]:
+        """Lanza la construcción del índice en segundo plano si no existe"""
+        reglas = self.reglas_ignorar()
+        if self.indice is not None and self.indice.reglas is not reglas:
+            # Cambiaron los archivos excluidos: el índice se rehace con las reglas nuevas
+            self.liberar_indices()
+        with self._lock:
+            if self.indice is None and self.ruta.exists():
+                self.indice = IndiceVault(self.ruta, al_cambiar=self.registrar_cambio, reglas=reglas)
+                self.indice.iniciar()
+            return self.indice
+    
+    def indice_listo(self, refrescar: bool = True) -> Optional["IndiceVault"]:
+        """
+        Devuelve el índice si ya está construido (al día con los cambios
+        externos si refrescar=True), o None si hay que recorrer el vault.
+        """
+        indice = self.asegurar_indice()
+        if indice is None or not indice.listo:
+            return None
+        if refrescar:
+            indice.refrescar()
+        return indice
+    
+    def buscar_nota(self, nombre_archivo: str) -> Optional[Path]:
+        """Resuelve el nombre de una nota (con o sin ruta) a su archivo"""
+        if "/" in nombre_archivo:
+            nota_path = self.ruta / nombre_archivo
+            return nota_path if nota_path.exists() else None
+        
+        indice = self.indice_listo(refrescar=False)
+        if indice is not None:
+            nota_path = indice.buscar_nombre(nombre_archivo)
+            if nota_path is not None and nota_path.exists():
+                return nota_path
+        
+        # Buscar en todo el vault
+        for _, entrada in recorrer_archivos(self.ruta, self.reglas_ignorar()):
+            if entrada.name.endswith(".md") and nombre_archivo in (entrada.name, entrada.name[:-3]):
+                return Path(entrada.path)
+        return None
+    
+    def registrar_cambio(self):
+        """Invalida los resultados cacheados: el vault cambió"""
+        self.generacion += 1
+        self.cache.limpiar()
+    
+    def clave_nota(self, nota_path: Path) -> str:
+        return nota_path.relative_to(self.ruta).as_posix()
+    
+    def leer_contenido(self, nota_path: Path) -> tuple:
+        """(contenido, stat) de una nota, desde la caché de notas si el archivo no cambió"""
+        stats = nota_path.stat()
+        clave = self.clave_nota(nota_path)
+        contenido = self.cache_notas.obtener(clave, stats)
+        if contenido is None:
+            with open(nota_path, 'r', encoding='utf-8') as f:
+                contenido = f.read()
+            self.cache_notas.guardar(clave, contenido, stats)
+        return contenido, stats
+    
+    def nota_escrita(self, nota_path: Path, contenido: Optional[str] = None):
+        """
+        Actualiza el índice tras crear o modificar una nota desde el servidor.
+        Si se pasa el contenido completo que quedó en disco, se guarda en la
+        caché de notas en lugar de descartar la entrada
+        """
+        indice = self.indice
+        if indice is not None:
+            indice.actualizar_nota(nota_path)
+        if contenido is None:
+            self.cache_notas.quitar(self.clave_nota(nota_path))
+        else:
+            self.cache_notas.guardar(self.clave_nota(nota_path), contenido, nota_path.stat())
+        self.registrar_cambio()
+    
+    def notas_escritas(self, notas: List[Path]):
+        """Como nota_escrita para un lote: el índice y la caché se actualizan una sola vez"""
+        indice = self.indice
+        if indice is not None:
+            indice.actualizar_notas(notas)
+        for nota_path in notas:
+            self.cache_notas.quitar(self.clave_nota(nota_path))
+        if notas:
+            self.registrar_cambio()
+    
+    def resultado_cacheado(self, clave: tuple, usar_cache: bool, calcular, seguimiento=None) -> tuple:
+        """
+        Devuelve (resultado, desde_cache). Solo se usa la caché cuando el
+        índice está listo, porque es su refresco el que detecta los cambios
+        hechos fuera del servidor. Un cálculo que se detuvo a medias (con su
+        `seguimiento` cancelado) no se guarda.
+        """
+        if not usar_cache or self.indice_listo() is None:
+            return calcular(), False
+        
+        clave = clave + (self.generacion,)
+        resultado = self.cache.obtener(clave)
+        if resultado is not None:
+            return resultado, True
+        resultado = calcular()
+        if seguimiento is None or not seguimiento.detenido:
+            self.cache.guardar(clave, resultado)
+        return resultado, False
+
+# Vaults servidos: {nombre: Vault}; el primero es el vault por defecto
+VAULTS: Dict[str, Vault] = {}
+
+def configurar_vaults(config: Dict[str, str]):
+    """Sustituye los vaults servidos por {"nombre": "ruta"} (pruebas, benchmarks)"""
+    for vault in VAULTS.values():
+        vault.liberar_indices()
+    VAULTS.clear()
+    VAULTS.update({nombre: Vault(nombre, ruta) for nombre, ruta in config.items()})
+
+def liberar_vaults_inactivos(max_segundos: float = VAULT_INACTIVO_SEGUNDOS) -> List[str]:
+    """Libera los índices de los vaults sin uso reciente y devuelve sus nombres"""
+    liberados = []
+    for vault in VAULTS.values():
+        if vault.indices_cargados() and vault.inactivo_desde() > max_segundos:
+            vault.liberar_indices()
+            liberados.append(vault.nombre)
+    return liberados
+
+def obtener_vault(nombre: str = "") -> Vault:
+    """Devuelve el vault pedido (vacío = vault por defecto)"""
+    if not nombre:
+        vault = next(iter(VAULTS.values()))
+    elif nombre in VAULTS:
+        vault = VAULTS[nombre]
+    else:
+        disponibles = ", ".join(VAULTS)
+        raise VaultDesconocido(f"El vault '{nombre}' no existe. Vaults disponibles: {disponibles}")
+    vault.tocar()
+    vault.asegurar_indice()
+    liberar_vaults_inactivos()
+    return vault
+
+def vaults_objetivo(nombre: str = "") -> List[Vault]:
+    """Vaults sobre los que opera una búsqueda (vacío = todos)"""
+    if nombre:
+        return [obtener_vault(nombre)]
+    for vault in VAULTS.values():
+        vault.tocar()
+        vault.asegurar_indice()
+    return list(VAULTS.values())
+
+async def en_paralelo(funcion, vaults: List[Vault], *args) -> list:
+    """Ejecuta funcion(vault, *args) para cada vault de forma concurrente"""
+    return await asyncio.gather(*(asyncio.to_thread(funcion, vault, *args) for vault in vaults))
+
+async def en_paralelo_desde(funcion, objetivos: List[tuple], *args) -> list:
+    """Como en_paralelo para [(vault, desde)]: llama a funcion(vault, *args, desde)"""
+    return await asyncio.gather(*(asyncio.to_thread(funcion, vault, *args, desde) for vault, desde in objetivos))
+
+def iniciar_indexado():
+    """Lanza la construcción de los índices de todos los vaults en segundo plano"""
+    for vault in VAULTS.values():
+        vault.asegurar_indice()